@@ -0,0 +1,38 @@
+# bench/__main__.py
+"""
+性能基准：在 _2023e 目录下运行
+
+    python -m bench                       # 合成画面
+    python -m bench recording.mp4         # 录制的视频
+    python -m bench frames.npy --fps 60   # .npy 帧序列，按 60fps 回放
+
+不需要摄像头和树莓派，可以在普通 Linux 机器上比较改动前后的性能。
+"""
+import argparse
+
+from bench import detectors, latency
+from bench.replay import load_recording
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制画面，测量检测吞吐量和端到端延迟")
+    parser.add_argument('recording', nargs='?', help="视频文件或 .npy 帧序列，不给时使用合成画面")
+    parser.add_argument('--limit', type=int, default=300, help="最多读取的帧数")
+    parser.add_argument('--fps', type=float, default=30.0, help="录制帧率：延迟测试按此速度回放，ROI 跟踪按此给帧编时间戳")
+    parser.add_argument('--skip-latency', action='store_true', help="只测检测器")
+    args = parser.parse_args()
+
+    frames = load_recording(args.recording, args.limit)
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames {width}x{height}\n")
+
+    print("detectors:")
+    print(detectors.report(detectors.run(frames, args.fps)))
+
+    if not args.skip_latency:
+        print(f"\nend-to-end latency at {args.fps:g} fps:")
+        print(latency.report(latency.run(frames, args.fps)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# bench/detectors.py
+"""
+检测器吞吐量和各阶段耗时分位数。
+
+直接使用 laser_tracker.py、perception.py 中的流水线对象（GPIO 后端没有 gpiod 时
+自动使用模拟芯片，导入这些模块不需要树莓派），逐帧回放录制的画面。
+"""
+import itertools
+import time
+
+import laser_tracker
+from vision import perception
+from vision.pipeline import RED, GREEN, detector_pipeline, multi_target_pipeline, border_pipeline
+from vision.predictor import KalmanPredictor
+from vision.roi_tracker import RoiTracker
+from vision.screen_geometry import ScreenGeometry
+from bench.replay import percentiles
+
+
+def pipelines(shape):
+    """[(名称, Pipeline)]，前两个就是各入口脚本使用的流水线对象。"""
+    return [
+        ('laser_tracker (hsv)', laser_tracker.red_pipeline),
+        ('perception (hsv)', perception.laser_pipeline),
+        ('red + green (multi)', multi_target_pipeline((RED, GREEN), shape=shape)),
+        ('screen border', border_pipeline(shape)),
+        ('red (lut)', detector_pipeline((RED,), method='lut', shape=shape)),    # 与 laser_tracker 的 hsv 对比
+    ]
+
+
+def bench_pipeline(pipeline, frames, warmup=3):
+    """
+    返回 {'fps', 'frame': {p: ms}, 'stages': {阶段名: {p: ms}}}。
+    """
+    for frame in frames[:warmup]:
+        pipeline.run(frame)   # 生成查找表、分配缓冲区
+    pipeline.reset_timings(keep_samples=True)
+    totals = []
+    clock = time.perf_counter_ns
+    for frame in frames:
+        t0 = clock()
+        pipeline.run(frame)
+        totals.append(clock() - t0)
+    return {
+        'fps': 1e9 * len(totals) / sum(totals),
+        'frame': {p: v / 1e6 for p, v in percentiles(totals).items()},
+        'stages': {name: {p: v / 1e6 for p, v in percentiles(timing.samples).items()}
+                   for name, timing in pipeline.timings.items()},
+    }
+
+
+def bench_callable(detect, frames):
+    """任意 detect(frame) 函数的吞吐量和单帧耗时分位数。"""
+    totals = []
+    clock = time.perf_counter_ns
+    for frame in frames:
+        t0 = clock()
+        detect(frame)
+        totals.append(clock() - t0)
+    return {
+        'fps': 1e9 * len(totals) / sum(totals),
+        'frame': {p: v / 1e6 for p, v in percentiles(totals).items()},
+        'stages': {},
+    }
+
+
+def run(frames, fps=30.0):
+    """返回 [(名称, 结果)]。fps 用来给回放的帧编时间戳（预测窗口跟踪需要）。"""
+    shape = frames[0].shape
+    results = [(name, bench_pipeline(pipeline, frames)) for name, pipeline in pipelines(shape)]
+
+    # laser_tracker 实际的处理方式：按预测位置的局部窗口跟踪
+    red = detector_pipeline((RED,), method='hsv', shape=shape)
+    tracker = RoiTracker(lambda frame: red.run(frame)['red'], predictor=KalmanPredictor())
+    ticks = itertools.count()
+    results.append(('laser_tracker + roi', bench_callable(lambda frame: tracker.update(frame, next(ticks) / fps),
+                                                          frames)))
+
+    screen = ScreenGeometry()
+    results.append(('screen (cached)', bench_callable(screen.update, frames)))
+    return results
+
+
+def report(results):
+    lines = []
+    for name, result in results:
+        frame = result['frame']
+        lines.append(f"{name:22s} {result['fps']:8.1f} fps   "
+                     f"p50 {frame[50]:7.3f}  p90 {frame[90]:7.3f}  p99 {frame[99]:7.3f} ms")
+        for stage, stage_p in result['stages'].items():
+            lines.append(f"    {stage:18s}              "
+                         f"p50 {stage_p[50]:7.3f}  p90 {stage_p[90]:7.3f}  p99 {stage_p[99]:7.3f} ms")
+    return "\n".join(lines)
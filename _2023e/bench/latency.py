@@ -0,0 +1,103 @@
+# bench/latency.py
+"""
+端到端延迟：画面采集 -> 检测完成 -> 电机引脚第一次变化。
+
+录制的画面按原帧率经 FrameGrabber 回放，检测结果换算成目标步数交给 MotionService，
+电机引脚是模拟的线路对象（gpio_backend.SimLines），记录每次 set_values 的时间。对每个下发的目标统计：
+    detect:  采集时间戳 -> 检测完成
+    step:    检测完成 -> 之后第一次 set_values
+服务正在运动时，新目标要等当前计划在下一个打断检查点（ABORT_CHECK_TICKS 拍）返回，
+因此按下发时服务是否空闲分别统计。
+"""
+import time
+
+from hardware.stepper_waveform import StepperWaveform
+from hardware.gpio_backend import SimLines
+from hardware.step_scheduler import StepScheduler, HYBRID
+from hardware.motion_profile import MotionProfile
+from hardware.multi_axis import MultiAxisExecutor
+from hardware.motion_service import MotionService
+from vision.capture import FrameGrabber
+from vision.pipeline import RED, detector_pipeline
+from vision.roi_tracker import RoiTracker
+from bench.replay import ReplaySource, percentiles
+
+# 没有标定结果时，按画面中心的像素偏差换算步数
+STEPS_PER_PIXEL = 0.5
+
+
+def run(frames, fps=30.0, calibration=None, syscall_cost=5e-6):
+    """
+    calibration: utils.calibration.Calibration，给出时用它把像素换算成绝对步数
+    返回 {'frames', 'commands', 'detect', 'step', 'step_idle', 'step_busy'}，后几项为 {p: ms}。
+    """
+    height, width = frames[0].shape[:2]
+    lines = SimLines(range(8), syscall_cost)
+    executor = MultiAxisExecutor(StepperWaveform(lines, 8, StepScheduler(HYBRID)),
+                                 (0, 4), profile=MotionProfile())
+    service = MotionService(executor, hold=True).start()
+    red = detector_pipeline((RED,), method='hsv', shape=frames[0].shape)
+    tracker = RoiTracker(lambda frame: red.run(frame)['red'])
+
+    commands = []   # (采集时间, 检测完成时间, 下发时记录的条数, 下发时服务是否在运动)
+    last_target = None
+    processed = 0
+    with FrameGrabber(ReplaySource(frames), fps=fps) as grabber:
+        while True:
+            frame = grabber.read()
+            if frame is None:
+                break
+            processed += 1
+            detection = tracker.update(frame.image)
+            detected = time.monotonic()
+            if detection is None:
+                continue
+            if calibration is not None:
+                target = calibration.pixel_to_steps(detection.x, detection.y)
+            else:
+                target = (int(round((detection.x - width / 2) * STEPS_PER_PIXEL)),
+                          int(round((detection.y - height / 2) * STEPS_PER_PIXEL)))
+            if target == last_target:
+                continue
+            last_target = target
+            commands.append((frame.timestamp, detected, len(lines.history()[0]), service.busy))
+            service.retarget(*target)
+    service.wait_idle(5.0)
+    service.shutdown()
+
+    # SimLines 的时间戳来自 time.monotonic_ns()，与 Frame.timestamp 是同一个时钟
+    times = lines.history()[0] / 1e9
+    detect, step, step_idle, step_busy = [], [], [], []
+    for captured, detected, mark, busy in commands:
+        detect.append(detected - captured)
+        following = times[mark:]
+        following = following[following >= detected]
+        if following.size:
+            latency = following[0] - detected
+            step.append(latency)
+            (step_busy if busy else step_idle).append(latency)
+
+    def ms(samples):
+        return {p: v * 1000 for p, v in percentiles(samples).items()}
+
+    return {
+        'frames': processed,
+        'commands': len(commands),
+        'dropped': grabber.dropped,
+        'detect': ms(detect),
+        'step': ms(step),
+        'step_idle': ms(step_idle),
+        'step_busy': ms(step_busy),
+        'samples': (len(step_idle), len(step_busy)),
+    }
+
+
+def report(result):
+    lines = [f"{result['frames']} frames processed ({result['dropped']} dropped), "
+             f"{result['commands']} motion commands"]
+    idle, busy = result['samples']
+    for key, title in (('detect', 'capture -> detection'), ('step', 'detection -> first step'),
+                       ('step_idle', f'  service idle (n={idle})'), ('step_busy', f'  service busy (n={busy})')):
+        p = result[key]
+        lines.append(f"{title:26s} p50 {p[50]:7.3f}  p90 {p[90]:7.3f}  p99 {p[99]:7.3f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,51 @@
+# bench/replay.py
+"""
+回放录制的画面，代替摄像头。
+
+录制文件可以是视频（.mp4 / .avi 等）或 .npy 帧序列（N x H x W x 3，uint8），
+不给路径时使用合成画面。ReplaySource 的接口与 cv2.VideoCapture 相同，
+可以直接交给 FrameGrabber(source, fps=...)，按录制时的帧率“实时”回放。
+"""
+import numpy as np
+
+from vision.red_mask import load_frames
+
+
+class ReplaySource:
+    """
+    frames: 帧列表（例如 load_recording 的返回值）
+    loops:  回放遍数
+    """
+
+    def __init__(self, frames, loops=1):
+        self.frames = frames
+        self.loops = loops
+        self.index = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.index >= len(self.frames) * self.loops:
+            return False, None
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        # .npy 用内存映射读取，交出去之前拷贝一份，避免处理循环写到只读内存上
+        return True, np.array(frame)
+
+    def release(self):
+        pass
+
+
+def load_recording(path=None, limit=300):
+    """读取录制的画面，返回帧列表（同 vision.red_mask.load_frames）。"""
+    frames = load_frames(path, limit)
+    if not frames:
+        raise IOError(f"无法从 {path} 读取画面")
+    return frames
+
+
+def percentiles(samples, points=(50, 90, 99)):
+    """samples 的分位数，返回 {p: 值}。"""
+    values = np.percentile(np.asarray(samples, np.float64), points) if len(samples) else [np.nan] * len(points)
+    return dict(zip(points, values))
@@ -1,14 +1,24 @@
 # config.py
+import os
 
 # --- 摄像头相关配置 ---
 CAMERA_INDEX = 0             # 摄像头索引号，通常是0
 FRAME_WIDTH = 1280           # 摄像头捕获宽度
 FRAME_HEIGHT = 720           # 摄像头捕获高度
+CAMERA_FPS = 30              # 请求的帧率
+CAMERA_FOURCC = ('MJPG', 'YUYV')  # 像素格式，按顺序尝试；YUYV 在 1280x720 下通常只有 5~10 fps
+CAMERA_EXPOSURE = None       # 手动曝光（V4L2 单位 100 微秒），None 为自动曝光；用 vision.camera_config.tune_exposure 找最短可用值
+CAMERA_GAIN = None           # 增益，None 为驱动默认
+TRACK_WIDTH = 640            # 跟踪阶段的低分辨率模式（vision.camera_config.TRACKING）
+TRACK_HEIGHT = 360
+TRACK_FPS = 60
 
 # --- 视觉处理相关配置 ---
 # HSV 颜色范围 (需要你用工具实际标定)
 RED_LOWER = (0, 120, 70)     # 红色的HSV下限
 RED_UPPER = (10, 255, 255)
+RED_LOWER2 = (170, 120, 70)  # 红色在HSV中跨越0/180，第二个范围（偏紫的红色）
+RED_UPPER2 = (180, 255, 255)
 GREEN_LOWER = (35, 100, 100) # 绿色的HSV下限
 GREEN_UPPER = (85, 255, 255)
 
@@ -17,21 +27,47 @@ SCREEN_STD_WIDTH = 500       # 500mm
 SCREEN_STD_HEIGHT = 500      # 500mm
 
 # --- 云台硬件相关配置 ---
-# 红色云台步进电机GPIO引脚
-RED_GIMBAL_X_STEP = 17
-RED_GIMBAL_X_DIR = 27
-RED_GIMBAL_Y_STEP = 22
-RED_GIMBAL_Y_DIR = 23
-
-# 绿色云台步进电机GPIO引脚
-GREEN_GIMBAL_X_STEP = 5
-GREEN_GIMBAL_X_DIR = 6
-GREEN_GIMBAL_Y_STEP = 13
-GREEN_GIMBAL_Y_DIR = 19
+# GPIO 控制器芯片：树莓派 5 为 'gpiochip4'，树莓派 4/3/2 为 'gpiochip0'
+GPIO_CHIP = 'gpiochip4'
+# GPIO 后端：'gpiod' 真实硬件，'sim' 模拟芯片，'auto' 没有 gpiod 时自动使用模拟芯片
+GPIO_BACKEND = 'auto'
+
+# 云台步进电机GPIO引脚：四相步进电机（ULN2003 驱动板）的 IN1-IN4，Gimbal / MotorConfig 使用这一组。
+# 原来的 *_GIMBAL_X_STEP / X_DIR / Y_STEP / Y_DIR 是按 STEP/DIR 驱动器写的，代码里没有用到，
+# 而且与实际接线冲突（红色 22、23、27 和绿色 5、6 都已经接在红色云台的 IN 引脚上），已删除。
+# 红色云台与 laser_tracker.py、visual_servo.py 的接线相同
+RED_GIMBAL_X_PINS = (4, 14, 22, 23)
+RED_GIMBAL_Y_PINS = (6, 12, 5, 27)
+# 绿色云台还没有固定接线：这里取的是不与红色云台、激光笔（26）冲突的空闲引脚，接线后按实际修改
+GREEN_GIMBAL_X_PINS = (13, 19, 16, 20)
+GREEN_GIMBAL_Y_PINS = (21, 24, 25, 18)
 
 MOTOR_DELAY = 0.001          # 步进电机脉冲延迟，控制速度
+MOTOR_STEPS_PER_REV = 6400   # 电机转一圈的步数（一步四拍）
+
+# 标定结果（单应矩阵、云台几何、逆运动学查找表）的保存位置，相对于本文件所在的目录，
+# 与从哪个目录运行脚本无关
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibration')
+# 两个云台各自的标定名称（<CALIBRATION_DIR>/<名称>.json / .npy），文件存在时伺服和追踪脚本自动使用
+RED_CALIBRATION = 'red_gimbal'
+GREEN_CALIBRATION = 'green_gimbal'
 
 # --- PID控制器相关配置 ---
 PID_KP = 0.8                 # P - 比例增益
 PID_KI = 0.05                # I - 积分增益
-PID_KD = 0.1                 # D - 微分增益
\ No newline at end of file
+PID_KD = 0.1                 # D - 微分增益
+
+# --- 视觉伺服相关配置 ---
+SERVO_RATE = 60              # 控制循环频率 (Hz)，不超过摄像头帧率时每个周期都有新画面
+SERVO_STEPS_PER_PIXEL = 2.0  # 画面上移动 1 像素大约需要的电机步数（PID 输出像素/秒，乘以它得到步/秒）
+SERVO_MAX_STEP_RATE = 1500   # 伺服输出的最高步进速率 (step/s)
+
+# --- 显示和运行日志 ---
+# 'auto': 有图形界面（$DISPLAY）时开窗口，否则不显示；None: 不显示（无头运行）；
+# 'window': OpenCV 窗口；'jpeg:路径': 定期把画面写成 JPEG 文件；'tcp://地址:端口': 把 JPEG 推给连上的客户端
+DISPLAY = 'auto'
+DISPLAY_RATE = 10            # 画面最多每秒刷新几次
+TELEMETRY_INTERVAL = 1.0     # 同一种运行日志最多每隔多少秒输出一次（秒）
+RING_LOG_PATH = None         # 每帧二进制记录文件（utils.ring_log），None 表示不记录
+RING_LOG_CAPACITY = 1 << 16  # 环形记录文件最多保留多少条（写满后覆盖最旧的）
+PROFILING = False            # utils.profiling 分段计时（环境变量 PROFILE=1 也可以打开），关闭时没有开销
@@ -1,21 +1,37 @@
-import gpiod
 import numpy as np
 import time
 from dataclasses import dataclass
+from typing import Optional
+
+from hardware.stepper_waveform import StepperWaveform, RIGHTWARD, LEFTWARD, PHASES_PER_STEP
+from hardware.step_scheduler import StepScheduler, HYBRID
+from hardware.motion_profile import MotionProfile, profile_intervals
+from hardware.multi_axis import MultiAxisExecutor
+from hardware.motion_service import MotionService
+from hardware.kinematics import angle_to_steps
+from hardware.gpio_backend import gpiod
+from utils import profiling
+import config
+
+# 本模块使用包内绝对导入，请在 _2023e 目录下用 `python -m hardware.gimbal_control` 运行
 
 @dataclass
 class MotorConfig:
-    chip_name: str = 'gpiochip4'
+    # 无默认值的字段必须写在有默认值的字段前面
     in1: int
     in2: int
     in3: int
     in4: int
+    chip_name: str = config.GPIO_CHIP
     delay: float = 0.0001
+    timing: str = HYBRID    # 节拍调度方式：'sleep' / 'hybrid' / 'spin'
+    profile: Optional[MotionProfile] = None  # 加减速曲线，None 时按固定 delay 运行
 
 class Motor:
     def __init__(self, config: MotorConfig):
         self.config = config
         self.lines = None
+        self.waveform = None
         self.pins = [
             config.in1, config.in2, config.in3, config.in4
         ]
@@ -30,7 +46,10 @@ class Motor:
                 type=gpiod.LINE_REQ_DIR_OUT,
                 default_vals=[0] * len(self.pins)
             )
-            
+            # 引脚状态保存在内存中，每拍只写一次
+            self.waveform = StepperWaveform(self.lines, len(self.pins),
+                                            StepScheduler(self.config.timing))
+
         except Exception as e:
             print(f"GPIO setup failed: {e}")
             print("Please ensure you are running with 'sudo' and the CHIP_NAME is correct.")
@@ -43,11 +62,12 @@ class Motor:
         """
         if self.lines:
             # 将所有引脚设为低电平
-            self.lines.set_values([0] * len(self.all_pins))
+            self.lines.set_values([0] * len(self.pins))
             # 释放引脚
             self.lines.release()
             print("\nGPIO cleaned up.")
             self.lines = None
+            self.waveform = None
     
     def __del__(self):
         """
@@ -57,44 +77,37 @@ class Motor:
 
     def setStep(self, w1, w2, w3, w4):
         """
-        设置电机1的四个引脚状态。
+        设置电机的四个引脚状态（使用内存中的引脚状态，不再回读）。
         """
-        current_values = self.lines.get_values()  # 获取当前所有引脚的状态
-        # 更新电机1对应的引脚状态
-        current_values[0] = w1
-        current_values[1] = w2
-        current_values[2] = w3
-        current_values[3] = w4
-        self.lines.set_values(current_values)
+        self.waveform.set_phase(0, (w1, w2, w3, w4))
 
     def stop(self):
         self.setStep(0, 0, 0, 0)
 
-    def rightward(self, steps):
-        delay = self.config.delay
-        for _ in range(steps):
-            self.setStep(1, 0, 1, 0)
-            time.sleep(delay)
-            self.setStep(0, 1, 1, 0)
-            time.sleep(delay)
-            self.setStep(0, 1, 0, 1)
-            time.sleep(delay)
-            self.setStep(1, 0, 0, 1)
-            time.sleep(delay)
+    @property
+    def last_move_stats(self):
+        """最近一次运动的节拍统计（实际步速、抖动、超时次数）。"""
+        return self.waveform.scheduler.last_stats
+
+    def _intervals(self, steps):
+        """每拍间隔：配置了加减速曲线时取缓存的间隔表，否则为固定 delay。"""
+        if self.config.profile is None:
+            return self.config.delay
+        return profile_intervals(steps * PHASES_PER_STEP, self.config.profile)
+
+    def _emit(self, direction, steps):
+        """输出 steps 个整步后断电；打开 config.PROFILING 时记录每次运动的耗时和平均节拍周期。"""
+        with profiling.stage('motor.move'):
+            stats = self.waveform.run(direction, steps, self._intervals(steps))
+        if stats.ticks:
+            profiling.record('motor.tick_period', int(stats.actual_time / stats.ticks * 1e9))
         self.stop()
 
+    def rightward(self, steps):
+        self._emit(RIGHTWARD, steps)
+
     def leftward(self, steps):
-        delay = self.config.delay
-        for _ in range(steps):
-            self.setStep(1, 0, 0, 1)
-            time.sleep(delay)
-            self.setStep(0, 1, 0, 1)
-            time.sleep(delay)
-            self.setStep(0, 1, 1, 0)
-            time.sleep(delay)
-            self.setStep(1, 0, 1, 0)
-            time.sleep(delay)
-        self.stop()
+        self._emit(LEFTWARD, steps)
 
     def downward(self, steps):
         self.leftward(steps)
@@ -104,9 +117,96 @@ class Motor:
 
     def loop(self, angle):
         print("rightward--->leftward:")
-        steps = int(angle / 360 * 6400)
+        steps = angle_to_steps(angle)
         self.rightward(steps)
+        print(self.last_move_stats)
         self.leftward(steps)
+        print(self.last_move_stats)
+        print("stop...")
+        time.sleep(1)
+
+
+class Gimbal:
+    """
+    两轴云台：X、Y 两个电机的 8 个引脚在一次请求中申请，
+    由 MultiAxisExecutor 在同一条时间线上协同输出，每个节拍只写一次。
+    速度相关参数（delay / timing / profile）取 X 轴的配置。
+    """
+
+    def __init__(self, x_config: MotorConfig, y_config: MotorConfig):
+        self.x_config = x_config
+        self.y_config = y_config
+        self.lines = None
+        self.executor = None
+        self.pins = [
+            x_config.in1, x_config.in2, x_config.in3, x_config.in4,
+            y_config.in1, y_config.in2, y_config.in3, y_config.in4,
+        ]
+        self.setup()
+
+    def setup(self):
+        try:
+            chip = gpiod.Chip(self.x_config.chip_name)
+            self.lines = chip.get_lines(self.pins)
+            self.lines.request(
+                consumer="e_23_gimbal_driver",
+                type=gpiod.LINE_REQ_DIR_OUT,
+                default_vals=[0] * len(self.pins)
+            )
+            waveform = StepperWaveform(self.lines, len(self.pins),
+                                       StepScheduler(self.x_config.timing))
+            self.executor = MultiAxisExecutor(waveform, (0, 4),
+                                              self.x_config.delay, self.x_config.profile)
+        except Exception as e:
+            print(f"GPIO setup failed: {e}")
+            print("Please ensure you are running with 'sudo' and the CHIP_NAME is correct.")
+            return False
+        return True
+
+    def destroy(self):
+        """
+        释放所有GPIO引脚，在程序结束时调用。
+        """
+        if self.lines:
+            self.lines.set_values([0] * len(self.pins))
+            self.lines.release()
+            print("\nGPIO cleaned up.")
+            self.lines = None
+            self.executor = None
+
+    def __del__(self):
+        self.destroy()
+
+    @property
+    def last_move_stats(self):
+        return self.executor.waveform.scheduler.last_stats
+
+    def move(self, steps_x, steps_y):
+        """两轴同时转动，正数为 rightward/upward，负数为 leftward/downward。"""
+        with profiling.stage('gimbal.move'):
+            self.executor.move(steps_x * PHASES_PER_STEP, steps_y * PHASES_PER_STEP)
+        stats = self.last_move_stats
+        if stats.ticks:
+            profiling.record('gimbal.tick_period', int(stats.actual_time / stats.ticks * 1e9))
+        self.stop()
+
+    def stop(self):
+        self.executor.release()
+
+    def start_service(self, hold=False):
+        """
+        启动后台运动线程，之后通过返回的 MotionService 下发非阻塞命令，
+        不要再直接调用 move()。
+        """
+        return MotionService(self.executor, hold).start()
+
+    def loop(self, angle):
+        print("diagonal forward--->back:")
+        steps = angle_to_steps(angle)
+        self.move(steps, steps)
+        print(self.last_move_stats)
+        self.move(-steps, -steps)
+        print(self.last_move_stats)
         print("stop...")
         time.sleep(1)
 
@@ -117,18 +217,19 @@ if __name__ == '__main__':
         in1=4,
         in2=14,
         in3=22,
-        in4=23
+        in4=23,
+        profile=MotionProfile()
     )
     motor2_config = MotorConfig(
         in1=6,
         in2=12,
         in3=5,
-        in4=27
+        in4=27,
+        profile=MotionProfile()
     )
 
-    # 创建电机驱动实例
-    motor1 = Motor(motor1_config)
-    motor2 = Motor(motor2_config)
+    # 两个电机合并为一个云台，X、Y 同时运动
+    gimbal = Gimbal(motor1_config, motor2_config)
 
     try:
         while True:
@@ -137,8 +238,7 @@ if __name__ == '__main__':
                 continue  # Handle empty input
 
             t0 = time.time()
-            motor1.loop(float(a))
-            motor2.loop(float(a))
+            gimbal.loop(float(a))
 
             print(f"Operation took: {time.time() - t0:.2f} seconds")
 
@@ -148,7 +248,6 @@ if __name__ == '__main__':
         print("Invalid input. Please enter a number.")
     finally:
         # 无论程序如何退出（正常结束或异常），都确保GPIO被清理
-        motor1.destroy()
-        motor2.destroy()
+        gimbal.destroy()
 
 
@@ -0,0 +1,275 @@
+# hardware/gpio_backend.py
+"""
+可替换的 GPIO 后端。
+
+各模块原来都直接 import gpiod，离开树莓派就无法运行，电机代码的步进速率也没法测。
+现在统一写成
+
+    from hardware.gpio_backend import gpiod
+
+config.GPIO_BACKEND 选择后端：
+    'gpiod'  真实的 libgpiod（v1 接口）
+    'sim'    模拟芯片
+    'auto'   能导入 gpiod 就用真实的，否则用模拟芯片
+调用方式与 gpiod v1 相同：gpiod.Chip(name).get_lines(offsets).request(...)。
+导入到的 gpiod 是 v2 接口（没有 Chip.get_lines）时两种方式都直接报错，
+而不是等到第一次 get_lines 才失败，或者悄悄换成模拟芯片让电机不动。
+
+模拟线路（SimLines）用忙等模拟每次系统调用的开销，并把每次 set_values 的电平和
+time.monotonic_ns() 时间戳记录下来。reconstruct() 根据记录还原每个步进电机的
+转子位置、速度，统计相序跳变（一次跳两相，转子方向不确定）和超速（两拍间隔短于
+电机能跟上的最小间隔）造成的可能失步，可以在没有硬件的环境里分析吞吐量和失步。
+"""
+import time
+import types
+from dataclasses import dataclass
+
+import numpy as np
+
+import config
+from hardware.stepper_waveform import RIGHTWARD_SEQ, PINS_PER_MOTOR, PHASES_PER_STEP
+
+# 与 gpiod v1 的常量取值相同
+LINE_REQ_DIR_IN = 2
+LINE_REQ_DIR_OUT = 3
+
+# 树莓派上一次 set_values 的大致开销（秒）
+SIM_SYSCALL_COST = 5e-6
+
+
+class SimLines:
+    """
+    模拟 gpiod v1 的 LineBulk。
+    syscall_cost: 每次 get_values / set_values 忙等的时间（秒）
+    record:       是否记录每次 set_values 的时间戳和电平
+    clock:        记录时间戳用的时钟（纳秒）
+    """
+
+    def __init__(self, offsets, syscall_cost=SIM_SYSCALL_COST, record=True, capacity=1 << 16,
+                 clock=time.monotonic_ns):
+        self.offsets = list(offsets)
+        self.clock = clock
+        self.values = [0] * len(self.offsets)
+        self.syscall_cost = syscall_cost
+        self.record = record
+        self.consumer = None
+        self.get_calls = 0
+        self.set_calls = 0
+        self._times = np.empty(capacity, np.int64)
+        self._history = np.empty((capacity, len(self.offsets)), np.uint8)
+        self._count = 0
+
+    def _syscall(self):
+        if self.syscall_cost:
+            end = time.perf_counter() + self.syscall_cost
+            while time.perf_counter() < end:
+                pass
+
+    def _append(self, values):
+        if self._count == len(self._times):
+            self._times = np.concatenate([self._times, np.empty_like(self._times)])
+            self._history = np.concatenate([self._history, np.empty_like(self._history)])
+        self._times[self._count] = self.clock()
+        self._history[self._count] = values
+        self._count += 1
+
+    def request(self, consumer=None, type=LINE_REQ_DIR_OUT, default_vals=None, **kwargs):
+        self.consumer = consumer
+        if default_vals is not None:
+            self.values[:] = default_vals
+            if self.record:
+                self._append(self.values)
+
+    def release(self):
+        self.consumer = None
+
+    def to_list(self):
+        return [SimLine(self, i) for i in range(len(self.offsets))]
+
+    def get_values(self):
+        self.get_calls += 1
+        self._syscall()
+        return list(self.values)
+
+    def set_values(self, values):
+        self.set_calls += 1
+        self._syscall()
+        self.values[:] = values
+        if self.record:
+            self._append(values)
+
+    def history(self):
+        """返回 (时间戳 ns, 电平)，形状 (N,) 和 (N, 引脚数)。"""
+        return self._times[:self._count], self._history[:self._count]
+
+    def clear_history(self):
+        self._count = 0
+
+
+class SimLine:
+    """模拟 gpiod v1 的单条 Line，电平变化记录在所属的 SimLines 中。"""
+
+    def __init__(self, bulk, index):
+        self.bulk = bulk
+        self.index = index
+
+    def offset(self):
+        return self.bulk.offsets[self.index]
+
+    def request(self, consumer=None, type=LINE_REQ_DIR_OUT, default_val=0, **kwargs):
+        self.bulk.consumer = consumer
+        self.bulk.values[self.index] = default_val
+
+    def release(self):
+        self.bulk.release()
+
+    def get_value(self):
+        return self.bulk.get_values()[self.index]
+
+    def set_value(self, value):
+        values = list(self.bulk.values)
+        values[self.index] = value
+        self.bulk.set_values(values)
+
+
+class SimChip:
+    """模拟 gpiod v1 的 Chip。requested 保存所有申请过的线路，便于事后分析。"""
+
+    def __init__(self, name=config.GPIO_CHIP, syscall_cost=SIM_SYSCALL_COST):
+        self.name = name
+        self.syscall_cost = syscall_cost
+        self.requested = []
+
+    def get_lines(self, offsets):
+        lines = SimLines(offsets, self.syscall_cost)
+        self.requested.append(lines)
+        return lines
+
+    def get_line(self, offset):
+        return self.get_lines([offset]).to_list()[0]
+
+    def close(self):
+        pass
+
+
+sim = types.SimpleNamespace(
+    Chip=SimChip,
+    LINE_REQ_DIR_IN=LINE_REQ_DIR_IN,
+    LINE_REQ_DIR_OUT=LINE_REQ_DIR_OUT,
+)
+
+
+def is_v1(module):
+    """module 是否提供 gpiod v1 接口（Chip.get_lines）。"""
+    return hasattr(module, 'Chip') and hasattr(module.Chip, 'get_lines')
+
+
+def load(backend=config.GPIO_BACKEND):
+    """按名称返回 gpiod 模块或模拟后端；安装的 gpiod 不是 v1 接口时抛出 ImportError。"""
+    if backend == 'sim':
+        return sim
+    try:
+        import gpiod as real
+    except ImportError:
+        if backend == 'gpiod':
+            raise
+        return sim
+    if not is_v1(real):
+        raise ImportError(
+            f"gpiod {getattr(real, '__version__', '')} 不是 v1 接口（没有 Chip.get_lines），"
+            f"本项目按 libgpiod v1 编写：请安装 v1 的 Python 绑定（树莓派上为 python3-libgpiod），"
+            f"或在 config.py 中设置 GPIO_BACKEND = 'sim'")
+    return real
+
+
+gpiod = load()
+SIMULATED = gpiod is sim
+
+
+# --- 转子位置还原 ---
+
+# 4 个引脚电平编码为 0-15，对应 RIGHTWARD_SEQ 中的相位，其余（含全部断电）为 -1
+_PIN_WEIGHTS = np.array([8, 4, 2, 1], np.uint8)
+_PHASE_OF_CODE = np.full(16, -1, np.int8)
+for _phase, _pins in enumerate(RIGHTWARD_SEQ):
+    _PHASE_OF_CODE[np.dot(_pins, _PIN_WEIGHTS)] = _phase
+
+
+@dataclass
+class ShaftTrace:
+    times: np.ndarray       # 每次相位变化的时间（秒，time.monotonic 时钟）
+    position: np.ndarray    # 每次相位变化后的位置（拍），以第一次通电时的相位为 0
+    velocity: np.ndarray    # 相邻两次相位变化之间的平均速度（拍/秒），长度比 times 少 1
+    jumps: int              # 相位一次跳两相的次数（方向不确定，按失步处理）
+    overspeed: int          # 间隔短于 1 / max_rate 的拍数（电机可能跟不上）
+
+    @property
+    def steps(self):
+        return len(self.position) - 1
+
+    @property
+    def peak_rate(self):
+        return float(np.abs(self.velocity).max()) if len(self.velocity) else 0.0
+
+    @property
+    def missed(self):
+        """估计的失步拍数上限。"""
+        return 2 * self.jumps + self.overspeed
+
+    def __str__(self):
+        duration = self.times[-1] - self.times[0] if len(self.times) > 1 else 0.0
+        rate = self.steps / duration if duration > 0 else 0.0
+        return (f"{self.steps} phases to position {int(self.position[-1]) if len(self.position) else 0} "
+                f"in {duration * 1000:.2f} ms, mean {rate:.0f}/s, peak {self.peak_rate:.0f}/s, "
+                f"jumps {self.jumps}, overspeed {self.overspeed}")
+
+
+def reconstruct(times_ns, values, offset=0, max_rate=None):
+    """
+    由 set_values 记录还原 offset 开始的 4 个引脚所驱动的电机。
+    max_rate: 电机能跟上的最高速度（拍/秒），None 表示不检查超速
+    """
+    codes = values[:, offset:offset + PINS_PER_MOTOR] @ _PIN_WEIGHTS
+    phase = _PHASE_OF_CODE[codes].astype(np.int64)
+    energized = phase >= 0
+    times = np.asarray(times_ns)[energized] / 1e9
+    phase = phase[energized]
+    # 只保留相位真正变化的记录（其他电机的引脚变化不算）
+    changed = np.concatenate([[True], phase[1:] != phase[:-1]]) if len(phase) else np.zeros(0, bool)
+    times, phase = times[changed], phase[changed]
+
+    delta = np.diff(phase) % PHASES_PER_STEP
+    jumps = int(np.count_nonzero(delta == 2))
+    step = np.select([delta == 1, delta == 3], [1, -1], 0)
+    position = np.concatenate([[0], np.cumsum(step)])
+    intervals = np.diff(times)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        velocity = np.where(intervals > 0, step / intervals, 0.0)
+    overspeed = 0
+    if max_rate:
+        overspeed = int(np.count_nonzero((intervals < 1.0 / max_rate) & (step != 0)))
+    return ShaftTrace(times, position, velocity, jumps, overspeed)
+
+
+def analyze(lines, offsets=(0, PINS_PER_MOTOR), max_rate=None):
+    """对 SimLines 的记录逐个电机还原，返回 [ShaftTrace]。"""
+    times, values = lines.history()
+    return [reconstruct(times, values, offset, max_rate) for offset in offsets]
+
+
+if __name__ == '__main__':
+    from hardware.stepper_waveform import StepperWaveform
+    from hardware.step_scheduler import StepScheduler, HYBRID
+    from hardware.motion_profile import MotionProfile
+    from hardware.multi_axis import MultiAxisExecutor
+
+    print(f"backend: {'simulated' if SIMULATED else 'gpiod'}")
+    chip = SimChip()
+    lines = chip.get_lines([4, 14, 22, 23, 6, 12, 5, 27])
+    lines.request(consumer="sim_demo", type=LINE_REQ_DIR_OUT, default_vals=[0] * 8)
+    profile = MotionProfile()
+    executor = MultiAxisExecutor(StepperWaveform(lines, 8, StepScheduler(HYBRID)), profile=profile)
+    executor.move(3200, -1600)
+    print(executor.waveform.scheduler.last_stats)
+    for name, trace in zip(('x', 'y'), analyze(lines, max_rate=profile.v_max * 1.1)):
+        print(f"  {name}: {trace}")
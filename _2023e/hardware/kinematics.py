@@ -0,0 +1,66 @@
+# hardware/kinematics.py
+"""
+云台几何：电机步数 <-> 激光点在屏幕上的位置（mm）。
+
+水平（pan）轴竖直安装，俯仰（tilt）轴装在水平轴上，激光沿两轴交点射出。
+设转轴交点到屏幕的垂直距离为 distance，正对点为 (x0, y0)，
+水平角 θ、俯仰角 φ 时激光点为：
+    x = x0 + distance * tan(θ)
+    y = y0 + distance * tan(φ) / cos(θ)
+θ = pan0 + pan_sign * 步数 * 每步弧度，φ 同理。反解有闭式解，见 inverse()。
+
+步数单位与 Motor.rightward / Gimbal.move 相同（一步四拍）。
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+import config
+
+RADIANS_PER_STEP = 2 * math.pi / config.MOTOR_STEPS_PER_REV
+
+
+def angle_to_steps(angle):
+    """角度（度）-> 电机步数。"""
+    return int(angle / 360 * config.MOTOR_STEPS_PER_REV)
+
+
+@dataclass(frozen=True)
+class PanTilt:
+    x0: float                   # 转轴正对屏幕的点（mm）
+    y0: float
+    distance: float             # 转轴到屏幕的距离（mm）
+    pan0: float = 0.0           # 步数为 0 时的水平角（弧度）
+    tilt0: float = 0.0          # 步数为 0 时的俯仰角（弧度）
+    pan_sign: int = 1           # 电机正转时屏幕 x 增大为 1，否则为 -1
+    tilt_sign: int = 1          # 电机正转时屏幕 y 增大为 1，否则为 -1
+
+    # 参与拟合的参数，顺序与 params() 一致
+    FIT_FIELDS = ('x0', 'y0', 'distance', 'pan0', 'tilt0')
+
+    def params(self):
+        return np.array([getattr(self, name) for name in self.FIT_FIELDS], np.float64)
+
+    def with_params(self, params):
+        return PanTilt(*map(float, params), pan_sign=self.pan_sign, tilt_sign=self.tilt_sign)
+
+    def angles(self, pan_steps, tilt_steps):
+        pan = self.pan0 + self.pan_sign * RADIANS_PER_STEP * np.asarray(pan_steps, np.float64)
+        tilt = self.tilt0 + self.tilt_sign * RADIANS_PER_STEP * np.asarray(tilt_steps, np.float64)
+        return pan, tilt
+
+    def forward(self, pan_steps, tilt_steps):
+        """电机步数 -> 屏幕坐标（mm），支持数组。"""
+        pan, tilt = self.angles(pan_steps, tilt_steps)
+        x = self.x0 + self.distance * np.tan(pan)
+        y = self.y0 + self.distance * np.tan(tilt) / np.cos(pan)
+        return x, y
+
+    def inverse(self, x, y):
+        """屏幕坐标（mm）-> 电机步数（浮点数），支持数组。"""
+        pan = np.arctan((np.asarray(x, np.float64) - self.x0) / self.distance)
+        tilt = np.arctan((np.asarray(y, np.float64) - self.y0) * np.cos(pan) / self.distance)
+        pan_steps = (pan - self.pan0) / (self.pan_sign * RADIANS_PER_STEP)
+        tilt_steps = (tilt - self.tilt0) / (self.tilt_sign * RADIANS_PER_STEP)
+        return pan_steps, tilt_steps
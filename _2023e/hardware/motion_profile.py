@@ -0,0 +1,139 @@
+# hardware/motion_profile.py
+"""
+步进电机加减速曲线。
+
+固定的 delay 必须选得足够保守，电机才不会在起步时失步，长距离转动因此很慢。
+这里根据拍数、起步速度、最高速度和加速度生成每一拍的间隔时间表：
+先从起步速度加速到最高速度，匀速，再对称减速。结果是 NumPy 数组，
+按 (拍数, 曲线参数) 缓存，重复的运动不需要重新计算。
+
+速度单位为 拍/秒，加速度单位为 拍/秒²；Motor 中一个 step 等于四拍。
+"""
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+
+from hardware.stepper_waveform import PHASES_PER_STEP
+
+TRAPEZOID = 'trapezoid'  # 梯形：加速度恒定
+SCURVE = 'scurve'        # S 形：加速度从 0 平滑升到峰值再回到 0，冲击更小
+
+
+@dataclass(frozen=True)
+class MotionProfile:
+    kind: str = TRAPEZOID
+    v_start: float = 5000.0     # 起步速度，直接以该速度启动不会失步（需实测）
+    v_max: float = 40000.0      # 最高速度
+    accel: float = 400000.0     # 最大加速度
+
+
+def _trapezoid_ramp(v0, vp, a):
+    """梯形加速段：返回 (加速时间, 加速距离, 距离->时间 函数)。"""
+    t_acc = (vp - v0) / a
+    s_acc = (vp * vp - v0 * v0) / (2 * a)
+
+    def time_at(s):
+        return (np.sqrt(v0 * v0 + 2 * a * s) - v0) / a
+
+    return t_acc, s_acc, time_at
+
+
+def _scurve_ramp(v0, vp, a):
+    """
+    S 形加速段：加速度按 (1 - cos) 变化，峰值为 a。
+    位置的解析式不能直接求逆，先在时间上密集采样再插值。
+    """
+    dv = vp - v0
+    t_acc = 2 * dv / a
+    s_acc = (vp * vp - v0 * v0) / a
+    if t_acc <= 0:
+        return 0.0, 0.0, lambda s: s / vp
+
+    n_grid = max(256, int(s_acc) * 4)
+    t_grid = np.linspace(0.0, t_acc, n_grid)
+    w = 2 * np.pi / t_acc
+    s_grid = v0 * t_grid + dv * (t_grid ** 2 / (2 * t_acc) + (np.cos(w * t_grid) - 1) / (w * w * t_acc))
+
+    def time_at(s):
+        return np.interp(s, s_grid, t_grid)
+
+    return t_acc, s_acc, time_at
+
+
+def _peak_velocity(n, profile):
+    """拍数不够加速到 v_max 时，求三角形（无匀速段）曲线的峰值速度。"""
+    v0, a = profile.v_start, profile.accel
+    if profile.kind == TRAPEZOID:
+        vp = np.sqrt(v0 * v0 + a * n)
+    elif profile.kind == SCURVE:
+        vp = np.sqrt(v0 * v0 + a * n / 2)
+    else:
+        raise ValueError(f"unknown motion profile: {profile.kind}")
+    return max(v0, min(profile.v_max, vp))
+
+
+@functools.lru_cache(maxsize=64)
+def profile_intervals(n, profile):
+    """
+    返回长度为 n 的只读数组，第 k 个元素是第 k 拍到第 k+1 拍之间的时间（秒）。
+    """
+    if n <= 0:
+        # 结果被缓存、在调用方之间共享，空数组同样设为只读
+        intervals = np.zeros(0)
+        intervals.setflags(write=False)
+        return intervals
+    v0, a = profile.v_start, profile.accel
+    vp = _peak_velocity(n, profile)
+    if profile.kind == TRAPEZOID:
+        t_acc, s_acc, time_at = _trapezoid_ramp(v0, vp, a)
+    else:
+        t_acc, s_acc, time_at = _scurve_ramp(v0, vp, a)
+    s_acc = min(s_acc, n / 2)
+    t_total = 2 * t_acc + (n - 2 * s_acc) / vp
+
+    # 每一拍的发出时刻：加速段 / 匀速段 / 减速段（与加速段对称）
+    s = np.arange(n + 1, dtype=np.float64)
+    t = np.empty_like(s)
+    accel_part = s <= s_acc
+    decel_part = s >= n - s_acc
+    cruise_part = ~(accel_part | decel_part)
+    t[accel_part] = time_at(s[accel_part])
+    t[cruise_part] = t_acc + (s[cruise_part] - s_acc) / vp
+    t[decel_part] = t_total - time_at(n - s[decel_part])
+
+    intervals = np.diff(t)
+    intervals.setflags(write=False)
+    return intervals
+
+
+def move_time(n, profile):
+    """按曲线走完 n 拍所需的时间（秒）。"""
+    return float(profile_intervals(n, profile).sum())
+
+
+def braking_intervals(v, profile):
+    """
+    从速度 v（拍/秒）匀减速到 v_start 的每拍间隔（秒），第一拍的间隔约为 1 / v。
+    用于运动被打断时从当前速度刹车；S 形曲线的峰值加速度同样是 accel，统一按梯形减速。
+    减速距离取整到整拍，减速度略小于 accel，最后一拍正好回到 v_start。
+    v 不高于 v_start 时返回空数组（可以直接停下）。
+    """
+    v0 = profile.v_start
+    if v <= v0:
+        return np.zeros(0)
+    n = int(np.ceil((v * v - v0 * v0) / (2 * profile.accel)))
+    a = (v * v - v0 * v0) / (2 * n)
+    s = np.arange(n + 1, dtype=np.float64)
+    t = (v - np.sqrt(np.maximum(v * v - 2 * a * s, v0 * v0))) / a
+    return np.diff(t)
+
+
+if __name__ == '__main__':
+    delay = 0.0001
+    for angle in (10, 90, 360):
+        n = int(angle / 360 * 6400) * PHASES_PER_STEP
+        print(f"{angle:4d} deg, {n} phases: fixed delay {n * delay:.3f}s", end='')
+        for kind in (TRAPEZOID, SCURVE):
+            print(f", {kind} {move_time(n, MotionProfile(kind)):.3f}s", end='')
+        print()
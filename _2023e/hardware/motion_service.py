@@ -0,0 +1,292 @@
+# hardware/motion_service.py
+"""
+后台运动线程。
+
+Motor / main.py 中的运动函数都会阻塞到所有拍输出完毕，视觉循环如果直接调用，
+摄像头在整个运动期间都会停下来。MotionService 在单独的线程里独占电机引脚，
+调用方只是把 move / retarget / stop 命令放进队列，立即返回。
+新命令到达时正在执行的运动会在几拍之内被打断，先沿原来的路线从当前速度减速到起步速度
+（MultiAxisExecutor.brake），再从当前位置重新规划到新的目标。
+jog 命令给出各轴速度（step/s），服务线程按 JOG_CHUNK 一段一段匀速输出，
+直到收到新命令，适合视觉伺服这类按速度控制的闭环。相邻两段之间各轴速度的变化不超过
+accel * 时长，也不超过起步速度（与 trajectory 中拐角处速度突变的限制相同），
+速度指令从正到负跳变时电机也是先减速再反向；退出速度模式时同样先减速到 0。
+follow 命令沿 hardware.trajectory 规划好的轨迹连续运动（先移到起点），同样可以被新命令打断。
+
+对外接口的单位是 step（与 Motor 相同，一个 step 等于四拍），内部按拍计算。
+每次输出（一段连续的节拍）记录在 bursts 中，用来测量命令下发到电机动作的延迟。
+"""
+import collections
+import queue
+import threading
+import time
+
+import numpy as np
+
+from hardware.stepper_waveform import PHASES_PER_STEP
+
+MOVE = 'move'          # 相对当前目标移动
+RETARGET = 'retarget'  # 设置新的绝对目标
+STOP = 'stop'          # 停在当前位置并断电
+JOG = 'jog'            # 按给定速度持续运动
+PATH = 'path'          # 沿规划好的轨迹运动
+SHUTDOWN = 'shutdown'
+
+# command: 开始输出时服务线程已取出的命令条数（与 submitted 对应，这段输出反映了前 command 条命令）；
+# start / end: 第一拍之前、最后一拍之后的时刻（time.monotonic）；ticks: 实际输出的节拍数
+Burst = collections.namedtuple('Burst', ['command', 'start', 'end', 'ticks'])
+
+# 速度模式下每段匀速运动的时长（秒）；新命令最多等 ABORT_CHECK_TICKS 拍生效
+JOG_CHUNK = 0.02
+
+
+class MotionService:
+    """
+    executor: MultiAxisExecutor，服务启动后只能由服务线程使用
+    hold:     到达目标后是否保持通电（锁住位置）；False 时与原来的 stop() 一样断电
+    clock:    速度模式计算每段时长用的时钟
+    """
+
+    def __init__(self, executor, hold=False, clock=time.monotonic):
+        self.executor = executor
+        self.hold = hold
+        self.clock = clock
+        self._commands = queue.Queue()
+        self._pending = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+        self._target = executor.position.copy()
+        self._velocity = None       # 速度模式下各轴的目标速度（拍/秒），None 表示位置模式
+        self._rate = np.zeros(len(executor.offsets))    # 速度模式下各轴当前输出的速度（拍/秒）
+        self._remainder = np.zeros(len(executor.offsets))
+        self._jog_time = None
+        self._path = None           # 等待执行或正在执行的 Trajectory
+        self.submitted = 0          # 调用方已提交的命令条数
+        self.applied = 0            # 服务线程已取出的命令条数
+        self.bursts = collections.deque(maxlen=256)
+        # 速度上限：有加减速曲线时取其最高速度，否则取固定 delay 对应的速度
+        profile = executor.profile
+        self.max_rate = profile.v_max if profile is not None else 1.0 / executor.delay
+        self._thread = None
+
+    # --- 调用方接口（均不阻塞） ---
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="motion-service", daemon=True)
+            self._thread.start()
+        return self
+
+    def move(self, *steps):
+        """在当前目标的基础上相对移动。"""
+        self._submit(MOVE, steps)
+
+    def retarget(self, *steps):
+        """设置新的绝对目标位置，打断正在进行的运动。"""
+        self._submit(RETARGET, steps)
+
+    def jog(self, *rates):
+        """各轴按给定速度（step/s，带符号）持续运动，直到下一条命令；全为 0 时停止。"""
+        self._submit(JOG, rates)
+
+    def follow(self, trajectory):
+        """沿 trajectory（hardware.trajectory.Trajectory）运动，打断正在进行的运动。"""
+        self._put(PATH, trajectory)
+
+    def stop(self):
+        """立即停在当前位置。"""
+        self._submit(STOP, ())
+
+    def shutdown(self, timeout=1.0):
+        """停止服务线程并让电机断电。"""
+        if self._thread is not None:
+            self._submit(SHUTDOWN, ())
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wait_idle(self, timeout=None):
+        """等待所有命令执行完毕，超时返回 False。"""
+        return self._idle.wait(timeout)
+
+    @property
+    def busy(self):
+        return not self._idle.is_set()
+
+    @property
+    def position(self):
+        """各轴当前位置（step），运动中也会实时更新。"""
+        return self.executor.live_position() / PHASES_PER_STEP
+
+    @property
+    def target(self):
+        """各轴目标位置（step）。"""
+        return self._target / PHASES_PER_STEP
+
+    # --- 服务线程 ---
+
+    def _submit(self, kind, steps):
+        self._put(kind, np.rint(np.asarray(steps, dtype=np.float64) * PHASES_PER_STEP).astype(np.int64))
+
+    def _put(self, kind, payload):
+        with self._lock:
+            self.submitted += 1
+            self._idle.clear()
+            self._commands.put((kind, payload))
+            self._pending.set()
+
+    def _apply_commands(self):
+        """取出队列中所有命令，更新目标位置。收到 SHUTDOWN 时返回 False。"""
+        self._pending.clear()
+        while True:
+            try:
+                kind, phases = self._commands.get_nowait()
+            except queue.Empty:
+                return True
+            self.applied += 1
+            if kind != JOG and self._velocity is not None:
+                # 退出速度模式：先减速到 0，再从当前位置开始按位置命令运动
+                self._stop_jog()
+            if self._path is not None:
+                # 打断轨迹，从当前位置开始执行新命令
+                self._path = None
+                self._target = self.executor.position.copy()
+            if kind == MOVE:
+                self._target = self._target + phases
+            elif kind == RETARGET:
+                self._target = phases
+            elif kind == STOP:
+                self._target = self.executor.position.copy()
+                self.executor.release()
+            elif kind == JOG:
+                self._target = self.executor.position.copy()
+                if phases.any() or self._velocity is not None:
+                    # 全为 0 时保持速度模式，由 _jog 减速到 0 后退出
+                    self._velocity = np.clip(phases, -self.max_rate, self.max_rate).astype(np.float64)
+            elif kind == PATH:
+                # PATH 命令携带的是 Trajectory 而不是拍数
+                self._path = phases
+                self._target = phases.end.copy()
+            elif kind == SHUTDOWN:
+                return False
+
+    def _run(self):
+        executor = self.executor
+        while True:
+            if not self._apply_commands():
+                break
+            if self._velocity is not None:
+                self._jog()
+                continue
+            if self._path is not None:
+                self._follow()
+                continue
+            delta = self._target - executor.position
+            if delta.any():
+                # 有新命令时 execute 会在几拍内返回，回到循环开头重新规划
+                self._execute(executor.plan(*delta))
+                continue
+
+            if not self.hold:
+                executor.release()
+            with self._lock:
+                if not self._pending.is_set():
+                    self._idle.set()
+            self._pending.wait()
+
+        executor.release()
+        self._idle.set()
+
+    def _execute(self, plan, brake=True, abortable=True):
+        """
+        输出一段计划，有新命令时在几拍内停止，并记录这段输出的时间。
+        brake 为 True 时被打断的计划先沿原路线减速到起步速度再返回（速度模式自己限制速度变化，不需要）；
+        abortable 为 False 时不检查新命令。
+        """
+        command = self.applied
+        start = time.monotonic()
+        done = self.executor.execute(plan, self._pending.is_set if abortable else None)
+        if brake and done < plan.ticks:
+            done += self.executor.brake(plan, done)
+        if done:
+            self.bursts.append(Burst(command, start, time.monotonic(), done))
+        return done
+
+    def _follow(self):
+        """先按加减速曲线移到轨迹起点，再连续输出整条轨迹；被新命令打断时返回，由 _apply_commands 处理。"""
+        executor = self.executor
+        path = self._path
+        delta = path.start - executor.position
+        if delta.any():
+            self._execute(executor.plan(*delta))
+            return
+        self._execute(executor.plan_positions(path.positions, path.intervals))
+        if not self._pending.is_set():
+            self._path = None
+            self._target = executor.position.copy()
+
+    def _max_change(self, elapsed):
+        """一段时长为 elapsed 的速度模式输出与上一段之间，每轴允许的速度变化（拍/秒）。"""
+        profile = self.executor.profile
+        if profile is None:
+            return np.inf   # 固定 delay 的速度本身就能直接启停
+        return min(profile.accel * elapsed, profile.v_start)
+
+    def _jog(self, abortable=True):
+        """
+        速度模式：当前速度向目标速度靠近一步（变化量按距上一段实际经过的时间计算），
+        再输出 JOG_CHUNK 时长的一段匀速运动，不足一拍的部分留到下一段。
+        一段被新命令打断时没有走完的拍数直接丢弃，下一段按新的速度输出，输出速度始终等于当前速度。
+        目标速度为 0 且当前速度每段不足一拍时退出速度模式。
+        abortable 为 False 时这一段不响应新命令（退出速度模式时的减速）。
+        """
+        executor = self.executor
+        now = self.clock()
+        elapsed = JOG_CHUNK if self._jog_time is None else min(now - self._jog_time, JOG_CHUNK)
+        self._jog_time = now
+        change = self._max_change(elapsed)
+        self._rate += np.clip(self._velocity - self._rate, -change, change)
+        if not self._velocity.any() and np.abs(self._rate).max() * JOG_CHUNK < 1:
+            self._velocity = None
+            self._jog_time = None
+            self._rate[:] = 0
+            self._remainder[:] = 0
+            self._target = executor.position.copy()
+            return
+        self._remainder += self._rate * JOG_CHUNK
+        deltas = np.trunc(self._remainder).astype(np.int64)
+        self._remainder -= deltas
+        if not deltas.any():
+            if abortable:
+                self._pending.wait(JOG_CHUNK)
+            else:
+                time.sleep(JOG_CHUNK)
+            return
+        self._execute(executor.plan(*deltas, duration=JOG_CHUNK), brake=False, abortable=abortable)
+        self._target = executor.position.copy()
+
+    def _stop_jog(self):
+        """按速度模式的限制减速到 0（期间不响应新命令），然后回到位置模式。"""
+        self._velocity = np.zeros_like(self._rate)
+        while self._velocity is not None:
+            self._jog(abortable=False)
+
+
+if __name__ == '__main__':
+    import time
+    from hardware.stepper_waveform import StepperWaveform
+    from hardware.gpio_backend import SimLines
+    from hardware.multi_axis import MultiAxisExecutor
+
+    executor = MultiAxisExecutor(StepperWaveform(SimLines(range(8), syscall_cost=0.0, record=False), 8))
+    service = MotionService(executor).start()
+
+    t0 = time.perf_counter()
+    service.move(1600, 800)
+    print(f"move() returned after {(time.perf_counter() - t0) * 1e6:.0f} us")
+    time.sleep(0.1)
+    print(f"position after 0.1s: {service.position}, retarget to (0, 0)")
+    service.retarget(0, 0)
+    service.wait_idle()
+    print(f"idle at {service.position} after {time.perf_counter() - t0:.3f}s")
+    service.shutdown()
@@ -0,0 +1,172 @@
+# hardware/multi_axis.py
+"""
+多轴协同运动。
+
+原来 X、Y 两个电机依次运动，斜向移动的时间是两轴之和。这里把所有轴的拍
+放在同一条时间线上：步数最多的轴每个节拍走一拍，其余轴按 Bresenham 方式
+均匀插入，每个节拍把所有轴的引脚合成一个列表，只调用一次 set_values()。
+斜向移动的时间因此等于最长轴的时间。
+
+位置以“拍”为单位（Motor 中一个 step 等于四拍），轴在位置 p 时通电相位为
+RIGHTWARD_SEQ[p % 4]，向右走一拍 p + 1，向左走一拍 p - 1。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from hardware.stepper_waveform import RIGHTWARD_SEQ, PINS_PER_MOTOR, PHASES_PER_STEP
+from hardware.motion_profile import braking_intervals, profile_intervals
+
+PHASE_TABLE = np.array(RIGHTWARD_SEQ, dtype=np.uint8)
+
+# 每隔多少拍检查一次中止条件
+ABORT_CHECK_TICKS = 16
+
+
+@dataclass
+class MovePlan:
+    frames: list            # 每个节拍的完整引脚电平
+    intervals: list         # 每个节拍之后的等待时间（秒）
+    positions: np.ndarray   # 每个节拍之后各轴的绝对位置，形状 (节拍数, 轴数)
+
+    @property
+    def ticks(self):
+        return len(self.frames)
+
+
+class MultiAxisExecutor:
+    """
+    waveform: 持有所有轴引脚的 StepperWaveform（例如 8 个引脚、两个电机）
+    offsets:  每个轴在引脚列表中的起始位置
+    """
+
+    def __init__(self, waveform, offsets=(0, PINS_PER_MOTOR), delay=0.0001, profile=None):
+        self.waveform = waveform
+        self.offsets = tuple(offsets)
+        self.delay = delay
+        self.profile = profile
+        self.position = np.zeros(len(self.offsets), dtype=np.int64)
+        # 正在执行的计划和已完成的节拍数，供其他线程读取实时位置
+        self._active_plan = None
+        self._active_done = 0
+
+    def plan(self, *deltas, duration=None):
+        """
+        为各轴的相对拍数生成一次协同运动。
+        duration 不为空时节拍均匀分布在这段时间内（匀速），否则按加减速曲线或固定 delay。
+        """
+        deltas = np.asarray(deltas, dtype=np.int64)
+        if deltas.shape != (len(self.offsets),):
+            raise ValueError(f"expected {len(self.offsets)} axis deltas, got {deltas.shape}")
+        ticks = int(np.abs(deltas).max()) if deltas.size else 0
+        if ticks == 0:
+            return self.plan_positions(np.empty((0, len(self.offsets)), dtype=np.int64))
+
+        # 第 k 个节拍时各轴累计走过的拍数 floor(k * |d| / N)，等价于 Bresenham 插补
+        k = np.arange(1, ticks + 1, dtype=np.int64)[:, None]
+        counts = k * np.abs(deltas) // ticks
+        positions = self.position + np.sign(deltas) * counts
+        intervals = [duration / ticks] * ticks if duration is not None else None
+        return self.plan_positions(positions, intervals)
+
+    def plan_positions(self, positions, intervals=None):
+        """
+        根据每个节拍后各轴的绝对位置生成引脚电平表。
+        intervals 为空时按加减速曲线或固定 delay 计算。
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        ticks = len(positions)
+        frames = np.tile(np.asarray(self.waveform.state, dtype=np.uint8), (ticks, 1))
+        for axis, offset in enumerate(self.offsets):
+            frames[:, offset:offset + PINS_PER_MOTOR] = PHASE_TABLE[positions[:, axis] % PHASES_PER_STEP]
+
+        if intervals is None:
+            if self.profile is not None:
+                intervals = profile_intervals(ticks, self.profile).tolist()
+            else:
+                intervals = [self.delay] * ticks
+        return MovePlan(frames.tolist(), list(intervals), positions)
+
+    def execute(self, plan, should_abort=None):
+        """
+        按计划输出，每个节拍一次 set_values()。
+        should_abort 每 ABORT_CHECK_TICKS 拍调用一次，返回 True 时立即停止。
+        返回实际执行的节拍数。
+        """
+        set_values = self.waveform.lines.set_values
+        scheduler = self.waveform.scheduler
+        wait = scheduler.wait
+        done = 0
+        self._active_done = 0
+        self._active_plan = plan
+        scheduler.start()
+        for values, interval in zip(plan.frames, plan.intervals):
+            if should_abort is not None and done % ABORT_CHECK_TICKS == 0 and should_abort():
+                break
+            set_values(values)
+            done += 1
+            self._active_done = done
+            wait(interval)
+        scheduler.finish()
+
+        if done:
+            self.position = plan.positions[done - 1].copy()
+            self.waveform.state[:] = plan.frames[done - 1]
+        self._active_plan = None
+        return done
+
+    def brake(self, plan, done):
+        """
+        plan 执行到第 done 拍被打断后，沿计划剩下的节拍从当前速度减速到起步速度，
+        避免从最高速度直接停下或反向。加减速曲线和轨迹在任何位置剩下的拍数都足够减速。
+        没有加减速曲线（固定 delay）时不需要刹车。返回刹车输出的节拍数。
+        """
+        if self.profile is None or done == 0 or done >= plan.ticks:
+            return 0
+        intervals = braking_intervals(1.0 / plan.intervals[done - 1], self.profile)
+        n = min(len(intervals), plan.ticks - done)
+        if n == 0:
+            return 0
+        tail = MovePlan(plan.frames[done:done + n], intervals[:n].tolist(), plan.positions[done:done + n])
+        return self.execute(tail)
+
+    def live_position(self):
+        """运动过程中的实时位置（拍），可以在其他线程中调用。"""
+        plan, done = self._active_plan, self._active_done
+        if plan is None or done == 0:
+            return self.position.copy()
+        return plan.positions[done - 1].copy()
+
+    def move(self, *deltas):
+        """阻塞执行一次协同运动，返回节拍统计。"""
+        self.execute(self.plan(*deltas))
+        return self.waveform.scheduler.last_stats
+
+    def release(self):
+        """所有轴断电（引脚全部置低），位置保持不变。"""
+        values = list(self.waveform.state)
+        for offset in self.offsets:
+            values[offset:offset + PINS_PER_MOTOR] = [0] * PINS_PER_MOTOR
+        self.waveform.write(values)
+
+
+if __name__ == '__main__':
+    import time
+    from hardware.stepper_waveform import StepperWaveform
+    from hardware.gpio_backend import SimLines
+
+    # 两轴各转 90°：依次运动 vs 协同运动
+    steps = int(90 / 360 * 6400)
+    lines = SimLines(range(2 * PINS_PER_MOTOR), syscall_cost=0.0, record=False)
+    executor = MultiAxisExecutor(StepperWaveform(lines, 2 * PINS_PER_MOTOR))
+
+    t0 = time.perf_counter()
+    executor.move(steps * PHASES_PER_STEP, 0)
+    executor.move(0, steps * PHASES_PER_STEP)
+    serial = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    executor.move(steps * PHASES_PER_STEP, steps * PHASES_PER_STEP)
+    coordinated = time.perf_counter() - t0
+
+    print(f"serial {serial:.3f}s, coordinated {coordinated:.3f}s, position {executor.position}")
@@ -0,0 +1,140 @@
+# hardware/step_scheduler.py
+"""
+基于绝对截止时间的节拍调度器。
+
+time.sleep(delay) 在 Linux 上每次都会多睡几十微秒，误差逐拍累积，
+0.1ms 的节拍下实际步速会明显低于设定值。这里每一拍的截止时间都由
+起始时间加上累计间隔得到（单调时钟），单次睡过头不会影响后面的节拍；
+hybrid 模式先睡到截止时间前一小段，再忙等到截止时间。
+"""
+import math
+import time
+from dataclasses import dataclass
+
+SLEEP = 'sleep'    # 只用 time.sleep，按截止时间计算剩余时间
+HYBRID = 'hybrid'  # 先 sleep，剩余 spin_margin 以内忙等
+SPIN = 'spin'      # 全程忙等，最准但占满一个核
+
+
+@dataclass
+class MoveStats:
+    """一次运动的节拍统计，时间单位为秒。"""
+    ticks: int = 0
+    planned_time: float = 0.0     # 按指令间隔应耗时
+    actual_time: float = 0.0      # 实际耗时
+    mean_lateness: float = 0.0    # 平均迟到时间（抖动）
+    max_lateness: float = 0.0
+    std_lateness: float = 0.0
+    overruns: int = 0             # 迟到超过一个节拍间隔的次数
+
+    @property
+    def commanded_rate(self):
+        """指令节拍频率（拍/秒）。"""
+        return self.ticks / self.planned_time if self.planned_time > 0 else 0.0
+
+    @property
+    def achieved_rate(self):
+        """实际节拍频率（拍/秒）。"""
+        return self.ticks / self.actual_time if self.actual_time > 0 else 0.0
+
+    def __str__(self):
+        return (f"{self.ticks} ticks, commanded {self.commanded_rate:.0f}/s, "
+                f"achieved {self.achieved_rate:.0f}/s, "
+                f"jitter mean {self.mean_lateness * 1e6:.1f}us "
+                f"max {self.max_lateness * 1e6:.1f}us, overruns {self.overruns}")
+
+
+class StepScheduler:
+    """
+    用法：
+        scheduler.start()
+        for values in frames:
+            lines.set_values(values)
+            scheduler.wait(interval)
+        stats = scheduler.finish()
+    """
+
+    def __init__(self, mode=HYBRID, spin_margin=0.0002, clock=time.perf_counter):
+        if mode not in (SLEEP, HYBRID, SPIN):
+            raise ValueError(f"unknown scheduler mode: {mode}")
+        self.mode = mode
+        self.spin_margin = spin_margin
+        self.clock = clock
+        self.last_stats = MoveStats()
+        self._start = 0.0
+        self._deadline = 0.0
+
+    def start(self):
+        """以当前时刻作为第 0 拍，清空统计。"""
+        self._start = self._deadline = self.clock()
+        self._ticks = 0
+        self._planned = 0.0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._max = 0.0
+        self._overruns = 0
+
+    def wait(self, interval):
+        """等待到下一拍的绝对截止时间，并记录迟到量。"""
+        clock = self.clock
+        self._deadline += interval
+        self._planned += interval
+        deadline = self._deadline
+
+        if self.mode == SLEEP:
+            remaining = deadline - clock()
+            if remaining > 0:
+                time.sleep(remaining)
+        elif self.mode == HYBRID:
+            remaining = deadline - clock() - self.spin_margin
+            if remaining > 0:
+                time.sleep(remaining)
+            while clock() < deadline:
+                pass
+        else:
+            while clock() < deadline:
+                pass
+
+        lateness = clock() - deadline
+        self._ticks += 1
+        self._sum += lateness
+        self._sum_sq += lateness * lateness
+        if lateness > self._max:
+            self._max = lateness
+        if lateness > interval:
+            # 迟到超过一整拍：从当前时刻重新对齐，避免之后连续补拍造成失步
+            self._overruns += 1
+            self._deadline = clock()
+
+    def finish(self):
+        """结束本次运动，返回 MoveStats。"""
+        n = self._ticks
+        stats = MoveStats(ticks=n, planned_time=self._planned,
+                          actual_time=self.clock() - self._start)
+        if n:
+            mean = self._sum / n
+            stats.mean_lateness = mean
+            stats.max_lateness = self._max
+            stats.std_lateness = math.sqrt(max(self._sum_sq / n - mean * mean, 0.0))
+            stats.overruns = self._overruns
+        self.last_stats = stats
+        return stats
+
+
+if __name__ == '__main__':
+    # 比较 time.sleep 累积误差和各调度模式，节拍间隔 0.1ms
+    interval = 0.0001
+    ticks = 4000
+
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        time.sleep(interval)
+    elapsed = time.perf_counter() - t0
+    print(f"plain sleep: commanded {1 / interval:.0f}/s, achieved {ticks / elapsed:.0f}/s")
+
+    for mode in (SLEEP, HYBRID, SPIN):
+        scheduler = StepScheduler(mode)
+        scheduler.start()
+        for _ in range(ticks):
+            scheduler.wait(interval)
+        print(f"{mode:6s}: {scheduler.finish()}")
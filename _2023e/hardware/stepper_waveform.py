@@ -0,0 +1,152 @@
+# hardware/stepper_waveform.py
+"""
+步进电机相序波形表。
+
+原来的 setStep 每一拍都要先 get_values() 再 set_values()，一拍两次系统调用。
+这里把 rightward/leftward 的相序预先展开成完整的引脚电平列表，引脚状态保存在内存里，
+每一拍只调用一次 set_values()。节拍由 StepScheduler 按绝对截止时间控制。
+"""
+import time
+
+from hardware.step_scheduler import StepScheduler
+
+# 四拍相序，顺序与原 rightward / leftward 中 setStep 的调用顺序一致
+RIGHTWARD_SEQ = ((1, 0, 1, 0), (0, 1, 1, 0), (0, 1, 0, 1), (1, 0, 0, 1))
+LEFTWARD_SEQ = tuple(reversed(RIGHTWARD_SEQ))
+
+RIGHTWARD = 'rightward'
+LEFTWARD = 'leftward'
+
+PHASE_SEQUENCES = {
+    RIGHTWARD: RIGHTWARD_SEQ,
+    LEFTWARD: LEFTWARD_SEQ,
+}
+
+PINS_PER_MOTOR = 4
+# 一个整步的拍数；各模块内部的位置、距离都以拍为单位，对外以步为单位
+PHASES_PER_STEP = len(RIGHTWARD_SEQ)
+
+
+class StepperWaveform:
+    """
+    持有一组 gpiod 线路以及它们当前电平的内存副本。
+
+    一组线路里可以放多个电机（例如 main.py 中两个电机共 8 个引脚），
+    用 offset 指定电机在线路中的起始位置。
+    """
+
+    def __init__(self, lines, n_pins=PINS_PER_MOTOR, scheduler=None):
+        self.lines = lines
+        self.state = [0] * n_pins
+        self.scheduler = scheduler if scheduler is not None else StepScheduler()
+        self._tables = {}
+
+    def write(self, values):
+        """整体写入所有引脚，并同步内存中的状态。"""
+        self.state[:] = values
+        self.lines.set_values(self.state)
+
+    def set_phase(self, offset, phase):
+        """只修改一个电机的四个引脚，其余引脚保持内存中的状态，一次写入。"""
+        self.state[offset:offset + PINS_PER_MOTOR] = phase
+        self.lines.set_values(self.state)
+
+    def table(self, direction, offset=0):
+        """
+        返回某个方向的完整引脚电平表（每拍一个列表）。
+
+        其他电机的引脚取当前内存状态，所以同一组表在其他引脚不变时可以反复使用。
+        """
+        others = tuple(self.state[:offset] + self.state[offset + PINS_PER_MOTOR:])
+        key = (direction, offset, others)
+        frames = self._tables.get(key)
+        if frames is None:
+            frames = []
+            for phase in PHASE_SEQUENCES[direction]:
+                values = list(self.state)
+                values[offset:offset + PINS_PER_MOTOR] = phase
+                frames.append(values)
+            self._tables[key] = frames
+        return frames
+
+    def run(self, direction, steps, delay, offset=0):
+        """
+        按预先展开的波形表输出 steps 个整步（每步四拍）。
+
+        delay 为每拍间隔（秒），也可以是长度为 steps * PHASES_PER_STEP 的间隔序列
+        （例如 motion_profile.profile_intervals 生成的加减速曲线）。
+        返回本次运动的 MoveStats；delay 为 0 时不等待（用于性能测试）。
+        """
+        frames = self.table(direction, offset)
+        set_values = self.lines.set_values
+        scheduler = self.scheduler
+        scheduler.start()
+        if hasattr(delay, '__len__'):
+            wait = scheduler.wait
+            intervals = delay.tolist() if hasattr(delay, 'tolist') else delay
+            for i, interval in enumerate(intervals):
+                set_values(frames[i & 3])
+                wait(interval)
+        elif delay:
+            wait = scheduler.wait
+            for _ in range(steps):
+                for values in frames:
+                    set_values(values)
+                    wait(delay)
+        else:
+            for _ in range(steps):
+                for values in frames:
+                    set_values(values)
+        # 内存状态停在最后一拍
+        if steps > 0:
+            self.state[:] = frames[-1]
+        return scheduler.finish()
+
+
+# --- 性能测试 ---
+
+def _legacy_rightward(lines, steps):
+    """原 Motor.setStep 的写法：每拍 get_values + set_values。"""
+    def set_step(w1, w2, w3, w4):
+        current_values = lines.get_values()
+        current_values[0] = w1
+        current_values[1] = w2
+        current_values[2] = w3
+        current_values[3] = w4
+        lines.set_values(current_values)
+
+    for _ in range(steps):
+        set_step(1, 0, 1, 0)
+        set_step(0, 1, 1, 0)
+        set_step(0, 1, 0, 1)
+        set_step(1, 0, 0, 1)
+
+
+def benchmark(steps=6400, n_pins=8, syscall_cost=5e-6):
+    """
+    在模拟线路（gpio_backend.SimLines）上比较原写法和波形表写法，delay 取 0，只测软件开销。
+    返回 {名称: 每秒步数}。
+    """
+    from hardware.gpio_backend import SimLines
+
+    results = {}
+
+    lines = SimLines(range(n_pins), syscall_cost, record=False)
+    t0 = time.perf_counter()
+    _legacy_rightward(lines, steps)
+    results['legacy get+set'] = steps / (time.perf_counter() - t0)
+
+    lines = SimLines(range(n_pins), syscall_cost, record=False)
+    waveform = StepperWaveform(lines, n_pins)
+    t0 = time.perf_counter()
+    waveform.run(RIGHTWARD, steps, 0)
+    results['waveform table'] = steps / (time.perf_counter() - t0)
+
+    return results
+
+
+if __name__ == '__main__':
+    for cost in (0.0, 5e-6, 20e-6):
+        print(f"syscall cost = {cost * 1e6:.0f} us")
+        for name, rate in benchmark(syscall_cost=cost).items():
+            print(f"  {name:16s}: {rate:10.0f} steps/s")
@@ -0,0 +1,214 @@
+# hardware/trajectory.py
+"""
+沿折线连续运动（描屏幕边框、任意折线）。
+
+Motor.loop 只能来回转一次，按折线的每一段分别调用 move() 时每段都要从起步速度
+加速、再减速到停，一圈的时间大部分耗在启停上。这里把整条折线规划成一条连续的
+节拍序列，一次交给 MultiAxisExecutor.plan_positions / execute 输出：
+
+    1. 按固定弧长（屏幕 mm）重新采样折线，保留所有顶点
+    2. 每个采样点换算成两轴的步数（Calibration.screen_to_steps 或 PanTilt.inverse），再换算成拍
+    3. 速度规划：速度以“节拍/秒”计（两轴中走得多的一轴的拍速，所以不超过 v_max 就不会有轴超速）；
+       拐角处两轴速度的突变不超过起步速度 v_start，连续转弯的向心加速度不超过 accel；
+       再做一遍正向、一遍反向的加速度限制，起点和终点速度为 v_start
+    4. 每个轴的位置在两个采样点之间线性变化，位置跨过半拍时发出一拍，
+       相隔不到 1 / v_max 的拍合并为一个节拍（节拍间隔不小于 1 / v_max）
+
+一圈的时间因此只受电机的最高速度和加速度限制。单位与 multi_axis 相同（拍，一步四拍）。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+import config
+from hardware.motion_profile import MotionProfile, move_time
+from hardware.stepper_waveform import PHASES_PER_STEP
+
+
+@dataclass
+class Trajectory:
+    start: np.ndarray       # 起点各轴的位置（拍）
+    positions: np.ndarray   # 每个节拍之后各轴的绝对位置（拍），形状 (节拍数, 轴数)
+    intervals: np.ndarray   # 每个节拍之后的等待时间（秒）
+
+    @property
+    def ticks(self):
+        return len(self.positions)
+
+    @property
+    def end(self):
+        return self.positions[-1] if len(self.positions) else self.start
+
+    @property
+    def duration(self):
+        return float(self.intervals.sum())
+
+
+def border_polyline(width=config.SCREEN_STD_WIDTH, height=config.SCREEN_STD_HEIGHT, inset=0.0):
+    """屏幕边框（mm），从左上角顺时针，首尾不重复（按 closed=True 使用）。"""
+    return np.array([[inset, inset], [width - inset, inset],
+                     [width - inset, height - inset], [inset, height - inset]], np.float64)
+
+
+def resample(points, spacing, closed=False):
+    """
+    按不超过 spacing 的弧长重新采样折线，每一段等分，顶点保留。
+    closed 为 True 时最后回到第一个点。返回 (M, 2)。
+    """
+    points = np.asarray(points, np.float64).reshape(-1, 2)
+    if closed:
+        points = np.vstack([points, points[:1]])
+    result = [points[:1]]
+    for a, b in zip(points[:-1], points[1:]):
+        n = max(int(np.ceil(np.hypot(*(b - a)) / spacing)), 1)
+        f = np.arange(1, n + 1)[:, None] / n
+        result.append(a + (b - a) * f)
+    return np.vstack(result)
+
+
+def speed_limits(path, profile):
+    """
+    path: (M, 轴数) 采样点（拍，浮点数）。返回每个采样点的速度（节拍/秒）和每一段的长度（节拍）。
+    """
+    d = np.diff(path, axis=0)
+    length = np.abs(d).max(axis=1)
+    u = d / length[:, None]                         # 每拍最多走一拍的方向向量
+    v_start, v_max, accel = profile.v_start, profile.v_max, profile.accel
+
+    limit = np.full(len(path), v_max)
+    turn = np.abs(np.diff(u, axis=0)).max(axis=1)   # 拐点处各轴速度变化 / 速度
+    with np.errstate(divide='ignore'):
+        jump = v_start / turn                       # 速度突变不超过起步速度
+        curve = np.sqrt(accel * (length[:-1] + length[1:]) / 2 / turn)    # 连续转弯
+    # 单独一个拐角总是可以按起步速度通过；连续的小角度转弯按向心加速度限制
+    limit[1:-1] = np.minimum(np.maximum(np.minimum(jump, curve), np.minimum(jump, v_start)), v_max)
+    limit[0] = limit[-1] = v_start
+
+    v = limit.copy()
+    for i in range(len(length)):
+        v[i + 1] = min(v[i + 1], np.sqrt(v[i] ** 2 + 2 * accel * length[i]))
+    for i in range(len(length) - 1, -1, -1):
+        v[i] = min(v[i], np.sqrt(v[i + 1] ** 2 + 2 * accel * length[i]))
+    return v, length
+
+
+def plan_path(path, profile=MotionProfile()):
+    """把 (M, 轴数) 的采样点（拍，浮点数）规划成 Trajectory。"""
+    path = np.asarray(path, np.float64)
+    # 去掉长度为 0 的段
+    keep = np.concatenate([[True], np.abs(np.diff(path, axis=0)).max(axis=1) > 1e-9])
+    path = path[keep]
+    start = np.floor(path[0] + 0.5).astype(np.int64)
+    if len(path) < 2:
+        return Trajectory(start, np.empty((0, len(start)), np.int64), np.zeros(0))
+
+    v, length = speed_limits(path, profile)
+    times = np.concatenate([[0.0], np.cumsum(2 * length / (v[:-1] + v[1:]))])
+
+    # 每个轴的位置跨过半拍的时刻
+    event_times, event_axes, event_dirs = [], [], []
+    for axis in range(path.shape[1]):
+        p = path[:, axis]
+        q = np.floor(p + 0.5).astype(np.int64)
+        counts = np.abs(np.diff(q))
+        seg = np.repeat(np.arange(len(counts)), counts)
+        k = np.arange(len(seg)) - np.repeat(np.cumsum(counts) - counts, counts)
+        direction = np.sign(np.diff(q))[seg]
+        level = q[seg] + direction * (k + 0.5)
+        frac = (level - p[seg]) / (p[seg + 1] - p[seg])
+        event_times.append(times[seg] + frac * (times[seg + 1] - times[seg]))
+        event_axes.append(np.full(len(seg), axis))
+        event_dirs.append(direction)
+    event_times = np.concatenate(event_times)
+    order = np.argsort(event_times, kind='stable')
+    event_times = event_times[order]
+    steps = np.zeros((len(order), path.shape[1]), np.int64)
+    steps[np.arange(len(order)), np.concatenate(event_axes)[order]] = np.concatenate(event_dirs)[order]
+    positions = start + np.cumsum(steps, axis=0)
+
+    # 按时间顺序分组：一个节拍从它的第一个事件开始、持续 1 / v_max，窗口内的事件都并入这个节拍。
+    # 同一轴两拍至少相隔 1 / v_max，所以每个窗口内每个轴至多走一拍，节拍间隔也不小于 1 / v_max
+    period = (1 - 1e-9) / profile.v_max
+    new_tick = np.zeros(len(event_times), bool)
+    tick_start = -np.inf
+    for i, t in enumerate(event_times.tolist()):
+        if t >= tick_start + period:
+            new_tick[i] = True
+            tick_start = t
+    last_of_tick = np.concatenate([new_tick[1:], [True]])
+    positions = positions[last_of_tick]
+    tick_times = event_times[new_tick]
+    intervals = np.append(np.diff(tick_times), 0.0)
+    return Trajectory(start, positions, intervals)
+
+
+def build(polyline, to_steps, profile=MotionProfile(), spacing=2.0, closed=False, laps=1):
+    """
+    polyline:  屏幕坐标折线（mm）
+    to_steps:  (x, y) -> (水平步数, 俯仰步数)，例如 Calibration.screen_to_steps、PanTilt.inverse
+    spacing:   重新采样的弧长（mm）
+    closed:    首尾相连；laps > 1 时连续走多圈，圈与圈之间不停
+    """
+    points = resample(polyline, spacing, closed)
+    if closed and laps > 1:
+        points = np.vstack([points] + [points[1:]] * (laps - 1))
+    steps = np.array([to_steps(x, y) for x, y in points], np.float64)
+    return plan_path(steps * PHASES_PER_STEP, profile)
+
+
+def segmented_time(polyline, to_steps, profile=MotionProfile(), closed=False):
+    """按顶点逐段启停（每段一次 move()）走完折线所需的时间，用于对比。"""
+    points = np.asarray(polyline, np.float64).reshape(-1, 2)
+    if closed:
+        points = np.vstack([points, points[:1]])
+    steps = np.rint(np.array([to_steps(x, y) for x, y in points], np.float64) * PHASES_PER_STEP)
+    return sum(move_time(int(n), profile) for n in np.abs(np.diff(steps, axis=0)).max(axis=1))
+
+
+def follow(executor, trajectory, should_abort=None):
+    """
+    阻塞执行：先按加减速曲线移到起点，再连续输出整条轨迹。返回轨迹部分实际执行的节拍数。
+    """
+    delta = trajectory.start - executor.position
+    if delta.any():
+        plan = executor.plan(*delta)
+        if executor.execute(plan, should_abort) < plan.ticks:
+            return 0
+    return executor.execute(executor.plan_positions(trajectory.positions, trajectory.intervals), should_abort)
+
+
+if __name__ == '__main__':
+    import time
+    from hardware.kinematics import PanTilt
+    from hardware.stepper_waveform import StepperWaveform
+    from hardware.step_scheduler import StepScheduler, HYBRID
+    from hardware.gpio_backend import SimLines, analyze
+    from hardware.multi_axis import MultiAxisExecutor
+
+    model = PanTilt(x0=250.0, y0=250.0, distance=1000.0, tilt_sign=-1)
+    profile = MotionProfile()
+    angles = np.linspace(0, 2 * np.pi, 360, endpoint=False)
+    shapes = {
+        'border': border_polyline(inset=10),
+        'circle': np.c_[250 + 150 * np.cos(angles), 250 + 150 * np.sin(angles)],
+    }
+    for name, polyline in shapes.items():
+        t0 = time.perf_counter()
+        trajectory = build(polyline, model.inverse, profile, closed=True)
+        planning = time.perf_counter() - t0
+        segmented = segmented_time(polyline, model.inverse, profile, closed=True)
+        print(f"{name:6s}: {len(polyline)} vertices, {trajectory.ticks} ticks, lap {trajectory.duration:.3f} s "
+              f"(start/stop per segment {segmented:.3f} s), planned in {planning * 1000:.1f} ms")
+
+    # 在模拟引脚上实际输出一圈边框，检查有没有跳相或超速
+    lines = SimLines(range(8), syscall_cost=0.0)
+    executor = MultiAxisExecutor(StepperWaveform(lines, 8, StepScheduler(HYBRID)), profile=profile)
+    trajectory = build(shapes['border'], model.inverse, profile, closed=True)
+    follow(executor, trajectory)
+    lines.clear_history()
+    t0 = time.perf_counter()
+    follow(executor, trajectory)
+    print(f"executed lap in {time.perf_counter() - t0:.3f} s, end {executor.position} (start {trajectory.start}), "
+          f"{executor.waveform.scheduler.last_stats}")
+    for axis, trace in zip('xy', analyze(lines, max_rate=profile.v_max * 1.1)):
+        print(f"  {axis}: {trace}")
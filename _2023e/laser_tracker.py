@@ -1,14 +1,21 @@
-import time
-import gpiod
-import cv2
-import numpy as np
+import config
+from hardware.gpio_backend import gpiod
+
+from vision.camera_config import CAPTURE
+from vision.capture import FrameGrabber
+from vision.roi_tracker import RoiTracker
+from vision.pipeline import RED, detector_pipeline
+from vision.predictor import KalmanPredictor
+from vision.display import Display, Mark
+from utils import profiling
+from utils.telemetry import Telemetry
 
 # --- 1. 全局硬件配置 ---
 
-# 确认GPIO控制器芯片名称
+# 确认GPIO控制器芯片名称（见 config.GPIO_CHIP）
 # - 树莓派 5: 'gpiochip4'
 # - 树莓派 4/3/2: 'gpiochip0'
-CHIP_NAME = 'gpiochip4'
+CHIP_NAME = config.GPIO_CHIP
 
 # 定义电机引脚 (BCM编号)
 PINS_MOTOR1 = [4, 14, 22, 23]  # [IN1, IN2, IN3, IN4]
@@ -59,14 +66,20 @@ def cleanup_gpio():
 
 # --- 3. 硬件控制函数 (激光和电机) ---
 
+def set_laser(value):
+    # 多条线路一起申请时没有单独的 set_value，读出所有电平后只改激光引脚
+    current_values = lines.get_values()
+    current_values[LASER_PIN_OFFSET] = value
+    lines.set_values(current_values)
+
 def laser_on():
     if lines:
-        lines.set_value(LASER_PIN_OFFSET, 1) # 设置激光引脚为高电平
+        set_laser(1) # 设置激光引脚为高电平
         print("Laser ON")
 
 def laser_off():
     if lines:
-        lines.set_value(LASER_PIN_OFFSET, 0) # 设置激光引脚为低电平
+        set_laser(0) # 设置激光引脚为低电平
         print("Laser OFF")
 
 def motors_off():
@@ -84,50 +97,30 @@ def motors_off():
 
 # --- 4. 视觉处理函数 ---
 
-def find_laser_dot(frame):
+# 红色光点检测流水线：HSV 转换 + inRange + 开、闭运算 + 面积筛选 + 亚像素质心，
+# 缓冲区在帧间复用（HSV 范围见 config.py；查表方式在单一颜色时反而更慢，见 vision/red_mask.py）
+red_pipeline = detector_pipeline((RED,), method='hsv')
+
+@profiling.timed('vision.detect_laser_dot')
+def detect_laser_dot(frame):
     """
-    在图像帧中寻找红色激光点，返回其中心坐标。
+    在图像帧中寻找红色激光点，返回 Detection(x, y, area, peak, confidence)，
+    x、y 为亮度加权的亚像素质心；没有找到时返回 None。
     """
-    # 将图像从BGR色彩空间转换到HSV色彩空间
-    hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-    # 定义红色的HSV范围。红色在HSV中可能跨越0/180，所以定义两个范围
-    # 范围1 (偏暗的红色)
-    lower_red1 = np.array([0, 120, 70])
-    upper_red1 = np.array([10, 255, 255])
-    mask1 = cv2.inRange(hsv_frame, lower_red1, upper_red1)
-
-    # 范围2 (偏紫的红色)
-    lower_red2 = np.array([170, 120, 70])
-    upper_red2 = np.array([180, 255, 255])
-    mask2 = cv2.inRange(hsv_frame, lower_red2, upper_red2)
-    
-    # 合并两个掩码
-    mask = mask1 + mask2
+    # 红色在HSV中跨越0/180，转换到 HSV 后对两个范围（RED_LOWER/UPPER、RED_LOWER2/UPPER2）
+    # 分别做 inRange 再合并，并做开、闭运算去除噪点；
+    # 再找面积最大（激光点通常是最大最亮的）且面积大于阈值的光斑，以防噪点干扰
+    return red_pipeline.run(frame)['red']
 
-    # 可选：使用形态学操作去除噪点
-    kernel = np.ones((5, 5), np.uint8)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-
-    # 寻找掩码中的轮廓
-    contours, _ = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-
-    # 如果找到了轮廓，找出最大的那个（激光点通常是最大最亮的）
-    if contours:
-        # 找到面积最大的轮廓
-        max_contour = max(contours, key=cv2.contourArea)
-        
-        # 仅处理面积大于某个阈值的轮廓，以防噪点干扰
-        if cv2.contourArea(max_contour) > 10:
-            # 计算最大轮廓的中心
-            M = cv2.moments(max_contour)
-            if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                return (cx, cy)
-    
-    return None # 如果没有找到激光点，返回None
+@profiling.timed('vision.find_laser_dot')
+def find_laser_dot(frame):
+    """
+    在图像帧中寻找红色激光点，返回其中心坐标（整数像素）。
+    """
+    detection = detect_laser_dot(frame)
+    if detection is None:
+        return None # 如果没有找到激光点，返回None
+    return (int(round(detection.x)), int(round(detection.y)))
 
 # --- 5. 主程序 ---
 
@@ -135,13 +128,24 @@ if __name__ == "__main__":
     # 初始化GPIO
     setup_gpio()
 
-    # 初始化摄像头
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
+    # 初始化摄像头（后台线程采集，处理循环只取最新一帧）
+    try:
+        grabber = FrameGrabber(config.CAMERA_INDEX, settings=CAPTURE).start()
+    except IOError:
         print("错误：无法打开摄像头。")
         cleanup_gpio()
         exit()
     print("Camera initialized.")
+    # 格式、帧率、曝光的请求值和驱动实际接受的值（不一致的标 !）
+    print(grabber.negotiation)
+
+    # 只在预测位置附近的小窗口内搜索，短暂消失时按速度外推，跟丢时才整帧搜索
+    tracker = RoiTracker(detect_laser_dot, predictor=KalmanPredictor())
+
+    # 画面标注和显示在单独的线程里限速进行（无显示器时不显示，见 config.DISPLAY），
+    # 运行日志每秒合并输出一次
+    display = Display(title='Laser Tracker - Press Q to Quit').start()
+    telemetry = Telemetry().start()
 
     try:
         # 1. 给电机断电，使其可以自由转动
@@ -152,37 +156,45 @@ if __name__ == "__main__":
         
         print("\nMotors are off. Please manually position the laser.")
         print("The program is now tracking the red dot.")
-        print("Press 'q' in the video window to quit.")
+        print("Press 'q' in the video window (or Ctrl+C) to quit.")
 
         # 3. 循环识别激光点
+        last_state = None
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            profiling.tick('laser_tracker.loop')
+            latest = grabber.read()
+            if latest is None:
                 print("无法接收帧，退出...")
                 break
+            frame = latest.image
 
             # 翻转图像，如果你的摄像头是倒置安装的
             # frame = cv2.flip(frame, -1)
 
             # 寻找激光点位置
-            dot_position = find_laser_dot(frame)
-
-            # 在画面上标记并打印坐标
-            if dot_position:
-                cx, cy = dot_position
-                # 在原图上画一个圈来标记激光点
-                cv2.circle(frame, (cx, cy), 15, (0, 255, 0), 2)
-                cv2.putText(frame, f"({cx}, {cy})", (cx + 10, cy - 10), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                print(f"Laser dot detected at: ({cx}, {cy})")
-            else:
-                print("Laser dot not found.")
-
-            # 显示图像
-            cv2.imshow('Laser Tracker - Press Q to Quit', frame)
-
-            # 等待按键，如果按下 'q' 则退出
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            detection = tracker.update(frame, latest.timestamp)
+
+            # 标记并记录坐标
+            marks = ()
+            if detection:
+                marks = (Mark(detection.x, detection.y, f"({detection.x:.1f}, {detection.y:.1f})"),)
+                telemetry.event('laser', x=round(detection.x, 2), y=round(detection.y, 2),
+                                confidence=round(detection.confidence, 2))
+            elif tracker.predictor.active:
+                # 短暂消失：显示外推位置
+                px, py = tracker.predictor.predict(latest.timestamp)
+                marks = (Mark(px, py, "coasting", (0, 255, 255)),)
+                telemetry.event('laser_coasting', x=round(px, 2), y=round(py, 2))
+            state = 'tracking' if detection else 'coasting' if tracker.predictor.active else 'not found'
+            if state != last_state:
+                telemetry.log('laser_state', value=state)
+                last_state = state
+
+            # 显示图像（不阻塞）
+            display.show(frame, marks)
+
+            # 在窗口中按下 'q' 则退出（窗口在主线程中刷新，按 DISPLAY_RATE 限速）
+            if display.poll() == ord('q'):
                 break
     
     except KeyboardInterrupt:
@@ -191,8 +203,15 @@ if __name__ == "__main__":
     finally:
         # 确保所有资源都被正确释放
         print("\nCleaning up resources...")
+        display.close()
+        telemetry.close()
         laser_off()
         cleanup_gpio()
-        cap.release()
-        cv2.destroyAllWindows()
+        grabber.release()
+        print(f"Frames: {grabber.stats()}")
+        print(f"Tracker: {tracker.stats()}, predictor: {tracker.predictor.stats()}")
+        print(red_pipeline.report())
+        print(f"Display: {display.stats()}")
+        if profiling.ENABLED:
+            print(profiling.report())
         print("Cleanup complete. Program terminated.")
\ No newline at end of file
@@ -1,25 +1,39 @@
-import gpiod
 import time
 import numpy as np
 import math
 
+from hardware.stepper_waveform import StepperWaveform, RIGHTWARD, LEFTWARD, PHASES_PER_STEP
+from hardware.step_scheduler import StepScheduler, HYBRID
+from hardware.motion_profile import MotionProfile, profile_intervals
+from hardware.multi_axis import MultiAxisExecutor
+from hardware.kinematics import angle_to_steps
+from hardware.gpio_backend import gpiod
+import config
+
 # --- 1. 全局硬件配置 ---
 # 红色激光笔[GPIO26,GPIO39(GND)]
 # PIN_LASER = 26 # BCM 编号
-# 定义GPIO控制器芯片的名称
+# 定义GPIO控制器芯片的名称（见 config.GPIO_CHIP）
 # 对于树莓派5，通常是 'gpiochip4'
 # 对于树莓派4及更早版本，通常是 'gpiochip0'
-CHIP_NAME = 'gpiochip4'
+# 没有 gpiod 时（config.GPIO_BACKEND）自动使用模拟芯片
+CHIP_NAME = config.GPIO_CHIP
 
 # 定义所有需要用到的引脚（BCM编号）
 PINS_MOTOR1 = [4, 14, 22, 23]  # [IN1, IN2, IN3, IN4]pul，pul
 PINS_MOTOR2 = [6, 12, 5, 27]   # [IN12, IN22, IN32, IN42]
 # ALL_PINS = PINS_MOTOR1 + PINS_MOTOR2 + [PIN_LASER] 
-# ALL_PINS = PINS_MOTOR1 + PINS_MOTOR2
+ALL_PINS = PINS_MOTOR1 + PINS_MOTOR2
+# 电机2的引脚在 ALL_PINS 中的起始位置
+MOTOR2_OFFSET = len(PINS_MOTOR1)
 
 # 全局变量来持有请求到的GPIO线路对象
 lines = None
+waveform = None  # 引脚状态的内存副本和预先展开的相序表
+executor = None  # 两个电机协同运动
 delay = 0.0001
+# 加减速曲线，设为 None 则所有运动按固定 delay 运行
+profile = MotionProfile()
 
 # --- 2. 初始化和清理函数 ---
 
@@ -28,7 +42,7 @@ def setup():
     初始化GPIO，请求并配置所有需要的引脚。
     这个函数应该在程序开始时只调用一次。
     """
-    global lines
+    global lines, waveform, executor
     try:
         # 获取GPIO控制器芯片
         chip = gpiod.Chip(CHIP_NAME)
@@ -42,6 +56,9 @@ def setup():
             type=gpiod.LINE_REQ_DIR_OUT,
             default_vals=[0] * len(ALL_PINS)
         )
+        # 按绝对截止时间控制节拍，代替 time.sleep(delay)
+        waveform = StepperWaveform(lines, len(ALL_PINS), StepScheduler(HYBRID))
+        executor = MultiAxisExecutor(waveform, (0, MOTOR2_OFFSET), delay, profile)
         print("GPIO setup successful.")
     except Exception as e:
         print(f"GPIO setup failed: {e}")
@@ -66,26 +83,14 @@ def setStep(w1, w2, w3, w4):
     """
     设置电机1的四个引脚状态。
     """
-    # gpiod更高效的方式是批量设置，我们在这里构造一个包含所有引脚状态的列表
-    current_values = lines.get_values() # 获取当前所有引脚的状态
-    # 更新电机1对应的引脚状态
-    current_values[0] = w1
-    current_values[1] = w2
-    current_values[2] = w3
-    current_values[3] = w4
-    lines.set_values(current_values)
+    # 引脚状态保存在 waveform 中，不再每拍调用 get_values() 回读
+    waveform.set_phase(0, (w1, w2, w3, w4))
 
 def setStep2(w1, w2, w3, w4):
     """
     设置电机2的四个引脚状态。
     """
-    current_values = lines.get_values() # 获取当前所有引脚的状态
-    # 更新电机2对应的引脚状态
-    current_values[4] = w1
-    current_values[5] = w2
-    current_values[6] = w3
-    current_values[7] = w4
-    lines.set_values(current_values)
+    waveform.set_phase(MOTOR2_OFFSET, (w1, w2, w3, w4))
 
 def stop():
     setStep(0, 0, 0, 0)
@@ -94,43 +99,28 @@ def stop2():
     setStep2(0, 0, 0, 0)
 
 # --- 4. 高层运动逻辑 (这部分函数几乎不需要修改) ---
-# 你的 rightward, leftward, upward, downward 等函数都依赖于 setStep 和 setStep2，
-# 所以它们可以保持不变。
+# 相序在 stepper_waveform 中预先展开，每拍只调用一次 set_values()。
+
+def intervals(steps):
+    """每拍间隔：有加减速曲线时取缓存的间隔表，否则为固定 delay。"""
+    if profile is None:
+        return delay
+    return profile_intervals(steps * PHASES_PER_STEP, profile)
 
 def rightward(steps):
-    global delay
-    for _ in range(steps):
-        setStep(1, 0, 1, 0); time.sleep(delay)
-        setStep(0, 1, 1, 0); time.sleep(delay)
-        setStep(0, 1, 0, 1); time.sleep(delay)
-        setStep(1, 0, 0, 1); time.sleep(delay)
+    waveform.run(RIGHTWARD, steps, intervals(steps))
     stop()
     
 def rightward2(steps):
-    global delay
-    for _ in range(steps):
-        setStep2(1, 0, 1, 0); time.sleep(delay)
-        setStep2(0, 1, 1, 0); time.sleep(delay)
-        setStep2(0, 1, 0, 1); time.sleep(delay)
-        setStep2(1, 0, 0, 1); time.sleep(delay)
+    waveform.run(RIGHTWARD, steps, intervals(steps), MOTOR2_OFFSET)
     stop2()
         
 def leftward(steps):
-    global delay
-    for _ in range(steps):
-        setStep(1, 0, 0, 1); time.sleep(delay)
-        setStep(0, 1, 0, 1); time.sleep(delay)
-        setStep(0, 1, 1, 0); time.sleep(delay)
-        setStep(1, 0, 1, 0); time.sleep(delay)
+    waveform.run(LEFTWARD, steps, intervals(steps))
     stop()
 
 def leftward2(steps):
-    global delay
-    for _ in range(steps):
-        setStep2(1, 0, 0, 1); time.sleep(delay)
-        setStep2(0, 1, 0, 1); time.sleep(delay)
-        setStep2(0, 1, 1, 0); time.sleep(delay)
-        setStep2(1, 0, 1, 0); time.sleep(delay)
+    waveform.run(LEFTWARD, steps, intervals(steps), MOTOR2_OFFSET)
     stop2()
 
 # ... downward, upward, downward2, upward2 函数也保持不变 ...
@@ -150,17 +140,39 @@ def upward2(steps):
 
 def loop(angle):
     print("rightward--->leftward:")
-    steps = int(angle / 360 * 6400)
+    steps = angle_to_steps(angle)
     rightward(steps)
+    print(waveform.scheduler.last_stats)
     leftward(steps)
+    print(waveform.scheduler.last_stats)
+    print("stop...")
+    time.sleep(1)
+
+def move(steps1, steps2):
+    """
+    电机1和电机2同时转动（正数为 rightward，负数为 leftward），
+    耗时等于步数较多的那个电机，而不是两者之和。
+    """
+    executor.move(steps1 * PHASES_PER_STEP, steps2 * PHASES_PER_STEP)
+    executor.release()
+
+def loop_xy(angle):
+    print("diagonal forward--->back:")
+    steps = angle_to_steps(angle)
+    move(steps, steps)
+    print(waveform.scheduler.last_stats)
+    move(-steps, -steps)
+    print(waveform.scheduler.last_stats)
     print("stop...")
     time.sleep(1)
 
 def loop2(angle):
     print("upward--->downward:")
-    steps = int(angle / 360 * 6400)
+    steps = angle_to_steps(angle)
     upward2(steps)
+    print(waveform.scheduler.last_stats)
     downward2(steps) # stop2() is already in downward2
+    print(waveform.scheduler.last_stats)
     print("stop...")
     time.sleep(1)
     
@@ -175,6 +187,7 @@ if __name__ == '__main__':
             t0 = time.time()
             loop(float(a))
             #loop2(float(a))
+            #loop_xy(float(a))  # 两个电机同时运动
             
             print(f"Operation took: {time.time() - t0:.2f} seconds")
             
@@ -0,0 +1,400 @@
+# pursuit.py
+"""
+绿色激光追红色激光。
+
+每一帧用一次多目标检测（vision.pipeline.multi_target_pipeline）同时找到红、绿两个光点，
+红点交给 vision.predictor 估计速度；绿色云台的速度命令 = 红点速度（前馈）+ PID(红点 - 绿点)，
+通过 MotionService.jog 下发。误差按命令生效的时刻计算：红点按估计的速度、绿点按当前的速度命令
+外推到 下发时刻 + lead，抵消采集、检测和运动线程的延迟。
+
+有绿色云台的标定文件（config.GREEN_CALIBRATION，见 utils/calibration.py）时，红点目标和绿点位置
+都查表换算成绿色云台的绝对步数，PID 和前馈直接在步数上计算；没有时按 SERVO_STEPS_PER_PIXEL 换算。
+
+每一帧记录四个时刻，运行结束时给出各段延迟的分位数：
+    capture    画面采集（Frame.timestamp）
+    detected   两个光点检测完成
+    commanded  jog 命令放进运动线程的队列
+    burst      运动线程第一次按这条命令输出节拍的开始和结束（MotionService.bursts）
+另外统计追赶距离（红、绿光点的像素距离）和响应时间（距离超过阈值到重新追上所用的时间）。
+
+在 _2023e 目录下运行：
+    python pursuit.py            # 摄像头 + 绿色云台（红色光点由别的程序或手动控制）
+    python pursuit.py --camera capture   # 摄像头用全分辨率（默认为 TRACKING 低分辨率、高帧率）
+    python pursuit.py --workers 3        # 检测交给 3 个工作进程（vision.parallel），主循环只做控制
+    python pursuit.py --sim      # 模拟画面：红色云台沿圆周运动，两个光点的位置由各自云台的步数决定
+"""
+import argparse
+import collections
+import math
+import time
+
+import cv2
+import numpy as np
+
+import config
+from hardware.gimbal_control import Gimbal, MotorConfig
+from hardware.motion_service import JOG_CHUNK
+from hardware.trajectory import build
+from utils.calibration import Calibration
+from utils.pid_controller import PID
+from utils.telemetry import Telemetry
+from vision.camera_config import CAPTURE, TRACKING
+from vision.capture import FrameGrabber
+from vision.display import Display, Mark
+from vision.parallel import ParallelDetector, TargetDetector
+from vision.pipeline import RED, GREEN, multi_target_pipeline
+from vision.predictor import KalmanPredictor
+
+# 一帧从采集到电机动作的各个时刻（time.monotonic，秒），burst_start / burst_end 为 None 表示还没有输出
+Stamp = collections.namedtuple('Stamp', ['capture', 'detected', 'commanded', 'burst_start', 'burst_end'])
+
+STAGES = (
+    ('detect', 'capture', 'detected'),
+    ('control', 'detected', 'commanded'),
+    ('queue', 'commanded', 'burst_start'),
+    ('burst', 'burst_start', 'burst_end'),
+    ('total', 'capture', 'burst_end'),
+)
+
+
+class Pursuit:
+    """
+    service:          绿色云台的 MotionService（已启动）
+    feedforward:      红点速度前馈的比例（0 为只用 PID）
+    steps_per_pixel:  像素/秒 到 step/s 的换算
+    directions:       绿色云台各轴电机正转时光点在画面上的移动方向（1 或 -1）
+    lead:             命令下发到电机动作的估计延迟（秒），默认为速度模式一段输出的时长
+    overlap:          两个光点相距小于这个距离（像素）后其中一个消失，按重合处理
+    calibration:      绿色云台的 utils.calibration.Calibration（像素坐标与画面一致），
+                      给出时在步数上计算，不再使用 steps_per_pixel 和 directions
+    """
+
+    # 有标定时前馈速度的换算：红点位置和它 FEEDFORWARD_DT 秒后的位置之差（步）/ FEEDFORWARD_DT
+    FEEDFORWARD_DT = 0.05
+
+    def __init__(self, service, gains=(config.PID_KP, config.PID_KI, config.PID_KD), feedforward=1.0,
+                 steps_per_pixel=config.SERVO_STEPS_PER_PIXEL,
+                 max_step_rate=config.SERVO_MAX_STEP_RATE, directions=(1, 1), predictor=None, lead=JOG_CHUNK,
+                 overlap=12.0, calibration=None):
+        self.service = service
+        self.calibration = calibration
+        self.max_step_rate = max_step_rate
+        self.overlap = overlap
+        self._close = False
+        self.feedforward = feedforward
+        self.lead = lead
+        self.steps_per_pixel = steps_per_pixel
+        self.directions = directions
+        self.max_rate = max_step_rate / steps_per_pixel
+        self.pids = [PID(*gains) for _ in range(2)]
+        self.predictor = predictor if predictor is not None else KalmanPredictor()
+        self.rates = (0.0, 0.0)
+        self.updates = 0
+        self.lost = 0
+
+    def stop(self):
+        """停下绿色云台，返回是否下发了命令（已经停着时不再下发）。"""
+        moving = any(self.rates)
+        if moving:
+            self.service.jog(0, 0)
+        for pid in self.pids:
+            pid.reset()
+        self.rates = (0.0, 0.0)
+        return moving
+
+    def resolve(self, red, green):
+        """
+        两个光点重合时多目标检测只能找到其中一个（见 multi_target_pipeline）。
+        上一帧两点已经很近、这一帧只找到一个时，认为另一个与它重合。返回 (red, green)。
+        """
+        if self._close:
+            if green is None:
+                green = red
+            elif red is None:
+                red = green
+        self._close = (red is not None and green is not None
+                       and math.hypot(red.x - green.x, red.y - green.y) < self.overlap)
+        return red, green
+
+    def update(self, red, green, timestamp):
+        """
+        red、green: 本帧的检测结果（Detection 或 None），timestamp: 画面采集时刻。
+        返回是否下发了新的速度命令。
+        """
+        predictor = self.predictor
+        if red is not None:
+            predictor.update(red.x, red.y, timestamp)
+        elif predictor.coast(timestamp) is None:
+            self.lost += 1
+            return self.stop()
+        if green is None:
+            # 绿点不在画面中：保持上一次的速度命令
+            self.lost += 1
+            return False
+
+        self.updates += 1
+        now = time.monotonic()
+        target = predictor.predict(now + self.lead)
+        velocity = (predictor.vx, predictor.vy)
+        horizon = now + self.lead - timestamp
+        if self.calibration is not None:
+            self.rates = self._step_rates(target, velocity, green, timestamp, horizon)
+            self.service.jog(*self.rates)
+            return True
+        rates = []
+        for pid, goal, value, rate, speed, direction in zip(self.pids, target, (green.x, green.y), self.rates,
+                                                            velocity, self.directions):
+            pid.setpoint = goal
+            value += direction * rate / self.steps_per_pixel * horizon
+            command = pid.compute(value, timestamp) + self.feedforward * speed
+            command = min(max(command, -self.max_rate), self.max_rate)
+            rates.append(direction * command * self.steps_per_pixel)
+        self.rates = tuple(rates)
+        self.service.jog(*self.rates)
+        return True
+
+    def _step_rates(self, target, velocity, green, timestamp, horizon):
+        """有标定时：目标、绿点和前馈速度都换算成绿色云台的步数，PID 输出即 step/s。"""
+        to_steps = self.calibration.pixel_to_steps
+        goal = to_steps(*target, rounded=False)
+        dt = self.FEEDFORWARD_DT
+        ahead = to_steps(target[0] + velocity[0] * dt, target[1] + velocity[1] * dt, rounded=False)
+        current = to_steps(green.x, green.y, rounded=False)
+        rates = []
+        for pid, setpoint, value, rate, later in zip(self.pids, goal, current, self.rates, ahead):
+            pid.setpoint = setpoint
+            # 绿点按当前的速度命令外推到命令生效的时刻
+            value += rate * horizon
+            command = pid.compute(value, timestamp) + self.feedforward * (later - setpoint) / dt
+            rates.append(min(max(command, -self.max_step_rate), self.max_step_rate))
+        return tuple(rates)
+
+
+class LatencyBudget:
+    """
+    记录每条命令的各个时刻，从 MotionService.bursts 中找到第一次反映这条命令的输出。
+    max_age: 超过这个时间（秒）仍没有输出的命令不再等待（例如速度太小、这一段没有走满一拍）
+    """
+
+    def __init__(self, service, max_age=1.0):
+        self.service = service
+        self.max_age = max_age
+        self.pending = collections.deque()      # (命令序号, capture, detected, commanded)
+        self.stamps = []
+        self.unresolved = 0
+
+    def record(self, capture, detected, commanded):
+        self.pending.append((self.service.submitted, capture, detected, commanded))
+
+    def resolve(self, now=None):
+        now = time.monotonic() if now is None else now
+        bursts = list(self.service.bursts)
+        while self.pending:
+            seq, capture, detected, commanded = self.pending[0]
+            burst = next((b for b in bursts if b.command >= seq), None)
+            if burst is None:
+                if now - commanded <= self.max_age:
+                    break
+                self.unresolved += 1
+            else:
+                self.stamps.append(Stamp(capture, detected, commanded, burst.start, burst.end))
+            self.pending.popleft()
+
+    def stage_ms(self, name):
+        _, start, end = next(stage for stage in STAGES if stage[0] == name)
+        return np.array([(getattr(s, end) - getattr(s, start)) * 1000 for s in self.stamps])
+
+    def report(self):
+        lines = [f"latency budget over {len(self.stamps)} commands ({self.unresolved} never executed):"]
+        for name, start, end in STAGES:
+            ms = self.stage_ms(name)
+            if len(ms):
+                p50, p90, p99 = np.percentile(ms, (50, 90, 99))
+                lines.append(f"  {name:8s} {start:>9s} -> {end:<11s} p50 {p50:7.2f}  p90 {p90:7.2f}  "
+                             f"p99 {p99:7.2f}  max {ms.max():7.2f} ms")
+        return "\n".join(lines)
+
+
+class CatchUp:
+    """
+    追赶距离和响应时间。距离超过 threshold 像素时开始计时，回到 threshold 以内时记下所用时间。
+    """
+
+    def __init__(self, threshold=5.0):
+        self.threshold = threshold
+        self.distances = []
+        self.responses = []
+        self._since = None
+
+    def update(self, red, green, timestamp):
+        if red is None or green is None:
+            return None
+        distance = math.hypot(red.x - green.x, red.y - green.y)
+        self.distances.append(distance)
+        if distance > self.threshold:
+            if self._since is None:
+                self._since = timestamp
+        elif self._since is not None:
+            self.responses.append(timestamp - self._since)
+            self._since = None
+        return distance
+
+    def report(self):
+        if not self.distances:
+            return "catch-up: no frames with both dots"
+        d = np.array(self.distances)
+        text = (f"catch-up distance p50 {np.percentile(d, 50):.1f} p90 {np.percentile(d, 90):.1f} "
+                f"max {d.max():.1f} px, within {self.threshold:g} px {np.mean(d <= self.threshold) * 100:.0f}% of frames")
+        if self.responses:
+            r = np.array(self.responses) * 1000
+            text += (f"; response time ({len(r)} catches) p50 {np.percentile(r, 50):.0f} "
+                     f"p90 {np.percentile(r, 90):.0f} max {r.max():.0f} ms")
+        return text
+
+
+class PursuitScene:
+    """
+    模拟画面：红、绿光点位置 = 起始位置 + 各自云台的步数 / steps_per_pixel，
+    接口与 cv2.VideoCapture 相同，可以交给 FrameGrabber。
+    """
+
+    def __init__(self, red_service, green_service, red_start=(640.0, 360.0), green_start=(400.0, 300.0),
+                 steps_per_pixel=config.SERVO_STEPS_PER_PIXEL,
+                 width=config.FRAME_WIDTH, height=config.FRAME_HEIGHT):
+        self.services = ((red_service, np.asarray(red_start), (40, 40, 255)),
+                         (green_service, np.asarray(green_start), (40, 255, 40)))
+        self.steps_per_pixel = steps_per_pixel
+        self.background = np.full((height, width, 3), 30, np.uint8)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        frame = self.background.copy()
+        for service, start, color in self.services:
+            x, y = start + service.position / self.steps_per_pixel
+            cv2.circle(frame, (int(round(x)), int(round(y))), 4, color, -1)
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def green_gimbal():
+    return Gimbal(MotorConfig(*config.GREEN_GIMBAL_X_PINS), MotorConfig(*config.GREEN_GIMBAL_Y_PINS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="绿色激光追红色激光")
+    parser.add_argument('--sim', action='store_true', help="使用模拟画面，红色云台沿圆周运动")
+    parser.add_argument('--seconds', type=float, default=None, help="运行时长，默认直到 Ctrl+C")
+    parser.add_argument('--feedforward', type=float, default=1.0, help="红点速度前馈比例，0 为只用 PID")
+    parser.add_argument('--camera', choices=('tracking', 'capture'), default='tracking',
+                        help="摄像头模式：tracking 低分辨率、高帧率，capture 全分辨率（见 vision.camera_config）")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="检测用的工作进程数，0 为在主循环里检测（见 vision.parallel）")
+    args = parser.parse_args()
+
+    gimbals = [green_gimbal()]
+    service = gimbals[0].start_service(hold=True)
+    red_service = None
+    calibration = None
+    scale = 1.0     # 画面像素换算到全分辨率像素的比例
+    if args.sim:
+        red = Gimbal(MotorConfig(*config.RED_GIMBAL_X_PINS), MotorConfig(*config.RED_GIMBAL_Y_PINS))
+        gimbals.append(red)
+        red_service = red.start_service(hold=True)
+        # 红点在画面上走半径 150 像素的圆，一圈约 6 秒
+        angles = np.linspace(0, 2 * np.pi, 120, endpoint=False)
+        circle = np.c_[150 * np.cos(angles), 150 * np.sin(angles)]
+        k = config.SERVO_STEPS_PER_PIXEL
+        laps = int(args.seconds / 6) + 1 if args.seconds else 100
+        path = build(circle, lambda x, y: (x * k, y * k), closed=True, laps=laps)
+        path.intervals *= 6.0 / (path.duration / laps)
+        red_service.follow(path)
+        grabber = FrameGrabber(PursuitScene(red_service, service), fps=30).start()
+    else:
+        # 协商格式、帧率和曝光，驱动没有接受的设置打印出来
+        settings = TRACKING if args.camera == 'tracking' else CAPTURE
+        grabber = FrameGrabber(config.CAMERA_INDEX, settings=settings).start()
+        if not grabber.negotiation.ok:
+            print(f"camera settings not granted:\n{grabber.negotiation}")
+        # 步数换算和重合距离按全分辨率标定，低分辨率下一个像素对应更多的步数
+        scale = config.FRAME_WIDTH / grabber.negotiation.granted['width']
+        calibration = Calibration.find(config.GREEN_CALIBRATION)
+        if calibration is None:
+            print(f"no calibration '{config.GREEN_CALIBRATION}' in {config.CALIBRATION_DIR}, "
+                  f"using SERVO_STEPS_PER_PIXEL")
+        elif scale != 1.0:
+            calibration = calibration.rescaled(scale)
+
+    pipeline = pool = None
+    if args.workers:
+        # 送帧线程把最新一帧交给工作进程，结果按采集顺序取回；帧槽按第一帧的实际尺寸分配，
+        # 用第一帧等工作进程启动、建立流水线，不计入延迟统计
+        first = grabber.read(timeout=5.0)
+        shape = first.image.shape if first is not None else (config.FRAME_HEIGHT, config.FRAME_WIDTH, 3)
+        pool = ParallelDetector(TargetDetector((RED, GREEN)), shape, workers=args.workers).start()
+        if first is not None:
+            pool.submit(first.image, first.timestamp)
+            pool.get()
+        pool.feed(grabber)
+    else:
+        pipeline = multi_target_pipeline((RED, GREEN))
+    pursuit = Pursuit(service, feedforward=args.feedforward,
+                      steps_per_pixel=config.SERVO_STEPS_PER_PIXEL * scale, overlap=12.0 / scale,
+                      calibration=calibration)
+    budget = LatencyBudget(service)
+    catch_up = CatchUp()
+    display = Display(title='pursuit').start()
+    telemetry = Telemetry().start()
+    t0 = time.monotonic()
+    try:
+        while args.seconds is None or time.monotonic() - t0 < args.seconds:
+            display.poll()      # 窗口只能在主线程刷新
+            if pool is not None:
+                result = pool.get(timeout=1.0)
+                if result is None:
+                    continue
+                # 画面留在工作进程的共享内存帧槽里，不显示；检测出错时 value 为 None
+                timestamp, image, found = result.timestamp, None, result.value or {}
+            else:
+                frame = grabber.read()
+                if frame is None:
+                    continue
+                timestamp, image = frame.timestamp, frame.image
+                found = pipeline.run(image)
+            red, green = pursuit.resolve(found.get('red'), found.get('green'))
+            detected = time.monotonic()
+            if pursuit.update(red, green, timestamp):
+                budget.record(timestamp, detected, time.monotonic())
+            budget.resolve()
+            distance = catch_up.update(red, green, timestamp)
+            if distance is not None:
+                telemetry.event('pursuit', distance=round(distance, 1),
+                                rate_x=round(pursuit.rates[0]), rate_y=round(pursuit.rates[1]))
+                if image is not None:
+                    display.show(image, (Mark(red.x, red.y, "red", (0, 0, 255)), Mark(green.x, green.y, "green")))
+    except KeyboardInterrupt:
+        print("\nCtrl+C pressed. Exiting.")
+    finally:
+        display.close()
+        telemetry.close()
+        for s in (service, red_service):
+            if s is not None:
+                s.shutdown()
+        budget.resolve()
+        if pool is not None:
+            pool.close()
+            print(f"detector workers {pool.stats()}")
+        grabber.release()
+        for gimbal in gimbals:
+            gimbal.destroy()
+        print(budget.report())
+        print(catch_up.report())
+        print(f"pursuit updates {pursuit.updates}, lost {pursuit.lost}, grabber {grabber.stats()}, "
+              f"predictor {pursuit.predictor.stats()}")
+
+
+if __name__ == '__main__':
+    main()
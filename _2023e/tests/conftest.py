@@ -0,0 +1,6 @@
+# tests/conftest.py
+"""测试从 _2023e 目录按包名导入各模块（与 python -m 运行各模块的方式一致）。"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
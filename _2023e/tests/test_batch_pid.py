@@ -0,0 +1,76 @@
+# tests/test_batch_pid.py
+import numpy as np
+import pytest
+
+from utils.batch_pid import STEP, TRACKING, BatchPID, PixelPlant, best, simulate, sweep, trace_kind
+from utils.pid_controller import PID
+
+
+@pytest.mark.parametrize('limits', [(None, None), (-50.0, 50.0)])
+def test_matches_scalar_pid(limits):
+    rng = np.random.default_rng(0)
+    n, dt = 16, 1 / 60
+    kp, ki, kd = rng.uniform(0.1, 2.0, n), rng.uniform(0.0, 1.0, n), rng.uniform(0.0, 0.3, n)
+    batch = BatchPID(kp, ki, kd, output_limits=limits)
+    scalars = [PID(p, i, d, output_limits=limits) for p, i, d in zip(kp, ki, kd)]
+
+    measurement = np.zeros(n)
+    for t in range(300):
+        if t % 100 == 0:
+            setpoint = rng.uniform(-200, 200, n)
+            batch.setpoint = setpoint
+            for pid, target in zip(scalars, setpoint):
+                pid.setpoint = target
+        measurement = measurement + rng.normal(0, 3, n)
+        outputs = batch.update(measurement, dt)
+        expected = [pid.compute(value, t * dt) for pid, value in zip(scalars, measurement)]
+        np.testing.assert_allclose(outputs, expected, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(batch.integral, [pid.integral for pid in scalars], rtol=1e-9, atol=1e-9)
+
+
+def test_reset_mask_only_clears_selected_controllers():
+    batch = BatchPID([1.0, 1.0], [0.5, 0.5], 0.0, setpoint=10.0)
+    for _ in range(5):
+        batch.update([0.0, 0.0], 0.1)
+    batch.reset(np.array([True, False]))
+    assert batch.integral[0] == 0.0 and batch.integral[1] > 0.0
+
+
+def test_simulated_step_reaches_the_target():
+    dt = 1 / 60
+    pid = BatchPID(np.array([1.5, 3.0]), 0.0, 0.0)
+    positions = simulate(pid, np.full(240, 100.0), dt, PixelPlant(pid.shape, latency=0))
+    np.testing.assert_allclose(positions[-1], 100.0, atol=0.5)
+
+
+def recorded_trace(dt=1 / 60, seconds=4.0):
+    """模拟录制的目标轨迹：慢速正弦加上随机游走，每个控制周期都在变化。"""
+    rng = np.random.default_rng(1)
+    t = np.arange(int(seconds / dt)) * dt
+    return 320 + 120 * np.sin(2 * np.pi * 0.4 * t) + np.cumsum(rng.normal(0, 1.0, len(t)))
+
+
+def test_recorded_trace_is_ranked_by_tracking_error():
+    trace = recorded_trace()
+    assert trace_kind(trace, 1 / 60) == TRACKING
+    # Kp 0.5 明显跟不上，Kp 10 能紧跟
+    results = sweep([0.5, 10.0], [0.0], [0.0, 0.05], trace)
+
+    assert results['kind'] == TRACKING and 'settling' not in results
+    good = results['kp'] == 10.0
+    assert results['rms'][good].max() < results['rms'][~good].min()
+    assert results['lag'][good].max() < results['lag'][~good].min()
+    assert np.all(results['kp'][best(results, count=2)] == 10.0)
+
+
+def test_step_trace_metrics_cover_every_step():
+    dt = 1 / 60
+    trace = np.concatenate([np.zeros(6), np.full(60, 100.0), np.full(60, 40.0)])
+    assert trace_kind(trace, dt) == STEP
+    results = sweep([1.0, 10.0], [0.0], [0.0], trace, dt=dt)
+
+    slow, fast = np.argsort(results['kp'])
+    # Kp 1 在第一段结束时还没有进入误差带，按最差的一段记为 inf
+    assert results['settling'][slow] == np.inf
+    assert 0 < results['settling'][fast] < 0.5
+    assert best(results, count=1).tolist() == [fast]
@@ -0,0 +1,55 @@
+# tests/test_calibration.py
+import os
+
+import numpy as np
+import pytest
+
+import config
+from hardware.kinematics import PanTilt
+from utils.calibration import Calibration, apply_homography, fit_homography
+from visual_servo import VisualServo
+from vision.centroid import Detection
+
+
+@pytest.fixture(scope='module')
+def calibration():
+    quad = np.array([[330, 90], [960, 120], [930, 660], [300, 620]], np.float32)
+    corners = np.array([[0, 0], [500, 0], [500, 500], [0, 500]], np.float32)
+    model = PanTilt(x0=240.0, y0=260.0, distance=1000.0, tilt_sign=-1)
+    return Calibration.build(fit_homography(quad, corners), model, spacing=5.0)
+
+
+def test_calibration_dir_is_anchored_to_config():
+    assert os.path.isabs(config.CALIBRATION_DIR)
+    assert os.path.dirname(config.CALIBRATION_DIR) == os.path.dirname(os.path.abspath(config.__file__))
+
+
+def test_find_returns_none_until_saved(tmp_path, calibration):
+    assert Calibration.find('gimbal', str(tmp_path)) is None
+    calibration.save('gimbal', str(tmp_path))
+    loaded = Calibration.find('gimbal', str(tmp_path))
+    assert loaded.pixel_to_steps(640, 360) == calibration.pixel_to_steps(640, 360)
+
+
+def test_rescaled_matches_full_resolution(calibration):
+    half = calibration.rescaled(2.0)
+    for x, y in ((400, 200), (640, 360), (900, 600)):
+        assert half.pixel_to_steps(x / 2, y / 2, rounded=False) == pytest.approx(
+            calibration.pixel_to_steps(x, y, rounded=False))
+    assert np.allclose(apply_homography(half.homography, [[320, 180]]),
+                       apply_homography(calibration.homography, [[640, 360]]))
+
+
+class FakeService:
+    def jog(self, rate_x, rate_y):
+        pass
+
+
+def test_servo_drives_toward_the_setpoint_in_steps(calibration):
+    setpoint = (640.0, 360.0)
+    servo = VisualServo(FakeService(), setpoint, calibration=calibration)
+    x, y = 500.0, 450.0
+    rates = servo.update(Detection(x, y, 10, 255, 1.0), 0.0)
+    error = np.subtract(calibration.pixel_to_steps(*setpoint, rounded=False),
+                        calibration.pixel_to_steps(x, y, rounded=False))
+    assert np.all(np.sign(rates) == np.sign(error))
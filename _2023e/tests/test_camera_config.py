@@ -0,0 +1,52 @@
+# tests/test_camera_config.py
+import cv2
+
+from vision.camera_config import (AUTO_EXPOSURE_AUTO, AUTO_EXPOSURE_MANUAL, CameraSettings,
+                                  fourcc_code, negotiate)
+
+
+class StubbornCapture:
+    """只支持 YUYV、忽略手动曝光的驱动：FOURCC 和曝光相关的 set() 都被拒绝，读回的仍是原值。"""
+
+    def __init__(self, formats=('YUYV',)):
+        self.formats = formats
+        self.props = {cv2.CAP_PROP_FOURCC: fourcc_code('YUYV'), cv2.CAP_PROP_FRAME_WIDTH: 640,
+                      cv2.CAP_PROP_FRAME_HEIGHT: 480, cv2.CAP_PROP_FPS: 30, cv2.CAP_PROP_BUFFERSIZE: 4,
+                      cv2.CAP_PROP_AUTO_EXPOSURE: AUTO_EXPOSURE_AUTO, cv2.CAP_PROP_EXPOSURE: 156,
+                      cv2.CAP_PROP_GAIN: 0}
+        self.refused = []
+
+    def set(self, prop, value):
+        if prop in (cv2.CAP_PROP_AUTO_EXPOSURE, cv2.CAP_PROP_EXPOSURE) or (
+                prop == cv2.CAP_PROP_FOURCC and value not in [fourcc_code(f) for f in self.formats]):
+            self.refused.append(prop)
+            return False
+        self.props[prop] = value
+        return True
+
+    def get(self, prop):
+        return float(self.props.get(prop, 0))
+
+
+def test_refused_fourcc_and_exposure_are_reported():
+    cap = StubbornCapture()
+    result = negotiate(cap, CameraSettings(width=1280, height=720, fps=30, fourcc=('MJPG',), exposure=20, gain=4))
+
+    assert not result.ok
+    assert sorted(result.mismatches) == ['auto_exposure', 'exposure', 'fourcc']
+    assert result.requested['fourcc'] == 'MJPG' and result.granted['fourcc'] == 'YUYV'
+    assert result.requested['auto_exposure'] == AUTO_EXPOSURE_MANUAL
+    assert result.granted['auto_exposure'] == AUTO_EXPOSURE_AUTO
+    assert result.requested['exposure'] == 20 and result.granted['exposure'] == 156
+    # 接受了的设置不算不一致
+    assert (result.granted['width'], result.granted['height'], result.granted['gain']) == (1280, 720, 4)
+    assert '! fourcc' in str(result) and '! exposure' in str(result)
+
+
+def test_fallback_fourcc_is_accepted():
+    cap = StubbornCapture()
+    result = negotiate(cap, CameraSettings(fourcc=('MJPG', 'YUYV'), exposure=None))
+
+    assert result.ok, result
+    assert result.granted['fourcc'] == 'YUYV'
+    assert 'exposure' not in result.requested
@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+import pytest
+
+from vision.centroid import blob_stats, locate_dot
+
+
+def disc(radius, dx=0.0, dy=0.0, size=40):
+    yy, xx = np.mgrid[:size, :size]
+    mask = np.zeros((size, size), np.uint8)
+    mask[(xx - size / 2 - dx) ** 2 + (yy - size / 2 - dy) ** 2 <= radius * radius] = 255
+    return mask
+
+
+def contour_area(mask):
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return max(cv2.contourArea(contour) for contour in contours)
+
+
+@pytest.mark.parametrize('contour_limit, pixel_limit', [(1, 4), (10, 16), (50, 62)])
+def test_pixel_thresholds_match_the_old_contour_area_thresholds(contour_limit, pixel_limit):
+    # 实心圆光斑：外轮廓面积 > contour_limit 与像素数 > pixel_limit 的结果相同
+    for radius in np.arange(0.5, 8.0, 0.1):
+        for dx, dy in ((0, 0), (0.25, 0), (0.5, 0.5)):
+            mask = disc(radius, dx, dy)
+            if not mask.any():
+                continue
+            _, candidates = blob_stats(mask, min_area=pixel_limit)
+            assert (candidates.size > 0) == (contour_area(mask) > contour_limit), (radius, dx, dy)
+
+
+def test_candidates_are_filtered_and_sorted_by_pixel_count():
+    mask = np.zeros((60, 60), np.uint8)
+    mask[5:7, 5:7] = 255          # 4 像素：太小
+    mask[20:25, 20:25] = 255      # 25 像素
+    mask[40:46, 40:46] = 255      # 36 像素
+    mask[10:20, 40:50] = 255      # 100 像素：太大
+    blobs, candidates = blob_stats(mask, min_area=4, max_area=62)
+    assert blobs.stats[candidates, cv2.CC_STAT_AREA].tolist() == [36, 25]
+
+
+def test_locate_dot_returns_subpixel_centroid():
+    frame = np.zeros((40, 40, 3), np.uint8)
+    mask = disc(3.0, dx=0.5)
+    frame[mask > 0] = (40, 40, 255)
+    detection = locate_dot(mask, frame)
+    assert detection.x == pytest.approx(20.5, abs=1e-6)
+    assert detection.y == pytest.approx(20.0, abs=1e-6)
+    assert detection.area == int((mask > 0).sum())
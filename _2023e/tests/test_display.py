@@ -0,0 +1,37 @@
+# tests/test_display.py
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from vision.display import Display, Mark
+
+
+def test_window_calls_highgui_from_main_thread_only(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cv2, 'imshow', lambda title, image: calls.append(('imshow', threading.current_thread())))
+    monkeypatch.setattr(cv2, 'waitKey', lambda delay: calls.append(('waitKey', threading.current_thread())) or ord('q'))
+    monkeypatch.setattr(cv2, 'destroyWindow', lambda title: calls.append(('destroyWindow', threading.current_thread())))
+
+    frame = np.zeros((48, 64, 3), np.uint8)
+    display = Display('window', rate=200).start()
+    key = -1
+    deadline = time.monotonic() + 2.0
+    while key != ord('q') and time.monotonic() < deadline:
+        display.show(frame, (Mark(10, 10, "dot"),))
+        key = display.poll()
+        time.sleep(0.001)
+    display.close()
+
+    assert key == ord('q')
+    assert {name for name, _ in calls} == {'imshow', 'waitKey', 'destroyWindow'}
+    assert all(thread is threading.main_thread() for _, thread in calls)
+
+
+def test_headless_show_and_poll_do_nothing():
+    display = Display(None).start()
+    display.show(np.zeros((8, 8, 3), np.uint8))
+    assert display.poll() == -1
+    assert display.stats() == {'submitted': 0, 'rendered': 0}
+    display.close()
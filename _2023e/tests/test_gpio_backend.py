@@ -0,0 +1,39 @@
+# tests/test_gpio_backend.py
+import sys
+import types
+
+import pytest
+
+from hardware import gpio_backend
+
+
+def fake_gpiod(v1):
+    module = types.ModuleType('gpiod')
+    module.__version__ = '1.6.3' if v1 else '2.1.0'
+    chip = type('Chip', (), {})
+    if v1:
+        chip.get_lines = lambda self, offsets: None
+    else:
+        chip.request_lines = lambda self, **kwargs: None
+    module.Chip = chip
+    return module
+
+
+@pytest.mark.parametrize('backend', ['auto', 'gpiod'])
+def test_v2_bindings_are_refused(monkeypatch, backend):
+    monkeypatch.setitem(sys.modules, 'gpiod', fake_gpiod(v1=False))
+    with pytest.raises(ImportError, match='v1'):
+        gpio_backend.load(backend)
+
+
+def test_v1_bindings_are_used(monkeypatch):
+    module = fake_gpiod(v1=True)
+    monkeypatch.setitem(sys.modules, 'gpiod', module)
+    assert gpio_backend.load('auto') is module
+
+
+def test_auto_falls_back_to_sim_without_gpiod(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'gpiod', None)     # import gpiod 抛出 ImportError
+    assert gpio_backend.load('auto') is gpio_backend.sim
+    with pytest.raises(ImportError):
+        gpio_backend.load('gpiod')
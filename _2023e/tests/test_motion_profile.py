@@ -0,0 +1,48 @@
+# tests/test_motion_profile.py
+import numpy as np
+import pytest
+
+from hardware.motion_profile import SCURVE, TRAPEZOID, MotionProfile, move_time, profile_intervals
+
+
+@pytest.mark.parametrize('kind', [TRAPEZOID, SCURVE])
+@pytest.mark.parametrize('n', [1, 2, 7, 100, 4000, 100000])
+def test_intervals_are_symmetric_and_within_speed_limits(kind, n):
+    profile = MotionProfile(kind)
+    intervals = profile_intervals(n, profile)
+
+    assert intervals.shape == (n,)
+    assert not intervals.flags.writeable
+    assert np.allclose(intervals, intervals[::-1], rtol=1e-6, atol=1e-12)
+    # 不快于最高速度，不慢于起步速度（第一拍和最后一拍最慢）
+    assert intervals.min() >= 1 / profile.v_max * (1 - 1e-9)
+    assert intervals.max() <= 1 / profile.v_start * (1 + 1e-9)
+    assert intervals.max() == pytest.approx(intervals[0])
+
+
+@pytest.mark.parametrize('kind', [TRAPEZOID, SCURVE])
+def test_long_move_sums_to_ramps_plus_cruise(kind):
+    profile = MotionProfile(kind)
+    n = 200000
+    v0, v1, a = profile.v_start, profile.v_max, profile.accel
+    if kind == TRAPEZOID:
+        t_acc, s_acc = (v1 - v0) / a, (v1 * v1 - v0 * v0) / (2 * a)
+    else:
+        t_acc, s_acc = 2 * (v1 - v0) / a, (v1 * v1 - v0 * v0) / a
+    expected = 2 * t_acc + (n - 2 * s_acc) / v1
+    assert profile_intervals(n, profile).sum() == pytest.approx(expected, rel=1e-4)
+    assert move_time(n, profile) == pytest.approx(expected, rel=1e-4)
+
+
+def test_short_move_is_faster_than_starting_speed_and_never_slower():
+    profile = MotionProfile()
+    for n in (10, 100, 1000):
+        assert move_time(n, profile) <= n / profile.v_start
+
+
+@pytest.mark.parametrize('n', [0, -5])
+def test_empty_move_returns_read_only_empty_array(n):
+    intervals = profile_intervals(n, MotionProfile())
+    assert intervals.shape == (0,)
+    assert not intervals.flags.writeable
+    assert move_time(n, MotionProfile()) == 0.0
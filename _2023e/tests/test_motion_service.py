@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from hardware.gpio_backend import SimLines, analyze
+from hardware.motion_profile import MotionProfile, braking_intervals
+from hardware.motion_service import MotionService
+from hardware.multi_axis import MultiAxisExecutor
+from hardware.step_scheduler import SPIN, StepScheduler
+from hardware.stepper_waveform import PHASES_PER_STEP, StepperWaveform
+
+PROFILE = MotionProfile()
+
+
+class VirtualScheduler(StepScheduler):
+    """等待不占用真实时间：时钟直接前进一个间隔，节拍时间精确等于计划。"""
+
+    def __init__(self):
+        self.now = 0.0
+        super().__init__(SPIN, clock=lambda: self.now)
+
+    def wait(self, interval):
+        self.now += interval
+        super().wait(interval)
+
+
+class TriggerLines(SimLines):
+    """第 n 次 set_values 之后（在服务线程中）调用 actions[n]，模拟运动中途到达的新命令。"""
+
+    def __init__(self, scheduler, actions):
+        super().__init__(range(8), syscall_cost=0, clock=lambda: int(round(scheduler.now * 1e9)))
+        self.actions = actions
+
+    def set_values(self, values):
+        super().set_values(values)
+        action = self.actions.pop(self.set_calls, None)
+        if action is not None:
+            action()
+
+
+def make_service(actions):
+    scheduler = VirtualScheduler()
+    lines = TriggerLines(scheduler, actions)
+    executor = MultiAxisExecutor(StepperWaveform(lines, 8, scheduler), profile=PROFILE)
+    service = MotionService(executor, clock=lambda: scheduler.now)
+    return service, lines
+
+
+def run(service, actions, first):
+    service.start()
+    first()
+    assert service.wait_idle(10)
+    service.shutdown()
+    assert not actions, "not every command was triggered"
+
+
+def check_continuous(trace):
+    """
+    相邻两拍之间速度变化不超过起步速度；反向只能在减速到起步速度之后发生。
+    v 是两拍之间的平均速度，减速段最后几拍的平均值略高于起步速度，留 5% 余量。
+    """
+    v = trace.velocity
+    assert trace.jumps == 0 and trace.overspeed == 0
+    same = np.sign(v[1:]) == np.sign(v[:-1])
+    assert np.abs(np.diff(v))[same].max() <= PROFILE.v_start * 1.05
+    reversal = ~same
+    assert np.all(np.abs(v[1:][reversal]) <= PROFILE.v_start * 1.05)
+    assert np.all(np.abs(v[:-1][reversal]) <= PROFILE.v_start * 1.05)
+
+
+def test_braking_starts_at_current_speed_and_ends_at_start_speed():
+    intervals = braking_intervals(PROFILE.v_max, PROFILE)
+    assert 1 / intervals[0] <= PROFILE.v_max and 1 / intervals[0] > 0.99 * PROFILE.v_max
+    assert 1 / intervals[-1] >= PROFILE.v_start * 0.999
+    assert np.all(np.diff(intervals) > 0)
+    assert len(braking_intervals(PROFILE.v_start, PROFILE)) == 0
+
+
+def test_retarget_mid_cruise_brakes_before_reversing():
+    # 走到匀速段（加速约 2000 拍）时改成回到原点
+    actions = {}
+    service, lines = make_service(actions)
+    actions[6000] = lambda: service.retarget(0, 0)
+    run(service, actions, lambda: service.move(5000, 2500))
+
+    x, y = analyze(lines, max_rate=PROFILE.v_max * 1.001)
+    assert x.peak_rate > 0.99 * PROFILE.v_max
+    check_continuous(x)
+    check_continuous(y)
+    assert np.array_equal(service.executor.position, [0, 0])
+    # 刹车沿原方向多走了一段
+    assert x.position.max() > 6000 + 1500
+
+
+@pytest.mark.parametrize('flip', [240, 340, 400])
+def test_jog_reversal_is_rate_limited(flip):
+    # 在一段输出的末尾（240、340）和中途（400）把速度指令从 +1500 改成 -1500 step/s
+    actions = {}
+    service, lines = make_service(actions)
+    actions[flip] = lambda: service.jog(-1500, 1500)
+    actions[flip + 800] = lambda: service.stop()
+    run(service, actions, lambda: service.jog(1500, -1500))
+
+    for trace in analyze(lines, max_rate=PROFILE.v_max * 1.001):
+        check_continuous(trace)
+        assert trace.peak_rate >= 1500 * PHASES_PER_STEP * 0.99
+    assert not service.busy
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from hardware.gpio_backend import SimLines, analyze
+from hardware.multi_axis import MultiAxisExecutor
+from hardware.stepper_waveform import PINS_PER_MOTOR, StepperWaveform
+
+
+def make_executor(start=(0, 0)):
+    lines = SimLines(range(2 * PINS_PER_MOTOR), syscall_cost=0)
+    executor = MultiAxisExecutor(StepperWaveform(lines, 2 * PINS_PER_MOTOR), delay=0)
+    executor.position = np.array(start, np.int64)
+    return executor, lines
+
+
+@pytest.mark.parametrize('deltas', [(100, 37), (-64, 64), (5, -123), (0, 17), (-9, 0), (1, 1)])
+def test_plan_reaches_start_plus_deltas_one_phase_per_tick(deltas):
+    executor, _ = make_executor(start=(13, -7))
+    plan = executor.plan(*deltas)
+
+    assert np.array_equal(plan.positions[-1], executor.position + deltas)
+    moves = np.diff(np.vstack([executor.position, plan.positions]), axis=0)
+    assert np.abs(moves).max() == 1
+    # 每个轴只朝一个方向走，走的拍数等于位移
+    for axis, delta in enumerate(deltas):
+        assert np.all(moves[:, axis] * np.sign(delta) >= 0)
+        assert np.count_nonzero(moves[:, axis]) == abs(delta)
+
+
+@pytest.mark.parametrize('dx, dy', [(400, 400), (400, -150), (-37, 250)])
+def test_diagonal_takes_the_longer_axis_ticks(dx, dy):
+    executor, _ = make_executor()
+    plan = executor.plan(dx, dy)
+    assert plan.ticks == max(abs(dx), abs(dy))
+    assert plan.ticks < abs(dx) + abs(dy)
+
+
+def test_minor_axis_steps_are_evenly_spread():
+    executor, _ = make_executor()
+    plan = executor.plan(300, 100)
+    ticks_with_y = np.flatnonzero(np.diff(np.concatenate([[0], plan.positions[:, 1]])))
+    assert set(np.diff(ticks_with_y).tolist()) == {3}
+
+
+def test_executed_waveform_matches_the_plan():
+    executor, lines = make_executor()
+    plan = executor.plan(64, -24)
+    executor.execute(plan)
+    x, y = analyze(lines)
+
+    assert np.array_equal(executor.position, [64, -24])
+    # analyze 以第一次通电（第一个节拍之后）的相位为 0
+    assert [x.position[-1], y.position[-1]] == (plan.positions[-1] - plan.positions[0]).tolist()
+    assert x.jumps == 0 and y.jumps == 0
+    # 每个节拍一次 set_values
+    assert lines.set_calls == 64
+
+
+def test_empty_move_and_wrong_axis_count():
+    executor, _ = make_executor()
+    assert executor.plan(0, 0).ticks == 0
+    with pytest.raises(ValueError):
+        executor.plan(1, 2, 3)
@@ -0,0 +1,44 @@
+# tests/test_parallel.py
+import os
+import time
+
+import numpy as np
+import pytest
+
+from vision import parallel
+from vision.parallel import ParallelDetector
+
+SHAPE = (8, 8, 3)
+
+
+def mean(image):
+    return float(image.mean())
+
+
+def die(image):
+    os._exit(3)
+
+
+def test_results_come_back_in_submission_order():
+    frames = [np.full(SHAPE, i, np.uint8) for i in range(20)]
+    with ParallelDetector(mean, SHAPE, workers=2, slots=3) as pool:
+        values = []
+        submitted = 0
+        while len(values) < len(frames):
+            while submitted < len(frames) and pool.submit(frames[submitted], timeout=0) is not None:
+                submitted += 1
+            result = pool.get(timeout=10.0)
+            assert result is not None
+            assert result.seq == len(values)
+            values.append(result.value)
+    assert values == [float(i) for i in range(len(frames))]
+
+
+def test_get_raises_when_a_worker_dies(monkeypatch):
+    monkeypatch.setattr(parallel, 'WORKER_CHECK', 0.1)
+    with ParallelDetector(die, SHAPE, workers=1) as pool:
+        pool.submit(np.zeros(SHAPE, np.uint8))
+        t0 = time.monotonic()
+        with pytest.raises(RuntimeError, match='exited with code 3'):
+            pool.get()
+        assert time.monotonic() - t0 < 10.0
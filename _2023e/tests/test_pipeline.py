@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+import pytest
+
+from vision.pipeline import GREEN, RED, detector_pipeline, multi_target_pipeline
+
+SHAPE = (240, 320, 3)
+RED_BGR = (40, 40, 255)
+GREEN_BGR = (40, 255, 40)
+
+
+def frame_with(*dots, radius=5):
+    """灰色背景上画若干实心圆点：dots 为 ((x, y), BGR)。"""
+    frame = np.full(SHAPE, 30, np.uint8)
+    for (x, y), color in dots:
+        cv2.circle(frame, (x, y), radius, color, -1)
+    return frame
+
+
+def test_red_and_green_are_found_in_one_pass():
+    pipeline = multi_target_pipeline((RED, GREEN), shape=SHAPE)
+    ctx = pipeline.run(frame_with(((80, 60), RED_BGR), ((250, 180), GREEN_BGR)))
+
+    red, green = ctx['red'], ctx['green']
+    assert (red.x, red.y) == pytest.approx((80, 60), abs=0.5)
+    assert (green.x, green.y) == pytest.approx((250, 180), abs=0.5)
+    # 一次连通域标记，不是每种颜色各做一遍
+    assert [name for name in pipeline.timings if name.startswith('blobs')] == ['blobs']
+
+
+def test_matches_per_color_detection():
+    frame = frame_with(((120, 40), RED_BGR), ((30, 200), GREEN_BGR))
+    multi = multi_target_pipeline((RED, GREEN), shape=SHAPE).run(frame)
+    single = detector_pipeline((RED, GREEN), shape=SHAPE).run(frame)
+    for name in ('red', 'green'):
+        assert (multi[name].x, multi[name].y) == pytest.approx((single[name].x, single[name].y), abs=0.5)
+
+
+def test_missing_color_is_none_and_results_do_not_leak_between_frames():
+    pipeline = multi_target_pipeline((RED, GREEN), shape=SHAPE)
+    pipeline.run(frame_with(((80, 60), RED_BGR), ((250, 180), GREEN_BGR)))
+    ctx = pipeline.run(frame_with(((150, 100), GREEN_BGR)))
+    assert ctx['red'] is None
+    assert (ctx['green'].x, ctx['green'].y) == pytest.approx((150, 100), abs=0.5)
+
+
+@pytest.mark.parametrize('offset', [0, 4, 8])
+def test_overlapping_dots_collapse_into_one_detection(offset):
+    # 两个光斑重合或相距小于形态学核时连成一个光斑，只算作其中一种颜色（pursuit.Pursuit.resolve 依赖这一点）
+    pipeline = multi_target_pipeline((RED, GREEN), shape=SHAPE)
+    ctx = pipeline.run(frame_with(((160, 120), GREEN_BGR), ((160 + offset, 120), RED_BGR)))
+
+    found = [ctx[name] for name in ('red', 'green') if ctx[name] is not None]
+    assert len(found) == 1
+    assert found[0].x == pytest.approx(160 + offset / 2, abs=offset / 2 + 0.5)
+    assert found[0].y == pytest.approx(120, abs=0.5)
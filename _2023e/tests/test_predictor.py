@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+import pytest
+
+from vision.predictor import AlphaBetaPredictor, KalmanPredictor
+
+PREDICTORS = [AlphaBetaPredictor, KalmanPredictor]
+DT = 1 / 60
+VELOCITY = (240.0, -90.0)     # 像素/秒
+
+
+def track(predictor, frames, start=(100.0, 300.0), noise=0.0, seed=0):
+    """按匀速直线喂 frames 帧，返回最后一帧的时刻。"""
+    rng = np.random.default_rng(seed)
+    for i in range(frames):
+        t = i * DT
+        x, y = start[0] + VELOCITY[0] * t, start[1] + VELOCITY[1] * t
+        predictor.update(x + rng.normal(0, noise), y + rng.normal(0, noise), t)
+    return (frames - 1) * DT
+
+
+def truth(t, start=(100.0, 300.0)):
+    return start[0] + VELOCITY[0] * t, start[1] + VELOCITY[1] * t
+
+
+@pytest.mark.parametrize('make', PREDICTORS)
+def test_constant_velocity_is_extrapolated_over_a_gap(make):
+    predictor = make()
+    last = track(predictor, 60)
+    np.testing.assert_allclose((predictor.vx, predictor.vy), VELOCITY, rtol=1e-3)
+
+    for gap in (2 * DT, 0.1, 0.2):
+        x, y = predictor.predict(last + gap)
+        tx, ty = truth(last + gap)
+        assert math.hypot(x - tx, y - ty) < 0.5
+    # 外推到过去的时刻不会倒退
+    assert predictor.predict(last - 1.0) == predictor.predict(last)
+
+
+@pytest.mark.parametrize('make', PREDICTORS)
+def test_noisy_track_still_predicts_within_a_few_pixels(make):
+    # 检测位置带 1 像素噪声，外推两帧的误差取多次的平均
+    errors = []
+    for seed in range(20):
+        predictor = make()
+        last = track(predictor, 120, noise=1.0, seed=seed)
+        x, y = predictor.predict(last + 2 * DT)
+        tx, ty = truth(last + 2 * DT)
+        errors.append(math.hypot(x - tx, y - ty))
+    assert np.mean(errors) < 3.0
+
+
+@pytest.mark.parametrize('make', PREDICTORS)
+def test_coasting_stops_after_max_coast(make):
+    predictor = make(max_coast=0.25)
+    last = track(predictor, 30)
+
+    for k in range(1, 15):      # 0.25 秒之内的 14 帧都还在外推
+        t = last + k * DT
+        assert predictor.coast(t) == pytest.approx(truth(t), abs=0.5)
+    assert predictor.active and predictor.stats()['coasted'] == 14
+
+    assert predictor.coast(last + 0.25 + DT) is None
+    assert not predictor.active
+    assert predictor.predict(last + 0.3) is None and predictor.search_radius(last + 0.3) is None
+    assert predictor.stats()['dropouts'] == 1
+
+    # 重新检测到之后从静止状态重新开始
+    predictor.update(10.0, 20.0, 1.0)
+    assert predictor.predict(1.5) == (10.0, 20.0)
+
+
+@pytest.mark.parametrize('make', PREDICTORS)
+def test_search_radius_grows_with_elapsed_time(make):
+    predictor = make(min_radius=4)
+    last = track(predictor, 60, noise=1.0)
+    radii = [predictor.search_radius(last + gap) for gap in (0.0, DT, 0.05, 0.1, 0.2)]
+    assert all(a < b for a, b in zip(radii, radii[1:]))
+    assert radii[0] >= 4
+
+
+@pytest.mark.parametrize('make', PREDICTORS)
+def test_search_radius_is_at_least_min_radius(make):
+    predictor = make(min_radius=16)
+    assert predictor.search_radius(0.0) is None
+    predictor.update(50.0, 50.0, 0.0)
+    assert predictor.search_radius(0.0) >= 16
@@ -0,0 +1,32 @@
+# tests/test_pursuit.py
+import config
+from laser_tracker import PIN_LASER
+from pursuit import Pursuit
+
+
+class FakeService:
+    def __init__(self):
+        self.jogs = []
+
+    def jog(self, rate_x, rate_y):
+        self.jogs.append((rate_x, rate_y))
+
+
+def test_losing_the_red_dot_only_reports_a_command_when_one_was_sent():
+    service = FakeService()
+    pursuit = Pursuit(service)
+
+    # 从没动过：停下不需要下发命令，LatencyBudget 不应记录
+    assert pursuit.update(None, None, 0.0) is False
+    assert service.jogs == []
+
+    pursuit.rates = (100.0, -50.0)
+    assert pursuit.update(None, None, 0.1) is True
+    assert service.jogs == [(0, 0)]
+    assert pursuit.rates == (0.0, 0.0)
+
+
+def test_gimbal_pins_do_not_overlap():
+    pins = (config.RED_GIMBAL_X_PINS + config.RED_GIMBAL_Y_PINS
+            + config.GREEN_GIMBAL_X_PINS + config.GREEN_GIMBAL_Y_PINS + (PIN_LASER,))
+    assert len(set(pins)) == len(pins)
@@ -0,0 +1,27 @@
+# tests/test_red_mask.py
+import numpy as np
+import pytest
+
+from vision.capture import SyntheticSource
+from vision.red_mask import RedMask, reference_mask
+
+
+@pytest.fixture(scope='module')
+def frames():
+    source = SyntheticSource(radius=4, noise=8)
+    frames = [source.read()[1] for _ in range(5)]
+    # 随机颜色覆盖整个 BGR 空间，包括红色色相两端的边界
+    rng = np.random.default_rng(0)
+    frames.append(rng.integers(0, 256, (120, 160, 3), dtype=np.uint8))
+    return frames
+
+
+@pytest.mark.parametrize('method', ['hsv', 'lut'])
+def test_identical_to_reference(frames, method):
+    mask = RedMask(method=method)
+    for frame in frames:
+        assert np.array_equal(mask(frame), reference_mask(frame))
+
+
+def test_default_is_hsv():
+    assert type(RedMask().classify).__name__ == 'HsvMask'
@@ -0,0 +1,56 @@
+# tests/test_ring_log.py
+import numpy as np
+import pytest
+
+from utils.ring_log import SERVO_RECORD, RingLog, load, summarize
+
+
+def servo_values(seq):
+    return (seq, seq / 60, seq % 3 != 0, 320.5 + seq, 240.25, 1.0, -1.0, 0.1, 0.2,
+            0.01, 0.02, 300.0, -200.0, seq, -seq, 0.010, 0.0001)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'servo.rlog')
+    with RingLog(path, capacity=100) as log:
+        for seq in range(10):
+            log.append(*servo_values(seq))
+        assert log.dropped == 0
+
+    records = load(path)
+    assert records.dtype == SERVO_RECORD
+    assert len(records) == 10
+    assert records['seq'].tolist() == list(range(10))
+    assert records['found'].tolist() == [int(seq % 3 != 0) for seq in range(10)]
+    np.testing.assert_allclose(records['x'], 320.5 + np.arange(10))
+    np.testing.assert_allclose(records['position'][:, 1], -np.arange(10))
+    assert records['p'][3].tolist() == [1.0, -1.0]
+    assert '10 records' in summarize(records)
+
+
+def test_wraps_around_in_write_order(tmp_path):
+    path = str(tmp_path / 'servo.rlog')
+    with RingLog(path, capacity=8) as log:
+        for seq in range(21):
+            log.append(*servo_values(seq))
+        assert log.dropped == 13
+
+    records = load(path)
+    assert records['seq'].tolist() == list(range(13, 21))
+
+
+def test_custom_record_type(tmp_path):
+    record = np.dtype([('a', '<i4'), ('b', '<f8', (3,))])
+    path = str(tmp_path / 'custom.rlog')
+    with RingLog(path, record, capacity=4) as log:
+        log.append(7, 1.0, 2.0, 3.0)
+    records = load(path)
+    assert records.dtype == record
+    assert records['a'].tolist() == [7] and records['b'][0].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_rejects_files_that_are_not_ring_logs(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'\0' * 4096)
+    with pytest.raises(ValueError):
+        load(str(path))
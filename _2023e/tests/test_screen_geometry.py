@@ -0,0 +1,30 @@
+# tests/test_screen_geometry.py
+import numpy as np
+
+from vision import screen_geometry
+from vision.screen_geometry import ScreenGeometry, synthetic_screen
+
+QUAD = [[330, 90], [960, 120], [930, 660], [300, 620]]
+MOVED = [[350, 100], [980, 130], [950, 670], [320, 630]]
+
+
+def test_detects_and_follows_a_moved_screen():
+    screen = ScreenGeometry(verify_every=5)
+    for seed in range(10):
+        assert screen.update(synthetic_screen(QUAD, seed=seed))
+    for seed in range(10):
+        assert screen.update(synthetic_screen(MOVED, seed=seed))
+    assert np.abs(screen.quad - np.array(MOVED)).max() < 3
+    assert screen.stats()['drifts'] == 1 and screen.stats()['rejected'] == 0
+
+
+def test_fit_without_edge_contrast_is_rejected_and_retried(monkeypatch):
+    # 边框落在均匀区域上：参考对比度为 0，按比例校验永远成立，必须在检测时就拒绝
+    monkeypatch.setattr(screen_geometry, 'find_screen_quad',
+                        lambda binary, min_area_ratio: np.array(QUAD, np.float32))
+    frame = np.full((720, 1280, 3), 90, np.uint8)
+    screen = ScreenGeometry()
+    assert not screen.update(frame)
+    assert screen.quad is None and screen.homography is None
+    assert not screen.update(frame)
+    assert screen.stats()['detections'] == 2 and screen.stats()['rejected'] == 2
@@ -0,0 +1,66 @@
+# tests/test_step_scheduler.py
+import pytest
+
+from hardware.step_scheduler import SPIN, StepScheduler
+
+
+class FakeClock:
+    """每次读取前进 tick 秒；jump(t) 模拟一次被抢占。"""
+
+    def __init__(self, tick=1e-6):
+        self.now = 0.0
+        self.tick = tick
+
+    def jump(self, seconds):
+        self.now += seconds
+
+    def __call__(self):
+        self.now += self.tick
+        return self.now
+
+
+def run(scheduler, clock, intervals, stall=None):
+    scheduler.start()
+    for i, interval in enumerate(intervals):
+        if stall is not None and i == stall[0]:
+            clock.jump(stall[1])
+        scheduler.wait(interval)
+    return scheduler.finish()
+
+
+def test_deadlines_are_absolute_so_a_late_tick_does_not_accumulate():
+    clock = FakeClock()
+    scheduler = StepScheduler(SPIN, clock=clock)
+    interval = 1e-4
+    stats = run(scheduler, clock, [interval] * 100, stall=(10, 1.6 * interval))
+
+    assert stats.ticks == 100
+    assert stats.planned_time == pytest.approx(100 * interval)
+    # 迟到的那一拍之后按原来的截止时间追回，总时间不因它变长
+    assert stats.actual_time == pytest.approx(stats.planned_time, abs=5 * clock.tick)
+    assert stats.max_lateness == pytest.approx(0.6 * interval, abs=5 * clock.tick)
+    assert stats.overruns == 0
+
+
+def test_overrun_realigns_instead_of_bursting():
+    clock = FakeClock()
+    scheduler = StepScheduler(SPIN, clock=clock)
+    interval = 1e-4
+    stats = run(scheduler, clock, [interval] * 50, stall=(20, 5 * interval))
+
+    assert stats.overruns == 1
+    # 重新对齐后不补发落下的拍：总时间比计划多出被抢占的时间
+    assert stats.actual_time == pytest.approx(stats.planned_time + 4 * interval, abs=10 * clock.tick)
+
+
+def test_variable_intervals_follow_the_schedule():
+    clock = FakeClock()
+    intervals = [3e-4, 2e-4, 1e-4, 1e-4, 2e-4, 3e-4]
+    stats = run(StepScheduler(SPIN, clock=clock), clock, intervals)
+    assert stats.planned_time == pytest.approx(sum(intervals))
+    assert stats.actual_time == pytest.approx(sum(intervals), abs=5 * clock.tick)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        StepScheduler('busy')
@@ -0,0 +1,46 @@
+# tests/test_stepper_waveform.py
+import numpy as np
+
+from hardware.gpio_backend import SimLines
+from hardware.stepper_waveform import (LEFTWARD, LEFTWARD_SEQ, RIGHTWARD, RIGHTWARD_SEQ, StepperWaveform,
+                                       _legacy_rightward)
+
+
+def test_rightward_phase_sequence_one_write_per_phase():
+    lines = SimLines(range(4), syscall_cost=0)
+    waveform = StepperWaveform(lines)
+    waveform.run(RIGHTWARD, 3, 0)
+
+    _, levels = lines.history()
+    assert levels.tolist() == [list(phase) for phase in RIGHTWARD_SEQ] * 3
+    assert lines.set_calls == 12 and lines.get_calls == 0
+    assert waveform.state == list(RIGHTWARD_SEQ[-1])
+
+
+def test_leftward_is_rightward_reversed():
+    lines = SimLines(range(4), syscall_cost=0)
+    StepperWaveform(lines).run(LEFTWARD, 2, 0)
+    _, levels = lines.history()
+    assert levels.tolist() == [list(phase) for phase in LEFTWARD_SEQ] * 2
+    assert LEFTWARD_SEQ == RIGHTWARD_SEQ[::-1]
+
+
+def test_other_motor_pins_are_kept():
+    lines = SimLines(range(8), syscall_cost=0)
+    waveform = StepperWaveform(lines, n_pins=8)
+    waveform.write([1, 0, 0, 1, 0, 0, 0, 0])
+    lines.clear_history()
+    waveform.run(RIGHTWARD, 1, 0, offset=4)
+
+    _, levels = lines.history()
+    assert levels[:, :4].tolist() == [[1, 0, 0, 1]] * 4
+    assert levels[:, 4:].tolist() == [list(phase) for phase in RIGHTWARD_SEQ]
+
+
+def test_matches_legacy_get_set_sequence():
+    legacy = SimLines(range(4), syscall_cost=0)
+    _legacy_rightward(legacy, 5)
+    table = SimLines(range(4), syscall_cost=0)
+    StepperWaveform(table).run(RIGHTWARD, 5, 0)
+    assert np.array_equal(legacy.history()[1], table.history()[1])
+    assert legacy.set_calls == table.set_calls and legacy.get_calls == 20
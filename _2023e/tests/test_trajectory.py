@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from hardware.kinematics import PanTilt
+from hardware.motion_profile import MotionProfile
+from hardware.stepper_waveform import PHASES_PER_STEP
+from hardware.trajectory import border_polyline, build, plan_path, resample, segmented_time, speed_limits
+
+PROFILE = MotionProfile()
+MODEL = PanTilt(x0=250.0, y0=250.0, distance=1000.0, tilt_sign=-1)
+ANGLES = np.linspace(0, 2 * np.pi, 360, endpoint=False)
+CIRCLE = np.c_[250 + 150 * np.cos(ANGLES), 250 + 150 * np.sin(ANGLES)]
+SHAPES = {'border': border_polyline(inset=10), 'circle': CIRCLE}
+
+
+def samples(polyline, spacing=2.0):
+    """build() 交给 plan_path 的采样点（拍）。"""
+    points = resample(polyline, spacing, closed=True)
+    return np.array([MODEL.inverse(x, y) for x, y in points]) * PHASES_PER_STEP
+
+
+def tick_times(trajectory):
+    """每个节拍发出的时刻（第一个节拍为 0）。"""
+    return np.concatenate([[0.0], np.cumsum(trajectory.intervals)[:-1]])
+
+
+def test_resample_keeps_vertices_and_spacing():
+    polyline = border_polyline(inset=10)
+    points = resample(polyline, 7.0, closed=True)
+    assert np.array_equal(points[0], points[-1])
+    for vertex in polyline:
+        assert np.any(np.all(np.isclose(points, vertex), axis=1))
+    assert np.hypot(*np.diff(points, axis=0).T).max() <= 7.0 + 1e-9
+
+
+@pytest.mark.parametrize('name', SHAPES)
+def test_plan_ends_at_the_last_sample(name):
+    path = samples(SHAPES[name])
+    trajectory = plan_path(path, PROFILE)
+    assert np.array_equal(trajectory.start, np.floor(path[0] + 0.5))
+    assert np.array_equal(trajectory.end, np.floor(path[-1] + 0.5))
+
+
+@pytest.mark.parametrize('name', SHAPES)
+def test_every_tick_moves_each_axis_at_most_one_phase(name):
+    trajectory = build(SHAPES[name], MODEL.inverse, PROFILE, closed=True)
+    moves = np.diff(np.vstack([trajectory.start, trajectory.positions]), axis=0)
+    assert np.abs(moves).max() == 1
+    assert np.all(np.abs(moves).max(axis=1) == 1)
+
+
+@pytest.mark.parametrize('name', SHAPES)
+def test_no_tick_or_axis_is_faster_than_v_max(name):
+    trajectory = build(SHAPES[name], MODEL.inverse, PROFILE, closed=True)
+    period = 1 / PROFILE.v_max * (1 - 1e-6)
+    assert trajectory.intervals[:-1].min() >= period
+    assert trajectory.intervals[-1] == 0.0
+    # 每个轴相邻两拍之间同样不短于 1 / v_max
+    moves = np.diff(np.vstack([trajectory.start, trajectory.positions]), axis=0)
+    times = tick_times(trajectory)
+    for axis in range(moves.shape[1]):
+        assert np.diff(times[moves[:, axis] != 0]).min() >= period
+
+
+@pytest.mark.parametrize('name', SHAPES)
+def test_starts_and_ends_at_v_start(name):
+    path = samples(SHAPES[name])
+    v, length = speed_limits(path, PROFILE)
+    assert v[0] == v[-1] == PROFILE.v_start
+    assert v.max() <= PROFILE.v_max
+    # 相邻采样点之间的速度变化不超过加速度限制
+    assert np.all(np.abs(np.diff(v ** 2)) <= 2 * PROFILE.accel * length * (1 + 1e-9))
+
+    trajectory = plan_path(path, PROFILE)
+    first, last = trajectory.intervals[0], trajectory.intervals[-2]
+    for interval in (first, last):
+        assert 0.9 / PROFILE.v_start <= interval <= 1 / PROFILE.v_start
+
+
+def test_circle_lap_is_faster_than_start_stop_segments():
+    trajectory = build(CIRCLE, MODEL.inverse, PROFILE, closed=True)
+    segmented = segmented_time(CIRCLE, MODEL.inverse, PROFILE, closed=True)
+    assert trajectory.duration < 0.75 * segmented
+
+
+def test_degenerate_path_has_no_ticks():
+    trajectory = plan_path(np.array([[10.2, -3.7], [10.2, -3.7]]), PROFILE)
+    assert trajectory.ticks == 0
+    assert np.array_equal(trajectory.end, [10, -4])
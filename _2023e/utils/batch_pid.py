@@ -0,0 +1,246 @@
+# utils/batch_pid.py
+"""
+向量化的 PID 和离线增益扫描。
+
+PID.compute 每次只算一个标量。BatchPID 用 NumPy 数组一次更新 N 个控制器，
+行为与 utils.pid_controller.PID 相同（测量值微分 + 低通滤波、输出限幅、抗积分饱和），
+可以同时控制红、绿两个云台的四个轴。
+
+sweep() 把成千上万组 (Kp, Ki, Kd) 放在同一个 BatchPID 里，对同一条目标轨迹
+（录制的目标位置序列或阶跃）和一个简单的云台模型并行仿真，返回每组增益的指标，
+代替手动调 config.py 里的 PID_KP / KI / KD：
+    阶跃轨迹（每个目标值至少保持 MIN_HOLD 秒）  每一段阶跃的调节时间、超调量，取最差的一段
+    录制轨迹（目标连续变化）                    跟踪误差的均方根、最大值和滞后时间
+
+云台模型（PixelPlant）：PID 输出为光点速度（像素/秒），按最高速度限幅后积分得到位置；
+摄像头和处理延迟用 latency 个控制周期的纯延迟表示。
+"""
+import numpy as np
+
+import config
+
+STEP = 'step'           # 分段恒定的目标（阶跃）
+TRACKING = 'tracking'   # 连续变化的目标（录制的轨迹）
+
+# 每个目标值至少保持这么久（秒）才按阶跃响应评价
+MIN_HOLD = 0.2
+# 估计滞后时间时最多平移的时长（秒）
+MAX_LAG = 0.5
+
+
+class BatchPID:
+    """
+    Kp, Ki, Kd, setpoint 可以是标量或数组，按 NumPy 广播规则决定控制器个数（shape）。
+    update() 的 dt 对所有控制器相同。
+    """
+
+    def __init__(self, Kp, Ki, Kd, setpoint=0.0, output_limits=(None, None), derivative_tau=0.02):
+        self.Kp = np.asarray(Kp, np.float64)
+        self.Ki = np.asarray(Ki, np.float64)
+        self.Kd = np.asarray(Kd, np.float64)
+        self.setpoint = np.asarray(setpoint, np.float64)
+        self.shape = np.broadcast_shapes(self.Kp.shape, self.Ki.shape, self.Kd.shape, self.setpoint.shape)
+        lower, upper = output_limits
+        self.lower = -np.inf if lower is None else lower
+        self.upper = np.inf if upper is None else upper
+        self.derivative_tau = derivative_tau
+        self.integral = np.zeros(self.shape)
+        self.derivative = np.zeros(self.shape)
+        self.last_measurement = np.zeros(self.shape)
+        self.last_output = np.zeros(self.shape)
+        self._primed = np.zeros(self.shape, bool)
+
+    def reset(self, mask=None):
+        """清空状态；mask 为布尔数组时只清空选中的控制器。"""
+        if mask is None:
+            mask = np.ones(self.shape, bool)
+        self.integral[mask] = 0.0
+        self.derivative[mask] = 0.0
+        self.last_output[mask] = 0.0
+        self._primed[mask] = False
+
+    def update(self, measurement, dt):
+        """所有控制器前进 dt 秒，返回输出数组。第一次调用（或 reset 后）只有比例项和已有积分。"""
+        measurement = np.broadcast_to(np.asarray(measurement, np.float64), self.shape)
+        error = self.setpoint - measurement
+        if dt <= 0:
+            return self.last_output.copy()
+        primed = self._primed
+
+        raw = np.where(primed, -(measurement - self.last_measurement) / dt, 0.0)
+        alpha = dt / (self.derivative_tau + dt) if self.derivative_tau > 0 else 1.0
+        self.derivative = np.where(primed, self.derivative + alpha * (raw - self.derivative), 0.0)
+
+        integral = np.where(primed, self.integral + error * dt, self.integral)
+        unclamped = self.Kp * error + self.Ki * integral + self.Kd * self.derivative
+        output = np.clip(unclamped, self.lower, self.upper)
+        # 抗积分饱和：输出饱和且误差还在往饱和方向推时，不累积积分
+        accept = (output == unclamped) | ((unclamped > output) != (error > 0))
+        self.integral = np.where(accept, integral, self.integral)
+        output = np.clip(self.Kp * error + self.Ki * self.integral + self.Kd * self.derivative,
+                         self.lower, self.upper)
+
+        self.last_measurement = measurement.copy()
+        self.last_output = output
+        self._primed[...] = True
+        return output
+
+
+class PixelPlant:
+    """
+    N 个并行的云台模型：速度命令（像素/秒）-> 光点位置（像素）。
+    max_rate:  最高速度（像素/秒）
+    latency:   测量值相对真实位置延迟的控制周期数
+    """
+
+    def __init__(self, shape, start=0.0, max_rate=config.SERVO_MAX_STEP_RATE / config.SERVO_STEPS_PER_PIXEL,
+                 latency=2):
+        self.position = np.full(shape, start, np.float64)
+        self.max_rate = max_rate
+        self._history = [self.position.copy() for _ in range(latency + 1)]
+
+    def step(self, command, dt):
+        self.position = self.position + np.clip(command, -self.max_rate, self.max_rate) * dt
+        self._history.append(self.position)
+        self._history.pop(0)
+
+    def measure(self):
+        return self._history[0]
+
+
+def simulate(pid, setpoints, dt, plant):
+    """
+    setpoints: (T,) 每个控制周期的目标位置
+    返回真实位置 (T, *pid.shape)。
+    """
+    positions = np.empty((len(setpoints),) + pid.shape)
+    for t, target in enumerate(setpoints):
+        pid.setpoint = np.asarray(target, np.float64)
+        plant.step(pid.update(plant.measure(), dt), dt)
+        positions[t] = plant.position
+    return positions
+
+
+def trace_kind(setpoints, dt, min_hold=MIN_HOLD):
+    """目标变化之后每个值都至少保持 min_hold 秒时为 STEP，否则为 TRACKING。"""
+    changes = np.flatnonzero(np.diff(setpoints)) + 1
+    if changes.size == 0:
+        return STEP
+    holds = np.diff(np.append(changes, len(setpoints)))
+    return STEP if holds.min() * dt >= min_hold else TRACKING
+
+
+def step_metrics(positions, setpoints, start, dt, tolerance=2.0):
+    """
+    positions: (T, N)；setpoints: (T,) 分段恒定；start: 初始位置。
+    每一段（一次目标变化到下一次变化之前）单独评价，返回最差一段的 (调节时间 s, 超调量)：
+        调节时间  目标变化之后，误差最后一次超出 tolerance 像素的时刻；段结束时仍未进入为 inf
+        超调量    越过这一段目标的最大距离 / 这一段的行程
+    """
+    changes = np.flatnonzero(np.diff(setpoints)) + 1
+    bounds = np.concatenate([[0], changes, [len(setpoints)]])
+    settling = np.zeros(positions.shape[1:])
+    overshoot = np.zeros(positions.shape[1:])
+    previous = start
+    for begin, end in zip(bounds[:-1], bounds[1:]):
+        target = setpoints[begin]
+        travel = target - previous
+        previous = target
+        if not travel:
+            continue
+        segment = positions[begin:end]
+        outside = np.abs(segment - target) > tolerance
+        last_outside = len(outside) - 1 - np.argmax(outside[::-1], axis=0)
+        seg_settling = np.where(outside.any(axis=0), (last_outside + 1) * dt, 0.0)
+        seg_settling = np.where(outside[-1], np.inf, seg_settling)
+        seg_overshoot = np.maximum((segment - target) * np.sign(travel), 0.0).max(axis=0) / abs(travel)
+        settling = np.maximum(settling, seg_settling)
+        overshoot = np.maximum(overshoot, seg_overshoot)
+    return settling, overshoot
+
+
+def tracking_metrics(positions, setpoints, dt, max_lag=MAX_LAG):
+    """
+    positions: (T, N)；setpoints: (T,) 连续变化的目标。
+    返回 (最大误差 px, 滞后时间 s)：滞后时间为把位置提前多少时与目标的均方根误差最小（不超过 max_lag）。
+    """
+    error = positions - setpoints[:, None]
+    max_error = np.abs(error).max(axis=0)
+    shifts = range(min(int(round(max_lag / dt)), len(setpoints) - 1) + 1)
+    shifted = np.array([np.sqrt(((positions[k:] - setpoints[:len(setpoints) - k, None]) ** 2).mean(axis=0))
+                        for k in shifts])
+    return max_error, np.argmin(shifted, axis=0) * dt
+
+
+def step_trace(step=100.0, duration=2.0, dt=1.0 / config.SERVO_RATE, delay=0.1):
+    """阶跃目标：前 delay 秒为 0，之后为 step。"""
+    t = np.arange(int(round(duration / dt))) * dt
+    return np.where(t >= delay, step, 0.0)
+
+
+def sweep(kp, ki, kd, setpoints=None, dt=1.0 / config.SERVO_RATE, latency=2, tolerance=2.0,
+          max_rate=config.SERVO_MAX_STEP_RATE / config.SERVO_STEPS_PER_PIXEL):
+    """
+    对 kp × ki × kd 的所有组合并行仿真。setpoints 默认为 100 像素阶跃。
+    返回字典：'kind'（STEP 或 TRACKING），'kp', 'ki', 'kd', 'rms'，
+    阶跃轨迹另有 'settling', 'overshoot'，录制轨迹另有 'max_error', 'lag'，数组均为展平后的一维数组。
+    """
+    if setpoints is None:
+        setpoints = step_trace(dt=dt)
+    setpoints = np.asarray(setpoints, np.float64)
+    grid_kp, grid_ki, grid_kd = (g.ravel() for g in np.meshgrid(kp, ki, kd, indexing='ij'))
+    start = setpoints[0]
+    pid = BatchPID(grid_kp, grid_ki, grid_kd, setpoint=start, output_limits=(-max_rate, max_rate))
+    plant = PixelPlant(pid.shape, start, max_rate, latency)
+    positions = simulate(pid, setpoints, dt, plant)
+    results = {'kind': trace_kind(setpoints, dt), 'kp': grid_kp, 'ki': grid_ki, 'kd': grid_kd,
+               'rms': np.sqrt(((positions - setpoints[:, None]) ** 2).mean(axis=0))}
+    if results['kind'] == STEP:
+        results['settling'], results['overshoot'] = step_metrics(positions, setpoints, start, dt, tolerance)
+    else:
+        results['max_error'], results['lag'] = tracking_metrics(positions, setpoints, dt)
+    return results
+
+
+def best(results, max_overshoot=0.05, count=5):
+    """
+    最好的 count 组（下标）：阶跃轨迹取超调量不超过 max_overshoot 的组合中调节时间最短的，
+    录制轨迹取跟踪误差均方根最小的。
+    """
+    if results['kind'] == TRACKING:
+        return np.lexsort((results['max_error'], results['rms']))[:count]
+    ok = np.flatnonzero(results['overshoot'] <= max_overshoot)
+    order = np.lexsort((results['rms'][ok], results['settling'][ok]))
+    return ok[order[:count]]
+
+
+def describe(results, i):
+    """第 i 组增益的指标，一行文字。"""
+    gains = f"Kp {results['kp'][i]:5.2f} Ki {results['ki'][i]:5.2f} Kd {results['kd'][i]:5.2f}"
+    if results['kind'] == TRACKING:
+        return (f"{gains}: rms {results['rms'][i]:.1f} px, max {results['max_error'][i]:.1f} px, "
+                f"lag {results['lag'][i] * 1000:.0f} ms")
+    return (f"{gains}: settling {results['settling'][i]:.3f} s, overshoot {results['overshoot'][i] * 100:.1f}%, "
+            f"rms {results['rms'][i]:.1f} px")
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    # 可以传入录制的目标位置序列（.npy，一维，每个控制周期一个值）
+    trace = np.load(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    kp = np.linspace(0.5, 20, 20)
+    ki = np.linspace(0.0, 5, 20)
+    kd = np.linspace(0.0, 0.5, 10)
+    t0 = time.perf_counter()
+    results = sweep(kp, ki, kd, trace)
+    elapsed = time.perf_counter() - t0
+    n = len(results['kp'])
+    print(f"{n} gain combinations in {elapsed:.2f} s ({elapsed / n * 1e6:.1f} us each)")
+
+    current = sweep([config.PID_KP], [config.PID_KI], [config.PID_KD], trace)
+    print(f"{results['kind']} trace")
+    print(f"config    {describe(current, 0)}")
+    for i in best(results):
+        print(f"candidate {describe(results, i)}")
@@ -0,0 +1,266 @@
+# utils/calibration.py
+"""
+摄像头像素 -> 屏幕 mm -> 云台步数 的标定和查表。
+
+标定分两步：
+    1. 摄像头到屏幕的单应矩阵（屏幕四角或更多对应点，见 vision/screen_geometry.py）
+    2. 云台几何（hardware/kinematics.PanTilt）：让云台转到若干组已知步数，
+       记录激光点在屏幕上的位置，用高斯-牛顿法（带阻尼）拟合
+拟合完成后，在屏幕平面上按 spacing mm 的间距烘焙一张逆运动学表（每格两个步数），
+每帧把检测结果换算成绝对步数只需要一次透视变换加一次双线性插值。
+
+结果保存为 <name>.npy（查找表）和 <name>.json（单应矩阵、几何参数、表格原点和间距），
+启动时用 np.load(mmap_mode='r') 映射查找表，不需要重新计算或整表读入内存。
+visual_servo.py / pursuit.py 启动时用 Calibration.find() 读取（config.RED_CALIBRATION /
+GREEN_CALIBRATION），文件存在时 PID 直接在步数上计算，否则退回按 SERVO_STEPS_PER_PIXEL 换算。
+"""
+import json
+import os
+
+import cv2
+import numpy as np
+
+import config
+from hardware.kinematics import PanTilt
+
+
+def fit_homography(pixels, screen_points):
+    """像素坐标 (N, 2) 和对应的屏幕坐标 mm (N, 2)，N >= 4，返回 3x3 单应矩阵。"""
+    pixels = np.asarray(pixels, np.float32).reshape(-1, 2)
+    screen_points = np.asarray(screen_points, np.float32).reshape(-1, 2)
+    if len(pixels) == 4:
+        return cv2.getPerspectiveTransform(pixels, screen_points).astype(np.float64)
+    homography, _ = cv2.findHomography(pixels, screen_points, cv2.RANSAC, 2.0)
+    if homography is None:
+        raise ValueError("无法拟合单应矩阵，请检查对应点")
+    return homography
+
+
+def apply_homography(homography, points):
+    points = np.asarray(points, np.float64).reshape(-1, 2)
+    mapped = np.c_[points, np.ones(len(points))] @ homography.T
+    return mapped[:, :2] / mapped[:, 2:]
+
+
+def fit_kinematics(steps, screen_points, initial, iterations=50, tolerance=1e-9):
+    """
+    拟合云台几何。
+    steps:          (N, 2) 每个样本的 (水平步数, 俯仰步数)
+    screen_points:  (N, 2) 对应的激光点屏幕坐标 mm
+    initial:        PanTilt 初值（符号、大致距离和正对点）
+    返回 (PanTilt, 残差均方根 mm)。
+    """
+    steps = np.asarray(steps, np.float64).reshape(-1, 2)
+    target = np.asarray(screen_points, np.float64).reshape(-1, 2)
+    if len(steps) < 3:
+        raise ValueError("至少需要 3 个样本")
+
+    def residuals(params):
+        x, y = initial.with_params(params).forward(steps[:, 0], steps[:, 1])
+        return np.concatenate([x - target[:, 0], y - target[:, 1]])
+
+    params = initial.params()
+    r = residuals(params)
+    cost = r @ r
+    damping = 1e-3
+    for _ in range(iterations):
+        # 数值雅可比：每个参数一列
+        jacobian = np.empty((len(r), len(params)))
+        for i in range(len(params)):
+            h = 1e-6 * max(abs(params[i]), 1.0)
+            shifted = params.copy()
+            shifted[i] += h
+            jacobian[:, i] = (residuals(shifted) - r) / h
+        jtj = jacobian.T @ jacobian
+        gradient = jacobian.T @ r
+        while True:
+            step = np.linalg.solve(jtj + damping * np.diag(np.diag(jtj) + 1e-12), -gradient)
+            candidate = params + step
+            r_new = residuals(candidate)
+            cost_new = r_new @ r_new
+            if cost_new < cost:
+                damping = max(damping / 10, 1e-12)
+                break
+            damping *= 10
+            if damping > 1e12:
+                break
+        if cost_new >= cost:
+            break
+        improvement = cost - cost_new
+        params, r, cost = candidate, r_new, cost_new
+        if improvement < tolerance * max(cost, 1.0):
+            break
+    return initial.with_params(params), float(np.sqrt(cost / len(steps)))
+
+
+def bake_ik_grid(model, width=config.SCREEN_STD_WIDTH, height=config.SCREEN_STD_HEIGHT,
+                 spacing=1.0, margin=20.0):
+    """
+    在屏幕平面 [-margin, width + margin] x [-margin, height + margin] 上
+    每 spacing mm 取一个点，返回 (grid, origin)：
+    grid[i, j] = 屏幕点 (origin + j * spacing, origin + i * spacing) 对应的 (水平步数, 俯仰步数)。
+    """
+    xs = np.arange(-margin, width + margin + spacing, spacing)
+    ys = np.arange(-margin, height + margin + spacing, spacing)
+    gx, gy = np.meshgrid(xs, ys)
+    pan, tilt = model.inverse(gx, gy)
+    grid = np.stack([pan, tilt], axis=-1).astype(np.float32)
+    return grid, (float(xs[0]), float(ys[0]))
+
+
+class Calibration:
+    """
+    标定结果。screen_to_steps / pixel_to_steps 为 O(1) 查表，
+    grid 可以是 np.load(mmap_mode='r') 得到的只读内存映射。
+    """
+
+    def __init__(self, homography, model, grid, origin, spacing):
+        self.homography = np.asarray(homography, np.float64)
+        self._homography = self.homography.tolist()
+        self.model = model
+        self.grid = grid
+        # 内存映射的切片开销较大，查表时用同一块内存上的普通 ndarray 视图
+        self._table = np.asarray(grid)
+        self.origin = origin
+        self.spacing = spacing
+        self._max_j = grid.shape[1] - 1
+        self._max_i = grid.shape[0] - 1
+
+    @classmethod
+    def build(cls, homography, model, spacing=1.0, margin=20.0):
+        grid, origin = bake_ik_grid(model, spacing=spacing, margin=margin)
+        return cls(homography, model, grid, origin, spacing)
+
+    def rescaled(self, scale):
+        """
+        画面分辨率是标定时的 1/scale 时（例如跟踪阶段的低分辨率模式）使用的标定：
+        像素坐标先乘以 scale 再换算，查找表共用。
+        """
+        homography = self.homography @ np.diag([scale, scale, 1.0])
+        return Calibration(homography, self.model, self.grid, self.origin, self.spacing)
+
+    def pixel_to_screen(self, x, y):
+        h = self._homography
+        w = h[2][0] * x + h[2][1] * y + h[2][2]
+        return ((h[0][0] * x + h[0][1] * y + h[0][2]) / w,
+                (h[1][0] * x + h[1][1] * y + h[1][2]) / w)
+
+    def screen_to_steps(self, x, y):
+        """屏幕坐标 mm -> (水平步数, 俯仰步数)，双线性插值，超出表格范围时取边缘值。"""
+        gx = min(max((x - self.origin[0]) / self.spacing, 0.0), self._max_j)
+        gy = min(max((y - self.origin[1]) / self.spacing, 0.0), self._max_i)
+        j = min(int(gx), self._max_j - 1)
+        i = min(int(gy), self._max_i - 1)
+        fx, fy = gx - j, gy - i
+        (a, b), (c, d) = self._table[i:i + 2, j:j + 2].tolist()
+        w00, w01, w10, w11 = (1 - fx) * (1 - fy), fx * (1 - fy), (1 - fx) * fy, fx * fy
+        return (w00 * a[0] + w01 * b[0] + w10 * c[0] + w11 * d[0],
+                w00 * a[1] + w01 * b[1] + w10 * c[1] + w11 * d[1])
+
+    def pixel_to_steps(self, x, y, rounded=True):
+        """
+        像素坐标 -> 绝对步数。rounded 时取整，可以直接作为 MotionService 的目标；
+        否则返回浮点数（PID 等需要连续误差的场合）。
+        """
+        pan, tilt = self.screen_to_steps(*self.pixel_to_screen(x, y))
+        if not rounded:
+            return pan, tilt
+        return int(round(pan)), int(round(tilt))
+
+    # --- 保存 / 读取 ---
+
+    def save(self, name, directory=config.CALIBRATION_DIR):
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, name)
+        np.save(base + '.npy', np.ascontiguousarray(self.grid))
+        meta = {
+            'homography': self.homography.tolist(),
+            'model': {field: getattr(self.model, field)
+                      for field in PanTilt.FIT_FIELDS + ('pan_sign', 'tilt_sign')},
+            'origin': list(self.origin),
+            'spacing': self.spacing,
+        }
+        with open(base + '.json', 'w') as f:
+            json.dump(meta, f, indent=2)
+        return base
+
+    @classmethod
+    def find(cls, name, directory=config.CALIBRATION_DIR):
+        """与 load() 相同，还没有标定过（文件不存在）时返回 None。"""
+        if not os.path.exists(os.path.join(directory, name + '.json')):
+            return None
+        return cls.load(name, directory)
+
+    @classmethod
+    def load(cls, name, directory=config.CALIBRATION_DIR):
+        base = os.path.join(directory, name)
+        with open(base + '.json') as f:
+            meta = json.load(f)
+        grid = np.load(base + '.npy', mmap_mode='r')
+        return cls(meta['homography'], PanTilt(**meta['model']), grid,
+                   tuple(meta['origin']), meta['spacing'])
+
+
+def collect_samples(move_to, locate, targets):
+    """
+    标定数据采集。
+    move_to(pan_steps, tilt_steps): 让云台转到绝对步数并等待稳定
+    locate():                       返回激光点像素坐标 (x, y) 或 None
+    targets:                        [(水平步数, 俯仰步数), ...]
+    返回 (steps, pixels) 两个 (N, 2) 数组，没找到激光点的样本被跳过。
+    """
+    steps, pixels = [], []
+    for pan, tilt in targets:
+        move_to(pan, tilt)
+        found = locate()
+        if found is not None:
+            steps.append((pan, tilt))
+            pixels.append((found[0], found[1]))
+    return np.array(steps, np.float64).reshape(-1, 2), np.array(pixels, np.float64).reshape(-1, 2)
+
+
+def calibrate(homography, steps, pixels, initial):
+    """由单应矩阵和采集到的样本拟合几何并烘焙查找表，返回 (Calibration, 残差 mm)。"""
+    model, rms = fit_kinematics(steps, apply_homography(homography, pixels), initial)
+    return Calibration.build(homography, model), rms
+
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+
+    # 合成数据：真实几何和摄像头视角已知，加 0.3 像素噪声后拟合
+    truth = PanTilt(x0=240.0, y0=260.0, distance=1000.0, pan0=0.02, tilt0=-0.015, tilt_sign=-1)
+    quad = np.array([[330, 90], [960, 120], [930, 660], [300, 620]], np.float32)
+    corners = np.array([[0, 0], [500, 0], [500, 500], [0, 500]], np.float32)
+    homography = fit_homography(quad, corners)
+    to_pixel = np.linalg.inv(homography)
+
+    rng = np.random.default_rng(0)
+    targets = [(p, t) for p in range(-200, 201, 50) for t in range(-200, 201, 50)]
+
+    def move_to(pan, tilt):
+        move_to.point = truth.forward(pan, tilt)
+
+    def locate():
+        x, y = apply_homography(to_pixel, [move_to.point])[0]
+        return x + rng.normal(0, 0.3), y + rng.normal(0, 0.3)
+
+    steps, pixels = collect_samples(move_to, locate, targets)
+    initial = PanTilt(x0=250.0, y0=250.0, distance=800.0, tilt_sign=-1)
+    calibration, rms = calibrate(homography, steps, pixels, initial)
+    print(f"fitted {calibration.model}, rms {rms:.3f} mm")
+
+    with tempfile.TemporaryDirectory() as directory:
+        calibration.save('gimbal', directory)
+        loaded = Calibration.load('gimbal', directory)
+
+        points = rng.uniform(0, 500, (1000, 2))
+        expected = np.stack(truth.inverse(points[:, 0], points[:, 1]), axis=1)
+        pixel_points = apply_homography(to_pixel, points)
+        t0 = time.perf_counter()
+        got = np.array([loaded.pixel_to_steps(x, y) for x, y in pixel_points])
+        elapsed = (time.perf_counter() - t0) / len(points)
+        error = np.abs(got - expected).max()
+        print(f"pixel -> steps {elapsed * 1e6:.1f} us/point, max error {error:.2f} steps, "
+              f"grid {loaded.grid.shape} {type(loaded.grid).__name__}")
@@ -2,24 +2,75 @@
 import time
 
 class PID:
-    def __init__(self, Kp, Ki, Kd, setpoint=0):
+    """
+    Kp, Ki, Kd:         比例、积分、微分增益
+    setpoint:           目标值
+    output_limits:      (下限, 上限)，None 表示不限制；输出饱和时停止积分（抗积分饱和）
+    derivative_tau:     微分项一阶低通滤波的时间常数（秒），0 表示不滤波
+    clock:              单调时钟，compute() 不传 now 时使用
+
+    微分项作用在测量值上（-d(测量值)/dt），改变 setpoint 时不会产生微分冲击。
+    """
+
+    def __init__(self, Kp, Ki, Kd, setpoint=0, output_limits=(None, None),
+                 derivative_tau=0.02, clock=time.monotonic):
         self.Kp, self.Ki, self.Kd = Kp, Ki, Kd
         self.setpoint = setpoint
+        self.output_limits = output_limits
+        self.derivative_tau = derivative_tau
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """清空积分、微分状态，下一次 compute() 只有比例项和积分的第一步。"""
         self.last_error, self.integral = 0, 0
-        self.last_time = time.time()
+        self.last_measurement = None
+        self.derivative = 0.0
+        self.last_output = 0.0
+        self.last_time = None
 
-    def compute(self, current_value):
-        """计算PID输出"""
-        now = time.time()
-        dt = now - self.last_time
-        
+    def _clamp(self, value):
+        lower, upper = self.output_limits
+        if upper is not None and value > upper:
+            return upper
+        if lower is not None and value < lower:
+            return lower
+        return value
+
+    def compute(self, current_value, now=None):
+        """计算PID输出。now 为测量时刻（与 clock 同一时钟），默认取当前时间。"""
+        if now is None:
+            now = self.clock()
         error = self.setpoint - current_value
-        self.integral += error * dt
-        derivative = (error - self.last_error) / dt
-        
-        output = self.Kp * error + self.Ki * self.integral + self.Kd * derivative
-        
+
+        if self.last_time is None:
+            # 第一次调用没有 dt：只有比例项
+            self.last_time = now
+            self.last_error = error
+            self.last_measurement = current_value
+            self.last_output = self._clamp(self.Kp * error + self.Ki * self.integral)
+            return self.last_output
+
+        dt = now - self.last_time
+        if dt <= 0:
+            # 同一时刻重复调用或时钟没有前进：保持上一次输出，避免除以 0
+            return self.last_output
+
+        # 测量值微分，一阶低通滤波
+        raw = -(current_value - self.last_measurement) / dt
+        alpha = dt / (self.derivative_tau + dt) if self.derivative_tau > 0 else 1.0
+        self.derivative += alpha * (raw - self.derivative)
+
+        integral = self.integral + error * dt
+        unclamped = self.Kp * error + self.Ki * integral + self.Kd * self.derivative
+        output = self._clamp(unclamped)
+        # 抗积分饱和：输出饱和且误差还在往饱和方向推时，不累积积分
+        if output == unclamped or (unclamped > output) != (error > 0):
+            self.integral = integral
+        output = self._clamp(self.Kp * error + self.Ki * self.integral + self.Kd * self.derivative)
+
         self.last_error = error
+        self.last_measurement = current_value
         self.last_time = now
-        
-        return output
\ No newline at end of file
+        self.last_output = output
+        return output
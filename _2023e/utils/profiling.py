@@ -0,0 +1,228 @@
+# utils/profiling.py
+"""
+热点路径计时。
+
+Pipeline 记录了流水线内各阶段的耗时，但检测函数整体、屏幕边框检测、电机输出和各入口
+脚本的主循环本身花了多少时间、循环实际跑多快，都看不到。这里提供按名称登记的计时：
+
+    @profiling.timed('vision.detect_laser_dot')     # 装饰器：函数每次调用的耗时
+    def detect_laser_dot(frame): ...
+
+    with profiling.stage('display'):                # 上下文管理器：一段代码的耗时
+        ...
+
+    profiling.tick('laser_tracker.loop')            # 每圈循环调用一次：循环周期和频率
+    profiling.record('motor.tick', ns)              # 已经测好的耗时（纳秒）
+
+    print(profiling.report())                       # 每个名称的次数、p50 / p99 / 最大值
+
+耗时用 time.perf_counter_ns 测量，记入预先分配的对数分桶直方图（每个 2 的幂区间
+分成 16 个桶，分位数的相对误差不超过 1/16），记录一次只是几次整数运算和一次列表加一，
+不随运行时间增长占用内存。
+
+开关：config.PROFILING 或环境变量 PROFILE=1，在导入本模块时确定。关闭时 timed()
+直接返回原函数（没有任何额外开销），stage() 返回一个空的上下文管理器，
+tick() / record() 是空函数。
+"""
+import contextlib
+import functools
+import os
+import time
+
+import config
+
+ENABLED = bool(config.PROFILING) or os.environ.get('PROFILE', '') not in ('', '0')
+
+_SUB_BITS = 4
+_SUB = 1 << _SUB_BITS
+_BUCKETS = 64 * _SUB + 2 * _SUB
+
+
+def _bucket(ns):
+    shift = ns.bit_length() - _SUB_BITS - 1
+    if shift <= 0:
+        return ns
+    return shift * _SUB + (ns >> shift)
+
+
+def _bucket_value(index):
+    """桶的中间值（纳秒）。"""
+    if index < 2 * _SUB:
+        return float(index)
+    shift = index // _SUB - 1
+    return ((index - shift * _SUB) << shift) + (1 << shift) / 2
+
+
+class Histogram:
+    """纳秒耗时的对数分桶直方图。"""
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, ns):
+        if ns < 0:
+            ns = 0
+        self.counts[_bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """q 分位数（0 ~ 100，纳秒），不超过最大值。"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(_bucket_value(index), float(self.max))
+        return float(self.max)
+
+
+class _Timer:
+    """stage() 返回的上下文管理器，每个名称预先建立一个，不可嵌套使用同一个名称。"""
+    __slots__ = ('histogram', 't0')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.t0 = 0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.add(time.perf_counter_ns() - self.t0)
+
+
+class Registry:
+    """按名称登记的耗时直方图。enabled 为 False 时所有计时都不做任何事。"""
+
+    def __init__(self, enabled=ENABLED):
+        self.enabled = enabled
+        self.histograms = {}
+        self._timers = {}
+        self._loops = {}        # 循环名称 -> 上一次 tick 的时刻（纳秒）
+        self._null = contextlib.nullcontext()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def record(self, name, ns):
+        if self.enabled:
+            self.histogram(name).add(ns)
+
+    def stage(self, name):
+        """with registry.stage(name): ... 记录这一段的耗时。"""
+        if not self.enabled:
+            return self._null
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _Timer(self.histogram(name))
+        return timer
+
+    def timed(self, name=None):
+        """装饰器，记录函数每次调用的耗时；name 默认为 模块.函数名。关闭时返回原函数。"""
+        def decorate(func):
+            if not self.enabled:
+                return func
+            histogram = self.histogram(name or f"{func.__module__}.{func.__qualname__}")
+            clock = time.perf_counter_ns
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                t0 = clock()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    histogram.add(clock() - t0)
+            return wrapper
+        return decorate
+
+    def tick(self, name):
+        """每圈循环调用一次，记录相邻两次调用的间隔（循环周期）。"""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        last = self._loops.get(name)
+        self._loops[name] = now
+        if last is not None:
+            self.histogram(name).add(now - last)
+
+    def reset(self):
+        self.histograms.clear()
+        self._timers.clear()
+        self._loops.clear()
+
+    def report(self):
+        if not self.enabled:
+            return "profiling disabled (set config.PROFILING = True or PROFILE=1)"
+        lines = [f"  {'name':32s} {'count':>8s} {'mean':>9s} {'p50':>9s} {'p99':>9s} {'max':>9s} ms"]
+        for name, h in sorted(self.histograms.items()):
+            line = (f"  {name:32s} {h.count:8d} {h.mean / 1e6:9.3f} {h.percentile(50) / 1e6:9.3f} "
+                    f"{h.percentile(99) / 1e6:9.3f} {h.max / 1e6:9.3f}")
+            if name in self._loops and h.count:
+                line += f"   {1e9 / h.mean:7.1f} Hz"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+# 全局登记表和它的方法，各模块直接使用 profiling.timed / stage / tick / record / report
+registry = Registry()
+timed = registry.timed
+stage = registry.stage
+tick = registry.tick
+record = registry.record
+report = registry.report
+
+
+if __name__ == '__main__':
+    import numpy as np
+
+    # 分位数与精确值比较；再测开、关两种情况下每次计时的开销
+    rng = np.random.default_rng(0)
+    samples = rng.lognormal(np.log(2e6), 0.5, 100000).astype(np.int64)
+    h = Histogram()
+    for ns in samples.tolist():
+        h.add(ns)
+    for q in (50, 90, 99):
+        exact = np.percentile(samples, q)
+        print(f"p{q}: histogram {h.percentile(q) / 1e6:.3f} ms, exact {exact / 1e6:.3f} ms, "
+              f"error {(h.percentile(q) - exact) / exact * 100:+.1f}%")
+
+    def work():
+        return None
+
+    n = 200000
+    for enabled in (False, True):
+        profile = Registry(enabled)
+        timed_work = profile.timed('work')(work)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            timed_work()
+        decorated = (time.perf_counter() - t0) / n
+        t0 = time.perf_counter()
+        for _ in range(n):
+            with profile.stage('block'):
+                pass
+        block = (time.perf_counter() - t0) / n
+        t0 = time.perf_counter()
+        for _ in range(n):
+            profile.tick('loop')
+        ticking = (time.perf_counter() - t0) / n
+        print(f"enabled={enabled}: timed() call {decorated * 1e9:.0f} ns, stage() {block * 1e9:.0f} ns, "
+              f"tick() {ticking * 1e9:.0f} ns")
+    print(profile.report())
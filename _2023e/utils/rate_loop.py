@@ -0,0 +1,80 @@
+# utils/rate_loop.py
+"""
+固定频率的控制循环。
+
+按绝对截止时间（hardware.step_scheduler.StepScheduler）等待，单次睡过头不会让之后的
+周期整体后移；同时统计实际周期的均值、标准差（抖动）和最大值，用来确定控制频率
+能提到多高。
+"""
+import math
+import time
+
+from hardware.step_scheduler import StepScheduler, SLEEP
+
+
+class RateLoop:
+    """
+    用法：
+        loop = RateLoop(100)
+        while running:
+            dt = loop.wait()        # 距上一周期的实际时间（秒）
+            ...
+        print(loop.report())
+    """
+
+    def __init__(self, rate, mode=SLEEP, clock=time.monotonic):
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.clock = clock
+        self.scheduler = StepScheduler(mode, clock=clock)
+        self.iterations = 0
+        self._last = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._max = 0.0
+
+    def wait(self):
+        """等到下一个周期开始，返回实际周期（第一次调用返回名义周期）。"""
+        if self._last is None:
+            self.scheduler.start()
+            self._last = self.clock()
+            self.iterations = 1
+            return self.period
+        self.scheduler.wait(self.period)
+        now = self.clock()
+        dt = now - self._last
+        self._last = now
+        self.iterations += 1
+        self._sum += dt
+        self._sum_sq += dt * dt
+        if dt > self._max:
+            self._max = dt
+        return dt
+
+    def stats(self):
+        """{'iterations', 'mean_period', 'jitter', 'max_period', 'overruns'}，时间单位为秒。"""
+        n = self.iterations - 1
+        mean = self._sum / n if n > 0 else 0.0
+        jitter = math.sqrt(max(self._sum_sq / n - mean * mean, 0.0)) if n > 0 else 0.0
+        return {
+            'iterations': self.iterations,
+            'mean_period': mean,
+            'jitter': jitter,
+            'max_period': self._max,
+            'overruns': self.scheduler.finish().overruns if n > 0 else 0,
+        }
+
+    def report(self):
+        s = self.stats()
+        achieved = 1.0 / s['mean_period'] if s['mean_period'] > 0 else 0.0
+        return (f"{s['iterations']} iterations, target {self.rate:g} Hz, achieved {achieved:.1f} Hz, "
+                f"period mean {s['mean_period'] * 1000:.2f} ms jitter {s['jitter'] * 1000:.3f} ms "
+                f"max {s['max_period'] * 1000:.2f} ms, overruns {s['overruns']}")
+
+
+if __name__ == '__main__':
+    loop = RateLoop(200)
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < 1.0:
+        loop.wait()
+    print(loop.report())
@@ -0,0 +1,209 @@
+# utils/ring_log.py
+"""
+内存映射的二进制环形记录文件。
+
+Telemetry 输出给人看的 JSON 行，同一种事件每秒只保留一条；要在比赛后逐帧分析
+（检测是否丢帧、PID 各项怎么变化、每一级花了多少时间）需要每一帧都留下记录。
+RingLog 把固定大小的记录（NumPy 结构化类型）写进一个用 mmap 映射的文件：
+每条记录只是一次预编译的 struct.pack_into，不格式化文本、不经过 write() 系统调用，
+由操作系统在后台写回磁盘；程序异常退出时已经写入的记录也保留在文件里。
+写满 capacity 条后从头覆盖，文件大小固定。
+
+文件格式（小端）：
+    0     8 字节   魔数 b'RINGLOG1'
+    8     u8      capacity（记录槽数）
+    16    u8      已写入的总条数（先写记录、再更新这个计数）
+    24    u4      每条记录的字节数
+    28    u4      记录类型描述（JSON）的长度
+    32    ...     记录类型描述：numpy dtype.descr 的 JSON
+    4096  ...     capacity 条记录
+
+离线分析：
+    records = load('servo.rlog')            # 按写入顺序的结构化数组
+    python -m utils.ring_log servo.rlog     # 打印统计
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+import config
+
+MAGIC = b'RINGLOG1'
+HEADER_SIZE = 4096
+_COUNT = struct.Struct('<Q')
+
+# 视觉伺服每帧一条：
+#   seq:       帧序号；t: 画面采集时刻（time.monotonic）
+#   found:     是否检测到光点；x, y: 控制用的光点位置（像素，外推到下发时刻）
+#   p, i, d:   X、Y 两轴 PID 的比例、积分、微分项（像素/秒）
+#   rate:      下发的步进速率 (step/s)；position: 下发时云台的位置（步）
+#   detect:    采集到检测完成的时间（秒）；control: 检测完成到命令下发的时间（秒）
+SERVO_RECORD = np.dtype([
+    ('seq', '<u4'), ('t', '<f8'), ('found', 'u1'), ('x', '<f4'), ('y', '<f4'),
+    ('p', '<f4', (2,)), ('i', '<f4', (2,)), ('d', '<f4', (2,)),
+    ('rate', '<f4', (2,)), ('position', '<f4', (2,)),
+    ('detect', '<f4'), ('control', '<f4'),
+])
+
+
+_FORMATS = {'u1': 'B', 'u2': 'H', 'u4': 'I', 'u8': 'Q', 'i1': 'b', 'i2': 'h', 'i4': 'i', 'i8': 'q',
+            'f4': 'f', 'f8': 'd'}
+
+
+def _struct(dtype):
+    """与紧凑（无对齐）的结构化类型逐字节相同的 struct 格式，子数组展开成多个值。"""
+    fmt = '<'
+    for name in dtype.names:
+        field = dtype.fields[name][0]
+        base, shape = field.base, field.shape
+        count = int(np.prod(shape)) if shape else 1
+        fmt += f"{count}{_FORMATS[base.str[1:]]}"
+    packer = struct.Struct(fmt)
+    if packer.size != dtype.itemsize:
+        raise ValueError(f"record type must be packed: {dtype}")
+    return packer
+
+
+def _descr(dtype):
+    return json.dumps(np.dtype(dtype).descr).encode()
+
+
+def _dtype(descr):
+    return np.dtype([tuple(tuple(x) if isinstance(x, list) else x for x in field)
+                     for field in json.loads(descr)])
+
+
+class RingLog:
+    """
+    path:      记录文件，已存在时清空重建
+    dtype:     记录类型（NumPy 结构化类型）
+    capacity:  记录槽数，写满后覆盖最旧的记录
+
+    用法：
+        with RingLog('servo.rlog') as log:
+            log.append(seq, t, found, x, y, px, py, ix, iy, dx, dy, rate_x, rate_y, pos_x, pos_y, detect, control)
+    """
+
+    def __init__(self, path, dtype=SERVO_RECORD, capacity=config.RING_LOG_CAPACITY):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self._pack = _struct(self.dtype).pack_into
+        descr = _descr(self.dtype)
+        if 32 + len(descr) > HEADER_SIZE:
+            raise ValueError("record type description does not fit in the header")
+        size = HEADER_SIZE + capacity * self.dtype.itemsize
+        with open(path, 'w+b') as f:
+            f.truncate(size)
+            self._mm = mmap.mmap(f.fileno(), size)
+        struct.pack_into(f'<8sQQII{len(descr)}s', self._mm, 0, MAGIC, capacity, 0,
+                         self.dtype.itemsize, len(descr), descr)
+        self.count = 0
+
+    def append(self, *values):
+        """写入一条记录，values 按字段顺序排列，子数组字段展开成多个值。"""
+        mm = self._mm
+        self._pack(mm, HEADER_SIZE + self.count % self.capacity * self.dtype.itemsize, *values)
+        self.count += 1
+        _COUNT.pack_into(mm, 16, self.count)
+
+    @property
+    def dropped(self):
+        """已被覆盖的条数。"""
+        return max(self.count - self.capacity, 0)
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load(path):
+    """读出记录文件，返回按写入顺序排列的结构化数组（拷贝，不占用文件）。"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:8] != MAGIC:
+        raise ValueError(f"{path}: not a ring log")
+    capacity, count = np.frombuffer(data, '<u8', 2, 8)
+    itemsize, length = np.frombuffer(data, '<u4', 2, 24)
+    dtype = _dtype(data[32:32 + length])
+    if dtype.itemsize != itemsize:
+        raise ValueError(f"{path}: record size {itemsize} does not match its description")
+    records = np.frombuffer(data, dtype, int(capacity), HEADER_SIZE)
+    if count <= capacity:
+        return records[:count].copy()
+    start = int(count % capacity)
+    return np.concatenate([records[start:], records[:start]])
+
+
+def summarize(records):
+    """SERVO_RECORD 记录的统计，返回多行文本。"""
+    if len(records) == 0:
+        return "no records"
+    lines = [f"{len(records)} records, seq {records['seq'][0]}..{records['seq'][-1]}"]
+    names = records.dtype.names
+    if 't' in names and len(records) > 1:
+        span = records['t'][-1] - records['t'][0]
+        gaps = int(np.count_nonzero(np.diff(records['seq'].astype(np.int64)) != 1))
+        lines.append(f"  span {span:.2f} s, {(len(records) - 1) / span:.1f} records/s, {gaps} gaps in seq")
+    if 'found' in names:
+        lines.append(f"  found in {records['found'].mean() * 100:.1f}% of frames")
+    for stage in ('detect', 'control'):
+        if stage in names:
+            ms = records[stage] * 1000
+            p50, p90, p99 = np.percentile(ms, (50, 90, 99))
+            lines.append(f"  {stage:8s} p50 {p50:7.2f}  p90 {p90:7.2f}  p99 {p99:7.2f}  max {ms.max():7.2f} ms")
+    found = records[records['found'] == 1] if 'found' in names else records
+    for term in ('p', 'i', 'd', 'rate'):
+        if term in names and len(found):
+            rms = np.sqrt(np.mean(np.square(found[term].astype(np.float64)), axis=0))
+            peak = np.abs(found[term]).max(axis=0)
+            lines.append(f"  {term:8s} rms x {rms[0]:9.2f} y {rms[1]:9.2f}   max x {peak[0]:9.2f} y {peak[1]:9.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import sys
+    import tempfile
+    import time
+
+    if len(sys.argv) > 1:
+        print(summarize(load(sys.argv[1])))
+        sys.exit()
+
+    # 写入开销：与每帧 print 一行到 /dev/null 比较；再写满一圈以上检查覆盖后的顺序
+    path = os.path.join(tempfile.gettempdir(), 'ring_log_demo.rlog')
+    n = 100000
+    with RingLog(path, capacity=n // 2) as log:
+        t0 = time.perf_counter()
+        for seq in range(n):
+            log.append(seq, seq / 60, seq % 10 != 0, 320.5, 240.5, 1.0, -1.0, 0.1, 0.2,
+                       0.01, 0.02, 300.0, -200.0, seq, -seq, 0.010, 0.0001)
+        append = (time.perf_counter() - t0) / n
+        print(f"append {append * 1e6:.2f} us per record, {log.dtype.itemsize} bytes, "
+              f"file {os.path.getsize(path) / 1024:.0f} KiB, {log.dropped} overwritten")
+
+    with open(os.devnull, 'w') as devnull:
+        t0 = time.perf_counter()
+        for seq in range(n):
+            print(f"Laser dot detected at ({320.5:.1f}, {240.5:.1f}) rate ({300.0:.0f}, {-200.0:.0f})", file=devnull)
+        printing = (time.perf_counter() - t0) / n
+    print(f"print  {printing * 1e6:.2f} us per line (to /dev/null)")
+
+    records = load(path)
+    assert (np.diff(records['seq'].astype(np.int64)) == 1).all() and records['seq'][-1] == n - 1
+    print(summarize(records))
+    os.remove(path)
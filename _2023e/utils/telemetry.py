@@ -0,0 +1,164 @@
+# utils/telemetry.py
+"""
+限速的结构化运行日志。
+
+原来的循环每一帧 print 一行，终端输出本身就占了处理时间，屏幕也刷得看不清。
+Telemetry.event() 只在内存里记下每种事件的最新一条（加一次锁、一次字典赋值），
+后台线程每 interval 秒把有更新的事件各输出一行 JSON，并附上期间合并掉的条数；
+状态变化这类每条都要看到的消息用 log()，由后台线程尽快输出。
+
+输出目标 sink 可以是文件对象（默认标准输出）、文件路径或 'udp://地址:端口'。
+每行格式：{"t": 单调时钟秒数, "event": 名称, "n": 合并条数, 其余字段...}
+"""
+import json
+import socket
+import sys
+import threading
+import time
+
+import config
+
+
+def _default(value):
+    # NumPy 标量等
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class Telemetry:
+    """
+    用法：
+        telemetry = Telemetry().start()
+        telemetry.event('laser', x=detection.x, y=detection.y)     # 每帧都可以调用
+        telemetry.log('state', value='tracking')                   # 每条都输出
+        telemetry.close()
+    """
+
+    def __init__(self, interval=config.TELEMETRY_INTERVAL, sink=None, clock=time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self._sink = sink if sink is not None else sys.stdout
+        self._write = None
+        self._close_sink = None
+        self._lock = threading.Lock()
+        self._latest = {}       # 名称 -> (时刻, 字段, 合并条数)
+        self._immediate = []
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+        self.emitted = 0
+        self.merged = 0
+
+    def _open(self):
+        sink = self._sink
+        if isinstance(sink, str) and sink.startswith('udp://'):
+            host, port = sink[len('udp://'):].rsplit(':', 1)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            address = (host, int(port))
+            self._write = lambda line: sock.sendto(line.encode(), address)
+            self._close_sink = sock.close
+        elif isinstance(sink, str):
+            f = open(sink, 'a', buffering=1, encoding='utf-8')
+            self._write = lambda line: f.write(line + "\n")
+            self._close_sink = f.close
+        else:
+            def write(line):
+                sink.write(line + "\n")
+                sink.flush()
+            self._write = write
+
+    def start(self):
+        if self._thread is None:
+            self._open()
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+            self._thread.start()
+        return self
+
+    def event(self, name, **fields):
+        """记下一条限速事件，同名事件在一个 interval 内只输出最新的一条。"""
+        now = self.clock()
+        with self._lock:
+            previous = self._latest.get(name)
+            self._latest[name] = (now, fields, previous[2] + 1 if previous else 1)
+
+    def log(self, name, **fields):
+        """不限速的事件，后台线程尽快输出。"""
+        now = self.clock()
+        with self._lock:
+            self._immediate.append((now, name, fields))
+        self._wake.set()
+
+    def _format(self, t, name, fields, n=1):
+        record = {'t': round(t, 3), 'event': name, 'n': n}
+        record.update(fields)
+        return json.dumps(record, default=_default, ensure_ascii=False)
+
+    def flush(self):
+        """输出所有待输出的事件（后台线程定期调用）。"""
+        with self._lock:
+            immediate, self._immediate = self._immediate, []
+            latest, self._latest = self._latest, {}
+        for t, name, fields in immediate:
+            self._emit(self._format(t, name, fields))
+        for name, (t, fields, n) in latest.items():
+            self.merged += n - 1
+            self._emit(self._format(t, name, fields, n))
+
+    def _emit(self, line):
+        self.emitted += 1
+        try:
+            self._write(line)
+        except OSError:
+            pass
+
+    def _run(self):
+        next_flush = self.clock() + self.interval
+        while self._running:
+            self._wake.wait(max(next_flush - self.clock(), 0.0))
+            self._wake.clear()
+            if self.clock() >= next_flush:
+                self.flush()
+                next_flush += self.interval
+            else:
+                with self._lock:
+                    immediate, self._immediate = self._immediate, []
+                for t, name, fields in immediate:
+                    self._emit(self._format(t, name, fields))
+
+    def close(self):
+        if self._thread is not None:
+            self._running = False
+            self._wake.set()
+            self._thread.join(1.0)
+            self._thread = None
+            self.flush()
+            if self._close_sink is not None:
+                self._close_sink()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    # 约 1000 Hz 的事件，每 0.5 秒只输出一行
+    with Telemetry(interval=0.5) as telemetry:
+        telemetry.log('state', value='start')
+        t0 = time.perf_counter()
+        count = 0
+        while time.perf_counter() - t0 < 1.6:
+            telemetry.event('laser', x=count * 0.1, y=2.0)
+            count += 1
+            time.sleep(0.001)
+        telemetry.log('state', value='stop')
+    print(f"{count} events, {telemetry.emitted} lines, {telemetry.merged} merged")
+
+    telemetry = Telemetry()
+    t0 = time.perf_counter()
+    for i in range(100000):
+        telemetry.event('laser', x=i, y=2.0)
+    print(f"event() {(time.perf_counter() - t0) / 100000 * 1e6:.2f} us per call")
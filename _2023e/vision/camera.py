@@ -1,80 +1,98 @@
-import cv2
 import numpy as np
 
+import config
+from utils import profiling
+from utils.telemetry import Telemetry
+from vision.camera_config import CAPTURE
+from vision.capture import FrameGrabber
+from vision.display import Display, Outline
+from vision.screen_geometry import ScreenGeometry
+
 print("脚本开始运行...")
 print("尝试打开摄像头...")
 
 # 1. 打开摄像头
-# 参数 0 表示系统中的第一个摄像头
-cap = cv2.VideoCapture(0)
-
-# 检查摄像头是否成功打开
-if not cap.isOpened():
+# 使用 config.CAMERA_INDEX 指定的摄像头，按 CAPTURE（全分辨率）协商格式、帧率和曝光；
+# 后台线程持续读取，处理循环每次只拿最新的一帧，来不及处理的帧直接丢弃
+try:
+    grabber = FrameGrabber(config.CAMERA_INDEX, settings=CAPTURE).start()
+except IOError:
+    # 摄像头没有成功打开
     print("错误：无法打开摄像头。请检查摄像头是否连接正确，或是否被其他程序占用。")
     exit()
 
+# 驱动没有接受的设置（格式、分辨率、帧率、曝光）列出来，而不是默认设置成功
+if not grabber.negotiation.ok:
+    print(f"摄像头设置未被驱动接受：\n{grabber.negotiation}")
+
 print("摄像头成功打开！按 'q' 键退出程序。")
 print("请确保用鼠标点击一下弹出的窗口，使其获得焦点。")
 
+# 屏幕边框检测：只在第一帧和边框位置变化时做完整检测（模糊、阈值、闭运算、找轮廓），
+# 其余帧只沿缓存的边线采样校验
+screen = ScreenGeometry()
+
+# 显示和运行日志在各自的线程里限速输出（无显示器时不显示，见 config.DISPLAY），
+# 处理循环里不再 imshow / waitKey / print
+display = Display(title="Screen Detection Result").start()
+# (调试用) 显示拉正后的屏幕（1像素 = 1mm），方便检查边框是否准确
+warped_display = Display(title="Screen (mm)").start()
+telemetry = Telemetry().start()
+last_found = None
+
 # 2. 无限循环，处理摄像头的每一帧
 while True:
-    # 读取一帧图像
-    ret, frame = cap.read()
+    # 循环频率（config.PROFILING 打开时统计）
+    profiling.tick('camera.loop')
+
+    # 读取最新的一帧图像（Frame(seq, timestamp, image)）
+    latest = grabber.read()
 
-    # 如果 ret 为 False，说明没有成功读取到帧（比如摄像头被拔出）
-    if not ret:
-        print("无法接收帧，可能已到达视频流末尾或摄像头断开。正在退出...")
+    # 如果返回 None，说明没有成功读取到帧（比如摄像头被拔出）
+    if latest is None:
+        telemetry.log('camera', value='no frame')
         break
+    frame = latest.image
 
     # --- 图像处理核心区域 ---
 
     # A. 预处理：转为灰度图并进行高斯模糊
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
-
     # B. 自适应阈值化：这是提取低对比度线条的关键！
-    # 参数可以根据你的光照环境进行微调
-    binary_image = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                        cv2.THRESH_BINARY_INV, 21, 5)
-
     # C. (可选) 形态学操作：清理噪点，连接断线
-    kernel = np.ones((3,3), np.uint8)
-    processed_image = cv2.morphologyEx(binary_image, cv2.MORPH_CLOSE, kernel, iterations=2)
-
-    # D. 霍夫直线检测：在处理后的二值图像上寻找直线
-    lines = cv2.HoughLinesP(processed_image, 1, np.pi / 180, threshold=80,
-                            minLineLength=50, maxLineGap=15)
-
-    # E. 在原始彩色图像上绘制结果
-    # 我们在一个副本上绘制，以保持原始 'frame' 不变
-    result_frame = frame.copy()
-    if lines is not None:
-        for line in lines:
-            x1, y1, x2, y2 = line[0]
-            # 用鲜艳的红色粗线条画出检测到的直线
-            cv2.line(result_frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
-
-    # --- 显示结果 ---
-    
-    # 显示最终带有检测结果的图像
-    cv2.imshow("Line Detection Result", result_frame)
-    
-    # (调试用) 显示处理过程中的二值图像，方便你调整参数
-    cv2.imshow("Processed Binary Image", processed_image)
-
-
-    # 3. 监听键盘按键
-    # cv2.waitKey(1) 会等待1毫秒，看是否有按键。
-    # & 0xFF 是一个 recomendado 的位掩码，用于确保在所有系统上都能正确读取按键的ASCII码
-    key = cv2.waitKey(1) & 0xFF
-
-    # 如果按下的键是 'q'
-    if key == ord('q'):
-        print("检测到按键 'q'，正在退出循环...")
+    # D. 找面积最大的四边形外轮廓作为屏幕边框，计算到标准屏幕平面的透视变换
+    # 参数可以根据你的光照环境在 vision/pipeline.py 的 border_stages 中微调
+    found = screen.update(frame)
+
+    # 边框找到 / 丢失时每次都记录，边框位置每秒合并输出一次
+    if found != last_found:
+        telemetry.log('screen_state', value='found' if found else 'not found')
+        last_found = found
+    if found:
+        telemetry.event('screen', corners=np.round(screen.quad, 1).tolist())
+
+    # --- 显示结果（不阻塞） ---
+
+    # E. 显示线程在副本上用鲜艳的红色粗线条画出检测到的边框，原始 'frame' 保持不变
+    display.show(frame, (Outline(screen.quad),) if found else ())
+    if found and warped_display.enabled:
+        warped_display.show(screen.warp(frame))
+
+    # 3. 窗口只能在主线程刷新：每圈调用一次 poll()，按 DISPLAY_RATE 限速，同时读取按键
+    warped_display.poll()
+    if display.poll() == ord('q'):
+        # 如果按下的键是 'q'
+        telemetry.log('camera', value='quit')
         break
 
 # 4. 循环结束后，释放资源
 print("正在释放摄像头并关闭所有窗口...")
-cap.release()
-cv2.destroyAllWindows()
-print("程序已成功退出。")
\ No newline at end of file
+display.close()
+warped_display.close()
+telemetry.close()
+grabber.release()
+print(f"屏幕检测: {screen.stats()}")
+print(f"采集统计: {grabber.stats()}")
+print(f"显示: {display.stats()}")
+if profiling.ENABLED:
+    print(profiling.report())
+print("程序已成功退出。")
@@ -0,0 +1,262 @@
+# vision/camera_config.py
+"""
+摄像头采集参数的协商和校验。
+
+原来只设置了分辨率（perception.py 为 1280x720），其余都是驱动默认值：
+USB 摄像头在 1280x720 下默认常常是 YUYV 格式，只有 5 ~ 10 fps；自动曝光
+会把激光点照成一片饱和的白色，颜色分割反而找不到它。这里按固定顺序设置
+格式（FOURCC）、分辨率、帧率、驱动缓冲区、曝光和增益，再逐项读回驱动实际
+接受的值，不一致的列出来，而不是默认设置成功：
+
+    cap = cv2.VideoCapture(config.CAMERA_INDEX)
+    result = negotiate(cap, CameraSettings.from_config())
+    print(result)                       # 每项的请求值 / 实际值，不一致的标 !
+    print(measure_fps(cap))             # 实际读帧速率（驱动报告的 fps 不一定可信）
+
+FrameGrabber(index, settings=...) 在打开摄像头时调用 negotiate()，结果在 grabber.negotiation。
+
+曝光：OpenCV 的 V4L2 后端中 CAP_PROP_AUTO_EXPOSURE 为 1 表示手动、3 表示自动，
+CAP_PROP_EXPOSURE 的单位是 100 微秒。tune_exposure() 从短到长逐档尝试，返回
+检测器仍能稳定找到光点的最短曝光：曝光越短光点越不容易饱和、背景越暗，运动模糊也越小。
+
+跟踪阶段只需要光点附近的画面，可以换成 TRACKING（低分辨率、高帧率，pursuit.py 默认使用），
+像素坐标与全分辨率不同，按实际协商到的宽度换算（见 pursuit.py）。
+
+只用到 VideoCapture 的 get / set / read，可以换成模拟的驱动对象测试（见 __main__ 和 tests/）。
+"""
+import time
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+import cv2
+import numpy as np
+
+import config
+
+AUTO_EXPOSURE_MANUAL = 1        # V4L2 后端：手动曝光
+AUTO_EXPOSURE_AUTO = 3          # V4L2 后端：自动曝光（光圈优先）
+
+
+def fourcc_code(text):
+    return cv2.VideoWriter_fourcc(*text)
+
+
+def fourcc_text(value):
+    """cap.get(CAP_PROP_FOURCC) 返回的浮点数 -> 'MJPG' 这样的四个字符，无效时返回空字符串。"""
+    value = int(value)
+    text = ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4))
+    return text if text.isprintable() and value else ''
+
+
+@dataclass(frozen=True)
+class CameraSettings:
+    """
+    width, height:  分辨率
+    fps:            帧率
+    fourcc:         像素格式，按顺序尝试直到驱动接受其中一个
+    buffer_size:    驱动缓冲区帧数，1 表示不积压旧画面
+    exposure:       手动曝光（V4L2 单位 100 微秒），None 表示自动曝光
+    gain:           增益，None 表示不设置
+    """
+    width: int = config.FRAME_WIDTH
+    height: int = config.FRAME_HEIGHT
+    fps: float = config.CAMERA_FPS
+    fourcc: tuple = config.CAMERA_FOURCC
+    buffer_size: int = 1
+    exposure: Optional[float] = config.CAMERA_EXPOSURE
+    gain: Optional[float] = config.CAMERA_GAIN
+
+    @classmethod
+    def from_config(cls, **overrides):
+        return replace(cls(), **overrides)
+
+
+# 找光点、识别屏幕时用全分辨率；锁定光点后的跟踪阶段用低分辨率、高帧率
+CAPTURE = CameraSettings()
+TRACKING = CameraSettings(width=config.TRACK_WIDTH, height=config.TRACK_HEIGHT, fps=config.TRACK_FPS)
+
+
+@dataclass
+class Negotiation:
+    """negotiate() 的结果：每项的请求值和驱动实际接受的值。"""
+    requested: dict
+    granted: dict
+    mismatches: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.mismatches
+
+    def __str__(self):
+        lines = []
+        for name, wanted in self.requested.items():
+            flag = '!' if name in self.mismatches else ' '
+            lines.append(f" {flag} {name:12s} requested {wanted!s:>10s}  granted {self.granted.get(name)!s:>10s}")
+        return "\n".join(lines)
+
+
+def _close(wanted, got, tolerance):
+    if isinstance(wanted, str):
+        return wanted == got
+    return abs(got - wanted) <= tolerance * max(abs(wanted), 1.0)
+
+
+def negotiate(cap, settings):
+    """
+    按 格式 -> 分辨率 -> 帧率 -> 缓冲区 -> 曝光 -> 增益 的顺序设置（V4L2 在设置格式时
+    才确定可用的分辨率和帧率），然后读回每一项。返回 Negotiation。
+    """
+    fourcc = ''
+    for code in settings.fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, fourcc_code(code))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, settings.height)
+        fourcc = fourcc_text(cap.get(cv2.CAP_PROP_FOURCC))
+        if fourcc == code:
+            break
+    cap.set(cv2.CAP_PROP_FPS, settings.fps)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, settings.buffer_size)
+
+    requested = {'fourcc': settings.fourcc[0] if settings.fourcc else '',
+                 'width': settings.width, 'height': settings.height,
+                 'fps': settings.fps, 'buffer_size': settings.buffer_size}
+    if settings.exposure is None:
+        cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, AUTO_EXPOSURE_AUTO)
+        requested['auto_exposure'] = AUTO_EXPOSURE_AUTO
+    else:
+        cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, AUTO_EXPOSURE_MANUAL)
+        cap.set(cv2.CAP_PROP_EXPOSURE, settings.exposure)
+        requested['auto_exposure'] = AUTO_EXPOSURE_MANUAL
+        requested['exposure'] = settings.exposure
+    if settings.gain is not None:
+        cap.set(cv2.CAP_PROP_GAIN, settings.gain)
+        requested['gain'] = settings.gain
+
+    granted = {
+        'fourcc': fourcc_text(cap.get(cv2.CAP_PROP_FOURCC)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+        'buffer_size': int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        'auto_exposure': cap.get(cv2.CAP_PROP_AUTO_EXPOSURE),
+    }
+    if 'exposure' in requested:
+        granted['exposure'] = cap.get(cv2.CAP_PROP_EXPOSURE)
+    if 'gain' in requested:
+        granted['gain'] = cap.get(cv2.CAP_PROP_GAIN)
+
+    # 帧率允许 2% 的偏差（驱动常报 29.97 之类），曝光、增益按驱动的步进取整，允许 5%
+    tolerance = {'fps': 0.02, 'exposure': 0.05, 'gain': 0.05}
+    mismatches = [name for name, wanted in requested.items()
+                  if not _close(wanted, granted[name], tolerance.get(name, 0.0))]
+    # 第一选择的格式没有被接受，但后面的备选被接受了，不算失败
+    if 'fourcc' in mismatches and granted['fourcc'] in settings.fourcc:
+        mismatches.remove('fourcc')
+    return Negotiation(requested, granted, mismatches)
+
+
+def measure_fps(cap, frames=60, warmup=5, clock=time.monotonic):
+    """连续读 frames 帧的实际帧率（先丢掉 warmup 帧，等曝光和格式切换稳定）。读失败返回 0。"""
+    for _ in range(warmup):
+        if not cap.read()[0]:
+            return 0.0
+    t0 = clock()
+    for _ in range(frames):
+        if not cap.read()[0]:
+            return 0.0
+    elapsed = clock() - t0
+    return frames / elapsed if elapsed > 0 else float('inf')
+
+
+def tune_exposure(cap, detect, exposures, frames=10, settle=3, min_ratio=0.9):
+    """
+    exposures:  候选曝光值（V4L2 单位 100 微秒），从短到长尝试
+    detect:     检测函数，输入 BGR 图像，找不到返回 None
+    每档先丢掉 settle 帧，再读 frames 帧，光点检出率达到 min_ratio 即返回这一档。
+    返回 (曝光值或 None, {曝光值: 检出率})；曝光保持在返回的那一档（都不满足时为最后一档）。
+    """
+    cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, AUTO_EXPOSURE_MANUAL)
+    ratios = {}
+    for exposure in sorted(exposures):
+        cap.set(cv2.CAP_PROP_EXPOSURE, exposure)
+        for _ in range(settle):
+            cap.read()
+        found = 0
+        for _ in range(frames):
+            ok, image = cap.read()
+            if ok and detect(image) is not None:
+                found += 1
+        ratios[exposure] = found / frames
+        if ratios[exposure] >= min_ratio:
+            return exposure, ratios
+    return None, ratios
+
+
+if __name__ == '__main__':
+    import sys
+
+    class SimulatedDriver:
+        """
+        模拟的 USB 摄像头驱动：只支持几种格式 / 分辨率组合，帧率按格式和分辨率限制，
+        曝光按 1 取整并限制在 [3, 2047]；画面中激光点的亮度随曝光增加，太短时检测不到。
+        """
+        modes = {('MJPG', 1280, 720): 30, ('MJPG', 640, 360): 60,
+                 ('YUYV', 1280, 720): 10, ('YUYV', 640, 360): 30}
+
+        def __init__(self, formats=('MJPG', 'YUYV')):
+            self.formats = formats
+            self.props = {cv2.CAP_PROP_FOURCC: fourcc_code('YUYV'), cv2.CAP_PROP_FRAME_WIDTH: 640,
+                          cv2.CAP_PROP_FRAME_HEIGHT: 480, cv2.CAP_PROP_FPS: 30, cv2.CAP_PROP_BUFFERSIZE: 4,
+                          cv2.CAP_PROP_AUTO_EXPOSURE: AUTO_EXPOSURE_AUTO, cv2.CAP_PROP_EXPOSURE: 156,
+                          cv2.CAP_PROP_GAIN: 0}
+
+        def isOpened(self):
+            return True
+
+        def set(self, prop, value):
+            if prop == cv2.CAP_PROP_FOURCC:
+                if fourcc_text(value) not in self.formats:
+                    return False
+            elif prop == cv2.CAP_PROP_EXPOSURE:
+                value = min(max(round(value), 3), 2047)
+            elif prop == cv2.CAP_PROP_FPS:
+                mode = (fourcc_text(self.props[cv2.CAP_PROP_FOURCC]), int(self.props[cv2.CAP_PROP_FRAME_WIDTH]),
+                        int(self.props[cv2.CAP_PROP_FRAME_HEIGHT]))
+                value = min(value, self.modes.get(mode, 5))
+            self.props[prop] = value
+            return True
+
+        def get(self, prop):
+            return float(self.props.get(prop, 0))
+
+        def read(self):
+            h, w = int(self.props[cv2.CAP_PROP_FRAME_HEIGHT]), int(self.props[cv2.CAP_PROP_FRAME_WIDTH])
+            image = np.full((h, w, 3), 30, np.uint8)
+            level = min(int(self.props[cv2.CAP_PROP_EXPOSURE]) * 8, 255)
+            cv2.circle(image, (w // 2, h // 2), 4, (40, 40, level), -1)
+            return True, image
+
+        def release(self):
+            pass
+
+    from vision.pipeline import RED, detector_pipeline
+
+    for formats in (('MJPG', 'YUYV'), ('YUYV',)):
+        driver = SimulatedDriver(formats)
+        for name, settings in (('capture', CAPTURE), ('tracking', replace(TRACKING, exposure=20, gain=4))):
+            result = negotiate(driver, settings)
+            print(f"driver {'/'.join(formats)}, {name}: {'ok' if result.ok else 'MISMATCH ' + str(result.mismatches)}")
+            print(result)
+
+    pipeline = detector_pipeline((RED,), method='hsv')
+    driver = SimulatedDriver()
+    negotiate(driver, TRACKING)
+    exposure, ratios = tune_exposure(driver, lambda image: pipeline.run(image)['red'], [1, 2, 5, 10, 20, 50, 100])
+    print(f"shortest exposure with the dot found: {exposure} ({ratios})")
+    if len(sys.argv) > 1:
+        # python -m vision.camera_config 0：对真实摄像头协商并测量实际帧率
+        cap = cv2.VideoCapture(int(sys.argv[1]))
+        for name, settings in (('capture', CAPTURE), ('tracking', TRACKING)):
+            result = negotiate(cap, settings)
+            print(f"{name}:\n{result}\n  measured {measure_fps(cap):.1f} fps")
+        cap.release()
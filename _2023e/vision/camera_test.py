@@ -1,32 +1,37 @@
 import cv2
 
-# 1. 创建一个VideoCapture对象
-# 参数 0 表示使用系统中的第一个摄像头 (/dev/video0)
-cap = cv2.VideoCapture(0)
-
-# 2. 检查摄像头是否成功打开
-if not cap.isOpened():
+from vision.capture import FrameGrabber
+
+# 1. 创建一个 FrameGrabber 对象
+# 默认使用 config.CAMERA_INDEX 指定的摄像头（通常是 /dev/video0），
+# 后台线程持续读取，处理循环每次只拿最新的一帧
+try:
+    grabber = FrameGrabber().start()
+except IOError:
+    # 2. 摄像头没有成功打开
     print("错误：无法打开摄像头。")
     exit()
 
 # 3. 循环读取摄像头的每一帧
 while True:
-    # cap.read() 返回两个值：
-    # - ret: 一个布尔值，如果成功读取到帧，则为 True
-    # - frame: 捕获到的图像帧 (一个 NumPy 数组)
-    ret, frame = cap.read()
+    # grabber.read() 返回 Frame(seq, timestamp, image)：
+    # - seq: 帧序号，中间跳过的序号就是来不及处理、被丢弃的帧
+    # - timestamp: 采集时刻 (time.monotonic)
+    # - image: 捕获到的图像帧 (一个 NumPy 数组)
+    # 超时或摄像头断开时返回 None
+    frame = grabber.read()
 
     # 如果没有成功读取到帧 (例如摄像头被拔出)，则退出循环
-    if not ret:
+    if frame is None:
         print("无法接收帧，可能已到达视频流末尾。正在退出...")
         break
 
-    # 4. 在这里可以对 'frame' 进行你的视觉处理！
+    # 4. 在这里可以对 'frame.image' 进行你的视觉处理！
     # 例如：转换成灰度图
-    # gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    # gray_frame = cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY)
 
     # 5. 显示原始图像帧
-    cv2.imshow('My Vision Module - Press Q to Quit', frame)
+    cv2.imshow('My Vision Module - Press Q to Quit', frame.image)
 
     # 6. 等待按键，如果按下 'q'，则退出循环
     # cv2.waitKey(1) 表示等待1毫秒
@@ -34,6 +39,7 @@ while True:
         break
 
 # 7. 循环结束后，释放摄像头资源并关闭所有窗口
+print(f"采集统计: {grabber.stats()}")
 print("正在释放资源...")
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+grabber.release()
+cv2.destroyAllWindows()
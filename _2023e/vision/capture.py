@@ -0,0 +1,196 @@
+# vision/capture.py
+"""
+后台线程采集摄像头画面。
+
+原来各个循环都在处理函数里同步调用 cap.read()，采集耗时和处理耗时叠加，
+而且 OpenCV / V4L2 内部缓冲区会把旧画面交给我们。FrameGrabber 在后台线程中
+持续读取，放进一个很小的环形缓冲区，处理循环每次只拿最新的一帧
+（带时间戳和序号），来不及处理的帧直接丢弃并计数。
+
+source 可以是摄像头索引、视频文件路径，或者任何带 read() 方法的对象
+（例如 SyntheticSource），因此没有摄像头也能测试。
+"""
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import config
+from vision.camera_config import negotiate
+
+Frame = collections.namedtuple('Frame', ['seq', 'timestamp', 'image'])
+
+
+class SyntheticSource:
+    """
+    合成画面：深色背景上一个沿圆周运动的红色光点。
+    接口与 cv2.VideoCapture 相同（read / isOpened / release），
+    truth(i) 返回第 i 帧光点的真实位置。
+    """
+
+    def __init__(self, width=config.FRAME_WIDTH, height=config.FRAME_HEIGHT,
+                 fps=None, n_frames=None, radius=3, color=(40, 40, 255), noise=0):
+        self.width, self.height = width, height
+        self.fps = fps
+        self.n_frames = n_frames
+        self.radius = radius
+        self.color = color
+        self.index = 0
+        self._next_time = None
+        rng = np.random.default_rng(0)
+        self._background = np.full((height, width, 3), 30, np.uint8)
+        if noise:
+            self._background += rng.integers(0, noise, self._background.shape, dtype=np.uint8)
+
+    def truth(self, i):
+        cx, cy = self.width / 2, self.height / 2
+        r = min(self.width, self.height) / 3
+        angle = 2 * np.pi * i / 240
+        return cx + r * np.cos(angle), cy + r * np.sin(angle)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.n_frames is not None and self.index >= self.n_frames:
+            return False, None
+        if self.fps:
+            now = time.monotonic()
+            if self._next_time is None:
+                self._next_time = now
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+            self._next_time += 1.0 / self.fps
+        frame = self._background.copy()
+        x, y = self.truth(self.index)
+        cv2.circle(frame, (int(round(x)), int(round(y))), self.radius, self.color, -1)
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class FrameGrabber:
+    """
+    用法：
+        grabber = FrameGrabber(0).start()
+        frame = grabber.read()      # Frame(seq, timestamp, image)，超时返回 None
+        grabber.release()
+
+    buffer_size: 环形缓冲区的帧数，只保留最新的几帧
+    fps:         按该帧率读取源（视频文件默认按文件本身的帧率播放），None 表示尽快读取
+    settings:    摄像头采集参数（vision.camera_config.CameraSettings），source 为摄像头索引时
+                 代替 width / height 协商格式、帧率和曝光，结果在 self.negotiation
+    """
+
+    def __init__(self, source=config.CAMERA_INDEX, buffer_size=2, width=None, height=None, fps=None,
+                 settings=None):
+        self.negotiation = None
+        if isinstance(source, (int, str)):
+            self.cap = cv2.VideoCapture(source)
+            if not self.cap.isOpened():
+                raise IOError(f"无法打开视频源 {source}")
+            if isinstance(source, int) and settings is not None:
+                self.negotiation = negotiate(self.cap, settings)
+                width = height = None
+            elif isinstance(source, int):
+                # 驱动只保留一帧，避免读到积压的旧画面
+                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            elif fps is None:
+                fps = self.cap.get(cv2.CAP_PROP_FPS) or None
+            if width:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            if height:
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        else:
+            self.cap = source
+        self.fps = fps
+
+        self._ring = collections.deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.eof = False
+
+        self.captured = 0       # 已采集的帧数
+        self.delivered = 0      # 交给处理循环的帧数
+        self.dropped = 0        # 被更新的帧覆盖、没有处理的帧数
+        self._last_seq = -1
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        seq = 0
+        period = 1.0 / self.fps if self.fps else 0.0
+        next_time = time.monotonic()
+        while self._running:
+            if period:
+                now = time.monotonic()
+                if next_time > now:
+                    time.sleep(next_time - now)
+                next_time += period
+            ret, image = self.cap.read()
+            timestamp = time.monotonic()
+            with self._cond:
+                if not ret:
+                    self.eof = True
+                    self._cond.notify_all()
+                    break
+                self._ring.append(Frame(seq, timestamp, image))
+                self.captured += 1
+                self._cond.notify_all()
+            seq += 1
+
+    def read(self, timeout=1.0):
+        """
+        返回比上一次更新的最新一帧；超时或视频源结束时返回 None。
+        """
+        with self._cond:
+            def has_new():
+                return self.eof or (self._ring and self._ring[-1].seq > self._last_seq)
+            if not self._cond.wait_for(has_new, timeout):
+                return None
+            if not self._ring or self._ring[-1].seq <= self._last_seq:
+                return None
+            frame = self._ring[-1]
+            self.dropped += frame.seq - self._last_seq - 1
+            self.delivered += 1
+            self._last_seq = frame.seq
+            return frame
+
+    def stats(self):
+        return {'captured': self.captured, 'delivered': self.delivered, 'dropped': self.dropped}
+
+    def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        self.cap.release()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+if __name__ == '__main__':
+    # 用合成画面演示：30fps 的源，处理一帧需要 50ms，多出来的帧会被丢弃
+    with FrameGrabber(SyntheticSource(fps=30, n_frames=90)) as grabber:
+        while True:
+            frame = grabber.read()
+            if frame is None:
+                break
+            age = (time.monotonic() - frame.timestamp) * 1000
+            print(f"seq {frame.seq:3d}, age {age:5.1f} ms")
+            time.sleep(0.05)
+        print(grabber.stats())
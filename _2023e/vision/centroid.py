@@ -0,0 +1,90 @@
+# vision/centroid.py
+"""
+亚像素激光点定位。
+
+原来的检测函数用 int(M["m10"] / M["m00"]) 取整，屏幕上 1 像素约等于 1mm，
+取整直接限制了跟踪精度；而且对最大轮廓调用了两次 cv2.contourArea。
+这里用 connectedComponentsWithStats 一次得到所有连通域的像素数和外接矩形，
+用 NumPy 一次筛选出最佳光斑，再在它的外接矩形内按亮度加权求质心。
+连通域标记只在掩码非零像素的外接矩形内进行，光斑稀疏时代价很小。
+
+面积筛选（min_area / max_area）直接用 stats[:, CC_STAT_AREA] 的像素数，整组连通域一次比较，
+不再逐个轮廓调用 cv2.contourArea。原来的阈值按外轮廓面积调：外轮廓多边形的顶点在边界像素中心，
+比像素数小（单个像素为 0，5x5 的方块为 16）。对实心圆光斑逐个半径比较，
+外轮廓面积 > 1、> 10、< 50 分别等价于像素数 > 4、> 16、< 62，各检测函数的阈值已按此换算。
+"""
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# x, y: 亚像素质心；area: 像素数；peak: 光斑内最大亮度 (0-255)；
+# confidence: 0-1 的置信度
+Detection = namedtuple('Detection', ['x', 'y', 'area', 'peak', 'confidence'])
+
+
+class Blobs:
+    """
+    掩码中的连通域。labels 只覆盖非零像素的外接矩形，原点为 (ox, oy)；
+    stats 中的坐标已经换算为整幅图像坐标，CC_STAT_AREA 为像素数（面积筛选和排序都用它）。
+    """
+
+    def __init__(self, labels, stats, ox, oy):
+        self.labels = labels
+        self.stats = stats
+        self.ox, self.oy = ox, oy
+
+    def label_mask(self, label):
+        """连通域 label 在其外接矩形内的布尔掩码。"""
+        x, y, w, h = self.stats[label, :4]
+        x, y = x - self.ox, y - self.oy
+        return self.labels[y:y + h, x:x + w] == label
+
+
+def blob_stats(mask, min_area=0, max_area=None):
+    """
+    返回 (blobs, candidates)。candidates 是像素数在 (min_area, max_area) 之间的
+    连通域编号，按像素数从大到小排列。
+    """
+    ox, oy, w, h = cv2.boundingRect(mask)
+    if w == 0:
+        return None, np.zeros(0, np.int64)
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(mask[oy:oy + h, ox:ox + w], connectivity=8)
+    stats[:, cv2.CC_STAT_LEFT] += ox
+    stats[:, cv2.CC_STAT_TOP] += oy
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    keep = areas > min_area
+    if max_area is not None:
+        keep &= areas < max_area
+    candidates = np.flatnonzero(keep) + 1
+    candidates = candidates[np.argsort(-areas[candidates - 1], kind='stable')]
+    return Blobs(labels, stats, ox, oy), candidates
+
+
+def measure(frame, blobs, label):
+    """在连通域 label 的外接矩形内按亮度加权求质心。"""
+    x, y, w, h, area = blobs.stats[label]
+    # 亮度取 BGR 三通道的最大值（即 HSV 中的 V）
+    value = frame[y:y + h, x:x + w].max(axis=2) if frame.ndim == 3 else frame[y:y + h, x:x + w]
+    weights = np.where(blobs.label_mask(label), value, 0).astype(np.float64)
+    total = weights.sum()
+    if total <= 0:
+        return None
+    cx = x + (weights.sum(axis=0) @ np.arange(w)) / total
+    cy = y + (weights.sum(axis=1) @ np.arange(h)) / total
+    peak = float(weights.max())
+    # 置信度：亮度越高、光斑越接近实心圆（填充率接近 π/4），越可能是激光点
+    fill = area / float(w * h) / (np.pi / 4)
+    confidence = (peak / 255.0) * min(fill, 1.0 / fill if fill > 0 else 0.0)
+    return Detection(float(cx), float(cy), int(area), peak, float(confidence))
+
+
+def locate_dot(mask, frame, min_area=16, max_area=None):
+    """
+    在掩码中找面积最大的合格光斑，返回 Detection 或 None。
+    min_area / max_area 为像素数（开区间）；默认的 16 相当于原检测函数的外轮廓面积 10。
+    """
+    blobs, candidates = blob_stats(mask, min_area, max_area)
+    if candidates.size == 0:
+        return None
+    return measure(frame, blobs, candidates[0])
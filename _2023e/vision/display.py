@@ -0,0 +1,259 @@
+# vision/display.py
+"""
+与处理循环解耦的画面显示。
+
+原来的循环在每一帧上直接画圈、写字，再 imshow + waitKey(1)，这些都在关键路径上，
+而比赛时树莓派通常不接显示器。Display.show() 只记下最新一帧和要标注的点，
+显示线程按不超过 rate 的频率在副本上画标注并输出，处理循环不等待；
+target 为 None 时 show() 直接返回（无头运行）。
+
+HighGUI 窗口只能在主线程里操作（树莓派上 Qt / GTK 后端在其他线程调用 imshow 会出错），
+所以 'window' 输出时显示线程只负责画标注，画好的一帧放进只保留最新一帧的槽位，
+由主线程每圈循环调用一次 Display.poll() 取出来 imshow 并读按键（同样按 rate 限速）。
+
+输出方式（config.DISPLAY）：
+    'window'            OpenCV 窗口，按键记在 Display.key（poll() 也返回它）
+    'jpeg:路径'          定期覆盖写一张 JPEG（先写临时文件再改名，读的一方不会读到半张图）
+    'tcp://地址:端口'     监听端口，向每个连上的客户端推送 [4 字节大端长度][JPEG 数据]
+    'auto'              有图形界面（$DISPLAY）时等同 'window'，否则不显示
+"""
+import collections
+import os
+import socket
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import config
+
+# 标注：x, y 为像素坐标，label 为旁边的文字（可以为空），color 为 BGR
+Mark = collections.namedtuple('Mark', ['x', 'y', 'label', 'color'])
+Mark.__new__.__defaults__ = ('', (0, 255, 0))
+
+# 多边形标注（例如屏幕边框）：points 为 N x 2 的像素坐标
+Outline = collections.namedtuple('Outline', ['points', 'color'])
+Outline.__new__.__defaults__ = ((0, 0, 255),)
+
+
+def render(image, marks=(), text=None):
+    """在 image 的副本上画标注（Mark 或 Outline），返回副本。"""
+    canvas = image.copy()
+    for mark in marks:
+        if isinstance(mark, Outline):
+            cv2.polylines(canvas, [np.rint(mark.points).astype(np.int32)], True, mark.color, 3)
+            continue
+        cx, cy = int(round(mark.x)), int(round(mark.y))
+        cv2.circle(canvas, (cx, cy), 15, mark.color, 2)
+        if mark.label:
+            cv2.putText(canvas, mark.label, (cx + 10, cy - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, mark.color, 2)
+    if text:
+        cv2.putText(canvas, text, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    return canvas
+
+
+class JpegServer:
+    """非阻塞地接受客户端，向所有客户端推送带长度前缀的 JPEG。"""
+
+    def __init__(self, host, port):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(4)
+        self.sock.setblocking(False)
+        self.clients = []
+
+    def publish(self, data):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except BlockingIOError:
+                break
+            client.settimeout(0.5)
+            self.clients.append(client)
+        packet = struct.pack('>I', len(data)) + data
+        for client in list(self.clients):
+            try:
+                client.sendall(packet)
+            except OSError:
+                client.close()
+                self.clients.remove(client)
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+        self.sock.close()
+
+
+def resolve(target):
+    """把 config.DISPLAY 形式的设置换成 None、'window'、'jpeg:...' 或 'tcp://...'。"""
+    if target == 'auto':
+        return 'window' if os.environ.get('DISPLAY') else None
+    if target in (None, '', 'none', 'headless'):
+        return None
+    if target == 'window' or target.startswith(('jpeg:', 'tcp://')):
+        return target
+    raise ValueError(f"unknown display target: {target}")
+
+
+class Display:
+    """
+    target:  见模块说明，默认取 config.DISPLAY
+    rate:    最高刷新频率 (Hz)
+    title:   窗口标题
+
+    用法（在主线程中）：
+        display = Display(title='Laser Tracker').start()
+        while ...:
+            display.show(frame, [Mark(x, y, "label")], text="...")   # 不阻塞
+            if display.poll() == ord('q'): ...                      # 每圈调用一次
+        display.close()
+
+    show() 之后调用方不能再修改 image（显示线程在副本上画标注）。
+    show() 可以在任何线程调用；poll() 和 close() 必须在主线程调用。
+    """
+
+    def __init__(self, target=config.DISPLAY, rate=config.DISPLAY_RATE, title='frame', quality=70):
+        self.target = resolve(target)
+        self.period = 1.0 / rate
+        self.title = title
+        self.quality = quality
+        self.key = -1
+        self._latest = None
+        self._canvas = None         # 'window'：显示线程画好、等主线程 imshow 的最新一帧
+        self._window = False        # 窗口是否已经创建
+        self._next_poll = 0.0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.submitted = 0
+        self.rendered = 0
+
+    @property
+    def enabled(self):
+        return self.target is not None
+
+    def start(self):
+        if self.enabled and self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="display", daemon=True)
+            self._thread.start()
+        return self
+
+    def show(self, image, marks=(), text=None):
+        if self._thread is None:
+            return
+        with self._cond:
+            self._latest = (image, marks, text)
+            self.submitted += 1
+            self._cond.notify()
+
+    def _output(self):
+        target = self.target
+        if target == 'window':
+            def output(canvas):
+                # 只保留最新一帧，由主线程在 poll() 中显示
+                with self._cond:
+                    self._canvas = canvas
+            return output, lambda: None
+        encode = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        if target.startswith('jpeg:'):
+            path = target[len('jpeg:'):]
+            tmp = path + '.tmp'
+
+            def output(canvas):
+                ok, data = cv2.imencode('.jpg', canvas, encode)
+                if ok:
+                    with open(tmp, 'wb') as f:
+                        f.write(data.tobytes())
+                    os.replace(tmp, path)
+            return output, lambda: None
+        host, port = target[len('tcp://'):].rsplit(':', 1)
+        server = JpegServer(host, int(port))
+
+        def output(canvas):
+            ok, data = cv2.imencode('.jpg', canvas, encode)
+            if ok:
+                server.publish(data.tobytes())
+        return output, server.close
+
+    def _run(self):
+        output, close = self._output()
+        next_time = time.monotonic()
+        try:
+            while self._running:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._latest is not None or not self._running)
+                    latest, self._latest = self._latest, None
+                if latest is not None:
+                    output(render(*latest))
+                    self.rendered += 1
+                # 限制刷新频率：这段时间内到达的帧只保留最新一帧
+                now = time.monotonic()
+                next_time = max(next_time + self.period, now)
+                time.sleep(next_time - now)
+        finally:
+            close()
+
+    def poll(self):
+        """
+        主线程每圈循环调用一次：'window' 输出时显示最新画好的一帧、处理窗口事件并读取按键，
+        按 rate 限速，其余时候只比较一次时间。其他输出方式直接返回。返回 self.key。
+        """
+        if self.target != 'window' or self._thread is None:
+            return self.key
+        now = time.monotonic()
+        if now < self._next_poll:
+            return self.key
+        self._next_poll = now + self.period
+        with self._cond:
+            canvas, self._canvas = self._canvas, None
+        if canvas is not None:
+            cv2.imshow(self.title, canvas)
+            self._window = True
+        if self._window:
+            key = cv2.waitKey(1)
+            if key != -1:
+                self.key = key & 0xFF
+        return self.key
+
+    def stats(self):
+        return {'submitted': self.submitted, 'rendered': self.rendered}
+
+    def close(self):
+        if self._thread is not None:
+            with self._cond:
+                self._running = False
+                self._cond.notify()
+            self._thread.join(1.0)
+            self._thread = None
+        if self._window:
+            cv2.destroyWindow(self.title)
+            self._window = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    import sys
+    from vision.capture import SyntheticSource
+
+    # 合成画面 200 帧尽快送入，显示线程按 DISPLAY_RATE 只画其中一部分
+    target = sys.argv[1] if len(sys.argv) > 1 else 'jpeg:/tmp/display.jpg'
+    source = SyntheticSource(radius=4)
+    with Display(target, title='display demo') as display:
+        t0 = time.perf_counter()
+        for i in range(200):
+            frame = source.read()[1]
+            x, y = source.truth(i)
+            display.show(frame, [Mark(x, y, f"({x:.1f}, {y:.1f})")], text=f"frame {i}")
+            display.poll()
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - t0
+    print(f"{target}: {display.stats()} in {elapsed:.2f} s")
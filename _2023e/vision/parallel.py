@@ -0,0 +1,287 @@
+# vision/parallel.py
+"""
+多进程检测。
+
+各入口脚本的循环在一个线程里依次做采集、颜色分割、连通域和显示，四核的树莓派 5
+只用上了一个核。采集已经在 FrameGrabber 的线程里、电机输出在 MotionService 的线程里，
+ParallelDetector 把中间的检测交给多个工作进程：
+
+    FrameGrabber 线程 -> 送帧线程 -> 共享内存槽 -> 工作进程 × N -> 按序号重排 -> 调用方（控制 / 电机）
+
+画面通过 multiprocessing.shared_memory 中的 slots 个帧槽传递，队列里只有 (序号, 槽号)，
+不做 pickle；检测结果（Detection 等小对象）再经队列传回。槽全部占用时送帧线程等待，
+期间相机的新画面覆盖旧画面（FrameGrabber 只保留最新一帧），在途帧数不超过 slots，
+端到端延迟因此有上限。结果按提交顺序交给调用方，与工作进程完成的先后无关。
+
+工作进程用 spawn 方式启动（不继承采集线程和 OpenCV 线程池的状态），各自只用一个
+OpenCV 线程，并各自建立自己的流水线缓冲区。工作进程意外退出时它手上的帧不会再有结果，
+get() 每隔 WORKER_CHECK 秒检查一次工作进程，发现退出就抛出 RuntimeError，而不是一直等下去。
+
+pursuit.py --workers N 用它做红、绿两个光点的整帧检测。
+"""
+import collections
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+import config
+from vision.pipeline import RED, detector_pipeline, multi_target_pipeline
+
+# seq: 提交序号；timestamp: 画面采集时刻；value: 检测结果；
+# latency: 采集到结果取回的时间（秒）；busy: 工作进程处理这一帧的时间（秒）
+Result = collections.namedtuple('Result', ['seq', 'timestamp', 'value', 'latency', 'busy'])
+
+# get() 等待结果时检查工作进程是否还在运行的间隔（秒）
+WORKER_CHECK = 0.5
+
+
+class TargetDetector:
+    """
+    工作进程中的检测函数：返回 {目标名称: Detection 或 None}。
+    流水线在第一次调用时才建立，对象本身可以 pickle 后交给工作进程。
+    """
+
+    def __init__(self, targets=(RED,), method='hsv'):
+        self.targets = tuple(targets)
+        self.method = method
+        self._pipeline = None
+
+    def __call__(self, image):
+        if self._pipeline is None:
+            if len(self.targets) > 1:
+                self._pipeline = multi_target_pipeline(self.targets, shape=image.shape)
+            else:
+                self._pipeline = detector_pipeline(self.targets, self.method, shape=image.shape)
+        ctx = self._pipeline.run(image)
+        return {target.name: ctx[target.name] for target in self.targets}
+
+
+def _worker(detect, name, shape, slots, tasks, results):
+    cv2.setNumThreads(1)
+    shm = shared_memory.SharedMemory(name=name)
+    ring = np.ndarray((slots,) + shape, np.uint8, buffer=shm.buf)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot = task
+            t0 = time.perf_counter()
+            try:
+                value = detect(ring[slot])
+            except Exception as e:
+                value = e
+            results.put((seq, slot, value, time.perf_counter() - t0))
+    finally:
+        del ring
+        shm.close()
+
+
+class ParallelDetector:
+    """
+    detect:   可 pickle 的检测函数，输入 BGR 图像，返回可 pickle 的结果
+    shape:    画面尺寸 (h, w, 3)
+    workers:  工作进程数，默认为 CPU 核数减一（留一个核给采集、控制和显示）
+    slots:    共享内存帧槽数（在途帧数上限），默认 workers + 1
+
+    用法：
+        with ParallelDetector(TargetDetector(), workers=3) as pool:
+            pool.feed(grabber)                  # 或者自己调用 submit()
+            while True:
+                result = pool.get()             # 按采集顺序
+    """
+
+    def __init__(self, detect=None, shape=(config.FRAME_HEIGHT, config.FRAME_WIDTH, 3),
+                 workers=None, slots=None):
+        self.detect = detect if detect is not None else TargetDetector()
+        self.shape = tuple(shape)
+        self.workers = workers or max(multiprocessing.cpu_count() - 1, 1)
+        self.slots = slots or self.workers + 1
+        self._shm = None
+        self._ring = None
+        self._processes = []
+        self._free = queue.Queue()
+        self._times = {}            # seq -> 采集时刻
+        self._done = {}             # 已完成、还没轮到交出的结果
+        self._lock = threading.Lock()
+        self._next_submit = 0
+        self._next_result = 0
+        self._feeder = None
+        self._feeding = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+
+    def start(self):
+        if self._processes:
+            return self
+        ctx = multiprocessing.get_context('spawn')
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * int(np.prod(self.shape)))
+        self._ring = np.ndarray((self.slots,) + self.shape, np.uint8, buffer=self._shm.buf)
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        for slot in range(self.slots):
+            self._free.put(slot)
+        for i in range(self.workers):
+            process = ctx.Process(target=_worker, name=f"vision-worker-{i}", daemon=True,
+                                  args=(self.detect, self._shm.name, self.shape, self.slots,
+                                        self._tasks, self._results))
+            process.start()
+            self._processes.append(process)
+        return self
+
+    def submit(self, image, timestamp=None, timeout=None):
+        """
+        把一帧拷进空闲的帧槽并交给工作进程，返回提交序号；timeout 内没有空闲槽时返回 None。
+        timestamp 默认为当前时刻（time.monotonic）。
+        """
+        try:
+            slot = self._free.get(timeout=timeout) if timeout != 0 else self._free.get_nowait()
+        except queue.Empty:
+            return None
+        np.copyto(self._ring[slot], image)
+        with self._lock:
+            seq = self._next_submit
+            self._next_submit += 1
+            self._times[seq] = time.monotonic() if timestamp is None else timestamp
+        self.submitted += 1
+        self._tasks.put((seq, slot))
+        return seq
+
+    @property
+    def pending(self):
+        """已提交、还没有交出结果的帧数。"""
+        return self._next_submit - self._next_result
+
+    def get(self, timeout=None):
+        """
+        按提交顺序返回下一个 Result；timeout 秒内等不到返回 None。
+        有工作进程已经退出时抛出 RuntimeError。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._next_result not in self._done:
+            wait = WORKER_CHECK
+            if deadline is not None:
+                wait = min(max(deadline - time.monotonic(), 0.0), wait)
+            try:
+                seq, slot, value, busy = self._results.get(timeout=wait)
+            except queue.Empty:
+                self._check_workers()
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+                continue
+            self._free.put(slot)
+            if isinstance(value, Exception):
+                self.errors += 1
+                value = None
+            self.busy_time += busy
+            self._done[seq] = (value, busy, time.monotonic())
+        seq = self._next_result
+        self._next_result += 1
+        value, busy, received = self._done.pop(seq)
+        with self._lock:
+            timestamp = self._times.pop(seq)
+        self.completed += 1
+        return Result(seq, timestamp, value, received - timestamp, busy)
+
+    def _check_workers(self):
+        for process in self._processes:
+            if not process.is_alive():
+                raise RuntimeError(f"{process.name} exited with code {process.exitcode}, "
+                                   f"{self.pending} frame(s) will never complete")
+
+    def feed(self, grabber):
+        """启动送帧线程：每有一个空闲帧槽，就把 grabber 的最新一帧交给工作进程。"""
+        def run():
+            while self._feeding:
+                try:
+                    slot = self._free.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                self._free.put(slot)
+                frame = grabber.read(timeout=0.1)
+                if frame is None:
+                    if grabber.eof:
+                        break
+                    continue
+                self.submit(frame.image, frame.timestamp)
+
+        self._feeding = True
+        self._feeder = threading.Thread(target=run, name="vision-feeder", daemon=True)
+        self._feeder.start()
+        return self
+
+    def stats(self):
+        return {'workers': self.workers, 'submitted': self.submitted, 'completed': self.completed,
+                'errors': self.errors, 'busy_time': self.busy_time}
+
+    def close(self):
+        self._feeding = False
+        if self._feeder is not None:
+            self._feeder.join(1.0)
+            self._feeder = None
+        if not self._processes:
+            return
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(2.0)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._tasks.close()
+        self._results.close()
+        self._ring = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    from vision.capture import SyntheticSource
+    from vision.pipeline import GREEN
+
+    # 合成画面尽快送入，比较单进程和不同工作进程数的吞吐量、延迟
+    source = SyntheticSource(radius=4)
+    frames = [source.read()[1] for _ in range(300)]
+    detect = TargetDetector((RED, GREEN))
+
+    t0 = time.perf_counter()
+    for frame in frames:
+        detect(frame)
+    serial = len(frames) / (time.perf_counter() - t0)
+    print(f"in-process : {serial:7.1f} fps")
+
+    for workers in sorted({1, 2, max(multiprocessing.cpu_count() - 1, 1), multiprocessing.cpu_count()}):
+        with ParallelDetector(detect, frames[0].shape, workers=workers) as pool:
+            # 预热：工作进程启动、建立流水线
+            pool.submit(frames[0])
+            pool.get()
+            latencies = []
+            seqs = []
+            t0 = time.perf_counter()
+            submitted = 0
+            while len(latencies) < len(frames):
+                while submitted < len(frames) and pool.submit(frames[submitted], timeout=0) is not None:
+                    submitted += 1
+                result = pool.get()
+                seqs.append(result.seq)
+                latencies.append(result.latency)
+            fps = len(frames) / (time.perf_counter() - t0)
+            assert seqs == sorted(seqs)
+            lat = np.array(latencies) * 1000
+            print(f"{workers} worker(s): {fps:7.1f} fps ({fps / serial:.2f}x), latency p50 {np.percentile(lat, 50):6.2f} "
+                  f"p99 {np.percentile(lat, 99):6.2f} ms, in order, {pool.stats()}")
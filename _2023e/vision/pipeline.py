@@ -0,0 +1,443 @@
+# vision/pipeline.py
+"""
+可配置的视觉处理流水线。
+
+find_laser_dot、detect_laser_position_improved 和 camera.py 的直线检测原来是
+三段各自复制的循环，各有一套写死的 HSV 常量。这里把它们拆成可组合的处理阶段：
+颜色转换、掩码、形态学、连通域筛选、质心。每个阶段按图像尺寸预先分配缓冲区，
+流水线记录每个阶段的耗时。多个颜色共用一个颜色转换阶段，
+例如红、绿激光点检测每帧只做一次 HSV 转换。
+
+阶段之间通过一个字典（ctx）传递数据：
+    ctx['frame']        输入图像
+    ctx['hsv']          HSV 图像
+    ctx['mask_red']     红色掩码
+    ctx['blobs_red']    (Blobs, 候选编号)
+    ctx['red']          Detection 或 None
+
+multi_target_pipeline 用一张多类别查找表一次遍历同时分类红、绿像素，
+两种颜色共用一次形态学和一次连通域标记，再按每个光斑内的多数类别分配给各目标：
+    ctx['classes']      类别图（0 为背景，1, 2, ... 对应各目标）
+形态学直接作用在类别图上：平坦核的灰度开、闭运算与阈值化可交换，
+结果的非零区域与对所有目标的并集掩码做开、闭运算完全相同，省去单独生成并集掩码。
+"""
+import collections
+import copy
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+
+import config
+from vision.red_mask import RED_RANGES, MORPH_KERNEL, LutMask, build_hsv_lut, label_lut
+from vision.centroid import blob_stats, measure
+
+
+@dataclass
+class Target:
+    """一种需要检测的光点。"""
+    name: str
+    ranges: tuple                       # ((HSV下限, HSV上限), ...)
+    min_area: float = 16                # 面积筛选（像素数，开区间；相当于原来的外轮廓面积 10）
+    max_area: Optional[float] = None
+    morphology: bool = True             # 是否做 5x5 开、闭运算
+
+
+RED = Target('red', RED_RANGES)
+GREEN = Target('green', ((config.GREEN_LOWER, config.GREEN_UPPER),))
+
+
+class StageTiming:
+    """单个阶段的耗时统计。keep_samples=True 时保留每次的耗时（ns），用于计算分位数。"""
+    __slots__ = ('count', 'total_ns', 'max_ns', 'samples')
+
+    def __init__(self, keep_samples=False):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.samples = [] if keep_samples else None
+
+    def add(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        if self.samples is not None:
+            self.samples.append(ns)
+
+    @property
+    def mean_ms(self):
+        return self.total_ns / self.count / 1e6 if self.count else 0.0
+
+
+class Stage:
+    """处理阶段基类。allocate 在图像尺寸变化时调用，用于预分配缓冲区。"""
+    name = 'stage'
+
+    def allocate(self, shape):
+        pass
+
+    def __call__(self, ctx):
+        raise NotImplementedError
+
+
+# --- 颜色转换 ---
+
+class ConvertColor(Stage):
+    def __init__(self, out, code, channels):
+        self.name = out
+        self.out = out
+        self.code = code
+        self.channels = channels
+
+    def allocate(self, shape):
+        h, w = shape[:2]
+        self.buffer = np.empty((h, w, self.channels) if self.channels > 1 else (h, w), np.uint8)
+
+    def __call__(self, ctx):
+        ctx[self.out] = cv2.cvtColor(ctx['frame'], self.code, dst=self.buffer)
+
+
+def to_hsv():
+    return ConvertColor('hsv', cv2.COLOR_BGR2HSV, 3)
+
+
+def to_gray():
+    return ConvertColor('gray', cv2.COLOR_BGR2GRAY, 1)
+
+
+# --- 掩码 ---
+
+class InRange(Stage):
+    """在 HSV 图像上对一个或多个范围做 inRange 并合并。"""
+
+    def __init__(self, target):
+        self.name = f'mask_{target.name}'
+        self.out = self.name
+        self.bounds = [(np.array(lower), np.array(upper)) for lower, upper in target.ranges]
+
+    def allocate(self, shape):
+        h, w = shape[:2]
+        self.buffer = np.empty((h, w), np.uint8)
+        self.part = np.empty((h, w), np.uint8)
+
+    def __call__(self, ctx):
+        hsv = ctx['hsv']
+        (lower, upper), rest = self.bounds[0], self.bounds[1:]
+        cv2.inRange(hsv, lower, upper, dst=self.buffer)
+        for lower, upper in rest:
+            cv2.inRange(hsv, lower, upper, dst=self.part)
+            cv2.bitwise_or(self.buffer, self.part, dst=self.buffer)
+        ctx[self.out] = self.buffer
+
+
+class LutClassify(Stage):
+    """直接在 BGR 图像上查表得到掩码，不需要 HSV 转换（见 red_mask.py）。"""
+
+    def __init__(self, target, lut=None):
+        self.name = f'mask_{target.name}'
+        self.out = self.name
+        self.lut = lut if lut is not None else build_hsv_lut(target.ranges)
+
+    def allocate(self, shape):
+        self.classify = LutMask(self.lut)
+
+    def __call__(self, ctx):
+        ctx[self.out] = self.classify(ctx['frame'])
+
+
+class LabelClassify(Stage):
+    """一次查表同时分类多个目标，ctx['classes'] 为类别图。"""
+    name = 'classes'
+
+    def __init__(self, targets):
+        self.lut = label_lut(*(target.ranges for target in targets))
+
+    def allocate(self, shape):
+        self.classify = LutMask(self.lut)
+
+    def __call__(self, ctx):
+        ctx['classes'] = self.classify(ctx['frame'])
+
+
+# --- 形态学 ---
+
+class Morphology(Stage):
+    """
+    对 ctx[key] 依次做形态学运算，结果写回 ctx[key]。
+    sparse=True 时只在非零像素外接矩形（加边距）内运算，结果与整幅运算一致，
+    适合激光点这类稀疏掩码。
+    """
+
+    def __init__(self, key, ops, sparse=True):
+        self.name = f'morph_{key}'
+        self.key = key
+        self.ops = ops   # [(cv2.MORPH_*, kernel, iterations), ...]
+        self.sparse = sparse
+        # 每次开/闭运算最多向外扩展 (核半径 * 迭代次数 * 2) 个像素
+        self.margin = 2 + sum(max(kernel.shape) // 2 * iterations * 2 for _, kernel, iterations in ops)
+
+    def allocate(self, shape):
+        h, w = shape[:2]
+        self.buffers = (np.empty((h, w), np.uint8), np.empty((h, w), np.uint8))
+
+    def __call__(self, ctx):
+        mask = ctx[self.key]
+        if self.sparse:
+            x, y, w, h = cv2.boundingRect(mask)
+            if w == 0:
+                return
+            height, width = mask.shape
+            x0, y0 = max(x - self.margin, 0), max(y - self.margin, 0)
+            x1, y1 = min(x + w + self.margin, width), min(y + h + self.margin, height)
+            region = (slice(y0, y1), slice(x0, x1))
+        else:
+            region = (slice(None), slice(None))
+
+        src = mask[region]
+        for i, (op, kernel, iterations) in enumerate(self.ops):
+            dst = self.buffers[i % 2][region]
+            cv2.morphologyEx(src, op, kernel, dst=dst, iterations=iterations)
+            src = dst
+        if self.sparse:
+            # 区域之外本来就是 0，把结果拷回原掩码即可
+            mask[region] = src
+        else:
+            ctx[self.key] = self.buffers[(len(self.ops) - 1) % 2]
+
+
+def open_close(key):
+    return Morphology(key, [(cv2.MORPH_OPEN, MORPH_KERNEL, 1), (cv2.MORPH_CLOSE, MORPH_KERNEL, 1)])
+
+
+# --- 连通域和质心 ---
+
+class BlobFilter(Stage):
+    def __init__(self, target):
+        self.name = f'blobs_{target.name}'
+        self.key = f'mask_{target.name}'
+        self.out = self.name
+        self.min_area = target.min_area
+        self.max_area = target.max_area
+
+    def __call__(self, ctx):
+        ctx[self.out] = blob_stats(ctx[self.key], self.min_area, self.max_area)
+
+
+class Centroid(Stage):
+    """取面积最大的候选光斑，亮度加权求亚像素质心。"""
+
+    def __init__(self, target):
+        self.name = f'centroid_{target.name}'
+        self.key = f'blobs_{target.name}'
+        self.out = target.name
+
+    def __call__(self, ctx):
+        blobs, candidates = ctx[self.key]
+        ctx[self.out] = measure(ctx['frame'], blobs, candidates[0]) if candidates.size else None
+
+
+class ClassifyBlobs(Stage):
+    """
+    对类别图的非零区域做一次连通域标记，按光斑内多数像素的类别分配给各目标，
+    每个目标取满足其面积条件的最大光斑，结果在 ctx[target.name]。
+    """
+    name = 'blobs'
+
+    def __init__(self, targets):
+        self.targets = list(targets)
+        self.min_area = min(target.min_area for target in self.targets)
+
+    def __call__(self, ctx):
+        targets = self.targets
+        for target in targets:
+            ctx[target.name] = None
+        classes = ctx['classes']
+        blobs, candidates = blob_stats(classes, self.min_area)
+        remaining = len(targets)
+        for label in candidates:
+            x, y, w, h, area = blobs.stats[label]
+            votes = np.bincount(classes[y:y + h, x:x + w][blobs.label_mask(label)],
+                                minlength=len(targets) + 1)
+            votes[0] = 0
+            if not votes.any():
+                continue
+            target = targets[votes.argmax() - 1]
+            if ctx[target.name] is not None or area <= target.min_area:
+                continue
+            if target.max_area is not None and area >= target.max_area:
+                continue
+            ctx[target.name] = measure(ctx['frame'], blobs, label)
+            remaining -= 1
+            if remaining == 0:
+                break
+
+
+# --- 屏幕边框（vision/screen_geometry.py） ---
+
+class GaussianBlur(Stage):
+    def __init__(self, key, out, ksize):
+        self.name = out
+        self.key, self.out, self.ksize = key, out, ksize
+
+    def allocate(self, shape):
+        self.buffer = np.empty(shape[:2], np.uint8)
+
+    def __call__(self, ctx):
+        ctx[self.out] = cv2.GaussianBlur(ctx[self.key], self.ksize, 0, dst=self.buffer)
+
+
+class AdaptiveThreshold(Stage):
+    def __init__(self, key, out, block_size=21, c=5):
+        self.name = out
+        self.key, self.out = key, out
+        self.block_size, self.c = block_size, c
+
+    def allocate(self, shape):
+        self.buffer = np.empty(shape[:2], np.uint8)
+
+    def __call__(self, ctx):
+        ctx[self.out] = cv2.adaptiveThreshold(ctx[self.key], 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                              cv2.THRESH_BINARY_INV, self.block_size, self.c,
+                                              dst=self.buffer)
+
+
+# --- 流水线 ---
+
+class Pipeline:
+    """
+    按顺序执行各阶段，记录每个阶段的耗时（StageTiming）。
+    run() 返回的 ctx 字典和其中的数组在下一次 run() 时会被复用。
+
+    缓冲区按图像尺寸分组保存：RoiTracker 交替传入几种固定尺寸的窗口和整幅画面，
+    每种尺寸第一次出现时复制一组阶段对象并分配缓冲区，之后切换尺寸不再分配。
+    最多保留 max_shapes 组，超出时丢弃最久没有用过的一组。
+    """
+
+    def __init__(self, stages, shape=(config.FRAME_HEIGHT, config.FRAME_WIDTH, 3), max_shapes=8):
+        self.stages = list(stages)
+        self.timings = {stage.name: StageTiming() for stage in self.stages}
+        self.max_shapes = max_shapes
+        self._ctx = {}
+        self._variants = collections.OrderedDict()   # 图像尺寸 -> 分配好缓冲区的阶段对象
+        self._active = self.stages
+        self._shape = None
+        self._allocate(shape)
+
+    def _allocate(self, shape):
+        variants = self._variants
+        stages = variants.get(shape)
+        if stages is None:
+            stages = [copy.copy(stage) for stage in self.stages] if variants else self.stages
+            for stage in stages:
+                stage.allocate(shape)
+            variants[shape] = stages
+            if len(variants) > self.max_shapes:
+                variants.popitem(last=False)
+        else:
+            variants.move_to_end(shape)
+        self._active = stages
+        self._shape = shape
+
+    def run(self, frame):
+        if frame.shape != self._shape:
+            self._allocate(frame.shape)
+        ctx = self._ctx
+        ctx.clear()
+        ctx['frame'] = frame
+        clock = time.perf_counter_ns
+        timings = self.timings
+        for stage in self._active:
+            t0 = clock()
+            stage(ctx)
+            timings[stage.name].add(clock() - t0)
+        return ctx
+
+    def reset_timings(self, keep_samples=False):
+        self.timings = {stage.name: StageTiming(keep_samples) for stage in self.stages}
+
+    def report(self):
+        lines = []
+        total = 0.0
+        for name, timing in self.timings.items():
+            total += timing.mean_ms
+            lines.append(f"  {name:18s} mean {timing.mean_ms:7.3f} ms  max {timing.max_ns / 1e6:7.3f} ms")
+        lines.append(f"  {'total':18s} mean {total:7.3f} ms")
+        return "\n".join(lines)
+
+
+def detector_pipeline(targets=(RED,), method='hsv', shape=(config.FRAME_HEIGHT, config.FRAME_WIDTH, 3)):
+    """
+    光点检测流水线。method='hsv' 时所有目标共用一次 HSV 转换；
+    method='lut' 时每个目标直接在 BGR 图像上查表；实测单一颜色时查表比
+    cvtColor + inRange 慢（见 red_mask.py），各入口脚本都用 'hsv'。
+    检测结果在 ctx[target.name] 中。
+    """
+    stages = []
+    if method == 'hsv':
+        stages.append(to_hsv())
+    for target in targets:
+        if method == 'hsv':
+            stages.append(InRange(target))
+        elif method == 'lut':
+            stages.append(LutClassify(target))
+        else:
+            raise ValueError(f"unknown mask method: {method}")
+        if target.morphology:
+            stages.append(open_close(f'mask_{target.name}'))
+        stages.append(BlobFilter(target))
+        stages.append(Centroid(target))
+    return Pipeline(stages, shape)
+
+
+def multi_target_pipeline(targets=(RED, GREEN), shape=(config.FRAME_HEIGHT, config.FRAME_WIDTH, 3)):
+    """
+    多目标光点检测：一次查表、一次形态学、一次连通域标记，代价接近单色检测。
+    两个不同颜色的光斑相距小于形态学核时会被闭运算连成一个，按多数类别只算作其中一个。
+    检测结果在 ctx[target.name] 中。
+    """
+    stages = [LabelClassify(targets)]
+    if any(target.morphology for target in targets):
+        stages.append(open_close('classes'))
+    stages.append(ClassifyBlobs(targets))
+    return Pipeline(stages, shape)
+
+
+def border_stages():
+    """灰度、高斯模糊、自适应阈值、闭运算，得到屏幕边框等深色线条的二值图 ctx['binary']。"""
+    return [
+        to_gray(),
+        GaussianBlur('gray', 'blurred', (7, 7)),
+        AdaptiveThreshold('blurred', 'binary'),
+        Morphology('binary', [(cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8), 2)], sparse=False),
+    ]
+
+
+def border_pipeline(shape=(config.FRAME_HEIGHT, config.FRAME_WIDTH, 3)):
+    return Pipeline(border_stages(), shape)
+
+
+if __name__ == '__main__':
+    from vision.capture import SyntheticSource
+
+    # 红点沿圆周运动，另画一个始终在圆周对面的绿点
+    source = SyntheticSource(radius=4, noise=8)
+    frames = []
+    for i in range(100):
+        frame = source.read()[1]
+        x, y = source.truth(i)
+        cv2.circle(frame, (int(source.width - x), int(source.height - y)), 4, (40, 255, 40), -1)
+        frames.append(frame)
+
+    for title, pipeline in (('hsv, red only', detector_pipeline((RED,))),
+                            ('lut, red only', detector_pipeline((RED,), method='lut')),
+                            ('hsv, red + green', detector_pipeline((RED, GREEN))),
+                            ('multi-target lut', multi_target_pipeline((RED, GREEN)))):
+        pipeline.run(frames[0])  # 生成查找表，不计入时间
+        pipeline.reset_timings()
+        for frame in frames:
+            ctx = pipeline.run(frame)
+        print(f"{title}: red {ctx['red']}, green {ctx.get('green')}")
+        print(pipeline.report())
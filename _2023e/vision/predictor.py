@@ -0,0 +1,209 @@
+# vision/predictor.py
+"""
+激光点运动预测。
+
+一次检测结果交给电机时，光点已经又走了一帧以上；光点短暂消失时原来的代码
+只打印 "Laser dot not found."。这里按匀速模型跟踪光点：
+    update(x, y, t)   用 t 时刻（画面采集时刻）的检测结果修正状态
+    predict(t)        外推到 t 时刻（通常是电机动作的时刻），跟丢时返回 None
+    coast(t)          t 时刻这一帧没有检测到：max_coast 秒之内继续按速度外推，超过则判定跟丢
+    search_radius(t)  t 时刻预测位置的不确定范围（像素），RoiTracker 用它确定搜索窗口
+
+AlphaBetaPredictor 固定增益，计算量最小；KalmanPredictor 按画面间隔自动调整增益，
+间隔不均匀（丢帧、处理时间波动）时更稳。两者接口相同，X、Y 两轴独立、共用同一组参数。
+"""
+import math
+
+
+class Predictor:
+    """
+    max_coast:    光点消失后继续外推的最长时间（秒）
+    min_radius:   搜索半径下限（像素），需大于光点尺寸
+    """
+
+    def __init__(self, max_coast=0.25, min_radius=16):
+        self.max_coast = max_coast
+        self.min_radius = min_radius
+        self.updates = 0
+        self.coasted = 0
+        self.dropouts = 0
+        self.reset()
+
+    def reset(self):
+        self.x = self.y = 0.0
+        self.vx = self.vy = 0.0
+        self.last_time = None
+
+    @property
+    def active(self):
+        return self.last_time is not None
+
+    def update(self, x, y, timestamp):
+        """用 timestamp 时刻的检测结果修正状态，返回修正后的位置。"""
+        self.updates += 1
+        if self.last_time is None:
+            self.x, self.y = float(x), float(y)
+            self.vx = self.vy = 0.0
+            self._start()
+        else:
+            dt = timestamp - self.last_time
+            if dt > 0:
+                self._correct(float(x), float(y), dt)
+            else:
+                self.x, self.y = float(x), float(y)
+        self.last_time = timestamp
+        return self.x, self.y
+
+    def predict(self, timestamp):
+        """外推到 timestamp 时刻的位置 (x, y)，没有在跟踪时返回 None。"""
+        if self.last_time is None:
+            return None
+        dt = max(timestamp - self.last_time, 0.0)
+        return self.x + self.vx * dt, self.y + self.vy * dt
+
+    def coast(self, timestamp):
+        """timestamp 时刻没有检测到光点。仍在 max_coast 之内返回预测位置，否则跟丢并返回 None。"""
+        if self.last_time is None:
+            return None
+        if timestamp - self.last_time > self.max_coast:
+            self.dropouts += 1
+            self.reset()
+            return None
+        self.coasted += 1
+        return self.predict(timestamp)
+
+    def search_radius(self, timestamp):
+        if self.last_time is None:
+            return None
+        return max(self._spread(max(timestamp - self.last_time, 0.0)), self.min_radius)
+
+    def stats(self):
+        return {'updates': self.updates, 'coasted': self.coasted, 'dropouts': self.dropouts}
+
+    def _start(self):
+        pass
+
+    def _correct(self, x, y, dt):
+        raise NotImplementedError
+
+    def _spread(self, dt):
+        raise NotImplementedError
+
+
+class AlphaBetaPredictor(Predictor):
+    """
+    alpha:    位置修正增益（0-1），越大越相信测量值
+    beta:     速度修正增益（0-1），越大速度响应越快、噪声越大
+    growth:   外推时不确定范围的增长速度（像素/秒）
+    """
+
+    def __init__(self, alpha=0.85, beta=0.4, growth=400.0, **kwargs):
+        self.alpha = alpha
+        self.beta = beta
+        self.growth = growth
+        super().__init__(**kwargs)
+
+    def reset(self):
+        super().reset()
+        self.residual = 0.0     # 修正残差的滑动均方根（像素）
+
+    def _correct(self, x, y, dt):
+        px, py = self.x + self.vx * dt, self.y + self.vy * dt
+        rx, ry = x - px, y - py
+        self.x, self.y = px + self.alpha * rx, py + self.alpha * ry
+        self.vx += self.beta * rx / dt
+        self.vy += self.beta * ry / dt
+        self.residual = math.sqrt(0.9 * self.residual ** 2 + 0.1 * max(rx * rx, ry * ry))
+
+    def _spread(self, dt):
+        return 3 * self.residual + self.growth * dt
+
+
+class KalmanPredictor(Predictor):
+    """
+    匀速模型的卡尔曼滤波，状态为 (位置, 速度)，X、Y 两轴共用一个 2x2 协方差。
+    accel_noise:        加速度扰动的谱密度（像素²/秒³），越大越相信测量值、速度跟得越快
+    measurement_noise:  检测位置的标准差（像素）
+    """
+
+    def __init__(self, accel_noise=5e4, measurement_noise=1.0, **kwargs):
+        self.q = accel_noise
+        self.r = measurement_noise ** 2
+        super().__init__(**kwargs)
+
+    def reset(self):
+        super().reset()
+        self.p00 = self.p01 = self.p11 = 0.0
+
+    def _start(self):
+        self.p00 = self.r
+        self.p01 = 0.0
+        self.p11 = 1e6      # 初始速度未知
+
+    def _propagate(self, dt):
+        """外推 dt 秒后的协方差 (p00, p01, p11)。"""
+        q = self.q
+        p00 = self.p00 + 2 * dt * self.p01 + dt * dt * self.p11 + q * dt ** 3 / 3
+        p01 = self.p01 + dt * self.p11 + q * dt * dt / 2
+        p11 = self.p11 + q * dt
+        return p00, p01, p11
+
+    def _correct(self, x, y, dt):
+        p00, p01, p11 = self._propagate(dt)
+        px, py = self.x + self.vx * dt, self.y + self.vy * dt
+        s = p00 + self.r
+        k0, k1 = p00 / s, p01 / s
+        rx, ry = x - px, y - py
+        self.x, self.y = px + k0 * rx, py + k0 * ry
+        self.vx += k1 * rx
+        self.vy += k1 * ry
+        self.p00 = (1 - k0) * p00
+        self.p01 = (1 - k0) * p01
+        self.p11 = p11 - k1 * p01
+
+    def _spread(self, dt):
+        p00, _, _ = self._propagate(dt)
+        return 3 * math.sqrt(p00 + self.r)
+
+
+if __name__ == '__main__':
+    import time
+    import numpy as np
+    from vision.capture import SyntheticSource
+    from vision.pipeline import RED, detector_pipeline
+    from vision.roi_tracker import RoiTracker
+
+    # 60fps 合成画面，每 50 帧连续丢 6 帧；电机在画面采集 2 帧之后动作
+    fps, latency = 60.0, 2 / 60.0
+    source = SyntheticSource(radius=4)
+    frames = [source.read()[1] for _ in range(600)]
+    blank = np.full_like(frames[0], 30)
+    dropped = {i for i in range(len(frames)) if i % 50 >= 44}
+    pipeline = detector_pipeline((RED,), method='hsv')
+
+    def detect(image):
+        return pipeline.run(image)['red']
+
+    for name, make in (('hold last', None), ('alpha-beta', AlphaBetaPredictor), ('kalman', KalmanPredictor)):
+        predictor = make() if make else None
+        tracker = RoiTracker(detect, predictor=predictor)
+        errors, lost = [], 0
+        last = None
+        t0 = time.perf_counter()
+        for i, frame in enumerate(frames):
+            t = i / fps
+            detection = tracker.update(blank if i in dropped else frame, t)
+            if predictor is not None:
+                aim = predictor.predict(t + latency)
+            else:
+                last = (detection.x, detection.y) if detection is not None else None
+                aim = last
+            if aim is None:
+                lost += 1
+                continue
+            tx, ty = source.truth(i + latency * fps)
+            errors.append(math.hypot(aim[0] - tx, aim[1] - ty))
+        elapsed = (time.perf_counter() - t0) / len(frames)
+        extra = f", {predictor.stats()}" if predictor is not None else ""
+        print(f"{name:10s}: error at actuation mean {np.mean(errors):5.2f} px p99 {np.percentile(errors, 99):5.2f} px, "
+              f"no target {lost} frames, {elapsed * 1000:.2f} ms/frame, {tracker.stats()}{extra}")
@@ -0,0 +1,226 @@
+# vision/red_mask.py
+"""
+单次查表生成红色激光掩码。
+
+find_laser_dot 每一帧都要新建 HSV 图像、做两次 inRange、把两个掩码相加，
+再用新建的 5x5 核做开、闭运算。这里根据 config.py 中的 HSV 范围预先生成一张
+BGR -> 掩码 的查找表（256³ 项，16MB），每一帧只需要：
+    1. mixChannels 把 BGR 拷进 4 字节对齐的缓冲区（alpha 保持为 0）
+    2. 把缓冲区看作 uint32 索引，一次 np.take 查表得到掩码
+查找表由 cv2.cvtColor + cv2.inRange 逐颜色生成，结果与原流程逐像素一致。
+所有中间缓冲区按图像尺寸预先分配，帧间复用。
+开、闭运算只在掩码非零区域附近进行，激光点很小时几乎不花时间。
+
+查表的速度取决于画面中颜色的分布：颜色越杂，查表越容易缓存未命中。
+method='hsv' 保留 cvtColor + inRange 的做法（同样复用缓冲区），
+可以用本模块的 benchmark 在实际录制的画面上比较两种方式后选择。
+实测 16MB 的表放不进缓存，再加上拷贝成 BGRA 的一遍，单一颜色时查表并不比
+cvtColor + inRange 快（python -m bench 中 mask_red 约 5.0ms，hsv + inRange 约 2.6ms），
+所以默认使用 'hsv'；按 5~6 位量化缩小查表需要额外的一遍取索引，也没有更快，
+而且不再与原流程逐像素一致。查表保留给 multi_target_pipeline 一次分类多种颜色的场合。
+"""
+import functools
+
+import cv2
+import numpy as np
+
+import config
+
+RED_RANGES = (
+    (config.RED_LOWER, config.RED_UPPER),
+    (config.RED_LOWER2, config.RED_UPPER2),
+)
+
+# 形态学核只创建一次
+MORPH_KERNEL = np.ones((5, 5), np.uint8)
+# 只在非零像素的外接矩形（四周各留出 MORPH_MARGIN 像素）内做开、闭运算。
+# 开、闭运算一共最多向外扩展 4 个像素，留出的边距保证结果与整幅图像运算一致。
+MORPH_MARGIN = 8
+
+
+def build_hsv_lut(ranges, label=255, lut=None):
+    """
+    生成 BGR 查找表，索引为 b | g << 8 | r << 16（即 BGRA 小端 uint32，alpha 为 0）。
+    ranges 中任一 HSV 范围命中的颜色写入 label；传入已有的 lut 可以叠加多种颜色。
+    """
+    if lut is None:
+        lut = np.zeros(1 << 24, np.uint8)
+    plane = np.empty((256, 256, 3), np.uint8)
+    plane[..., 0] = np.arange(256, dtype=np.uint8)[None, :]   # b
+    plane[..., 1] = np.arange(256, dtype=np.uint8)[:, None]   # g
+    bounds = [(np.array(lower), np.array(upper)) for lower, upper in ranges]
+    for r in range(256):
+        plane[..., 2] = r
+        hsv = cv2.cvtColor(plane, cv2.COLOR_BGR2HSV)
+        hit = np.zeros((256, 256), np.uint8)
+        for lower, upper in bounds:
+            hit |= cv2.inRange(hsv, lower, upper)
+        block = lut[r << 16:(r + 1) << 16]
+        block[hit.ravel() != 0] = label
+    return lut
+
+
+@functools.lru_cache(maxsize=None)
+def red_lut():
+    """config 中红色范围对应的查找表，第一次使用时生成，之后共享。"""
+    return build_hsv_lut(RED_RANGES)
+
+
+@functools.lru_cache(maxsize=None)
+def label_lut(*target_ranges):
+    """
+    多种颜色共用的查找表：第 i 组 HSV 范围命中的颜色写入类别 i + 1，其余为 0。
+    范围重叠时后面的颜色覆盖前面的。
+    """
+    lut = None
+    for label, ranges in enumerate(target_ranges, 1):
+        lut = build_hsv_lut(ranges, label, lut)
+    return lut
+
+
+class LutMask:
+    """
+    用查找表把 BGR 图像映射成掩码（或类别图）。
+    返回值是内部缓冲区，下一次调用时会被覆盖。
+    """
+
+    def __init__(self, lut):
+        self.lut = lut
+        self._shape = None
+
+    def _allocate(self, shape):
+        h, w = shape[:2]
+        self._bgra = np.zeros((h, w, 4), np.uint8)
+        self._index = self._bgra.view(np.uint32).reshape(h, w)
+        self._out = np.empty((h, w), np.uint8)
+        self._shape = shape
+
+    def __call__(self, frame):
+        if frame.shape != self._shape:
+            self._allocate(frame.shape)
+        cv2.mixChannels([frame], [self._bgra], [0, 0, 1, 1, 2, 2])
+        np.take(self.lut, self._index, out=self._out, mode='wrap')
+        return self._out
+
+
+class HsvMask:
+    """cvtColor + 多个 inRange 合并，HSV 图像和掩码缓冲区复用。"""
+
+    def __init__(self, ranges):
+        self.bounds = [(np.array(lower), np.array(upper)) for lower, upper in ranges]
+        self._shape = None
+
+    def __call__(self, frame):
+        if frame.shape != self._shape:
+            h, w = frame.shape[:2]
+            self._hsv = np.empty((h, w, 3), np.uint8)
+            self._part = np.empty((h, w), np.uint8)
+            self._out = np.empty((h, w), np.uint8)
+            self._shape = frame.shape
+        cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=self._hsv)
+        (lower, upper), rest = self.bounds[0], self.bounds[1:]
+        cv2.inRange(self._hsv, lower, upper, dst=self._out)
+        for lower, upper in rest:
+            cv2.inRange(self._hsv, lower, upper, dst=self._part)
+            cv2.bitwise_or(self._out, self._part, dst=self._out)
+        return self._out
+
+
+class RedMask:
+    """
+    红色激光掩码 + 开、闭运算，所有缓冲区复用。
+    method: 'hsv' 颜色空间转换 + inRange（默认，见模块说明），'lut' 查表
+    """
+
+    def __init__(self, morphology=True, method='hsv'):
+        if method == 'lut':
+            self.classify = LutMask(red_lut())
+        elif method == 'hsv':
+            self.classify = HsvMask(RED_RANGES)
+        else:
+            raise ValueError(f"unknown mask method: {method}")
+        self.morphology = morphology
+        self._tmp = None
+
+    def __call__(self, frame):
+        mask = self.classify(frame)
+        if not self.morphology:
+            return mask
+        if self._tmp is None or self._tmp.shape != mask.shape:
+            self._tmp = np.empty_like(mask)
+        x, y, w, h = cv2.boundingRect(mask)
+        if w == 0:
+            return mask
+        height, width = mask.shape
+        x0, y0 = max(x - MORPH_MARGIN, 0), max(y - MORPH_MARGIN, 0)
+        x1, y1 = min(x + w + MORPH_MARGIN, width), min(y + h + MORPH_MARGIN, height)
+        roi = mask[y0:y1, x0:x1]
+        tmp = self._tmp[y0:y1, x0:x1]
+        cv2.morphologyEx(roi, cv2.MORPH_OPEN, MORPH_KERNEL, dst=tmp)
+        cv2.morphologyEx(tmp, cv2.MORPH_CLOSE, MORPH_KERNEL, dst=roi)
+        return mask
+
+
+def reference_mask(frame):
+    """原 find_laser_dot 中的掩码流程，用于对比。"""
+    hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask1 = cv2.inRange(hsv_frame, np.array([0, 120, 70]), np.array([10, 255, 255]))
+    mask2 = cv2.inRange(hsv_frame, np.array([170, 120, 70]), np.array([180, 255, 255]))
+    mask = mask1 + mask2
+    kernel = np.ones((5, 5), np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    return mask
+
+
+def load_frames(path=None, limit=100):
+    """读取录制的画面：视频文件或 .npy 帧序列；不给路径时生成合成画面。"""
+    if path is None:
+        from vision.capture import SyntheticSource
+        source = SyntheticSource(radius=4, noise=8)
+        return [source.read()[1] for _ in range(limit)]
+    if path.endswith('.npy'):
+        return list(np.load(path, mmap_mode='r')[:limit])
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def benchmark(frames):
+    """
+    返回 {名称: (ms/帧, 掩码是否与原流程全部一致)}。
+    """
+    import time
+
+    t0 = time.perf_counter()
+    expected = [reference_mask(frame) for frame in frames]
+    results = {'reference': ((time.perf_counter() - t0) * 1000 / len(frames), True)}
+
+    for method in ('hsv', 'lut'):
+        stage = RedMask(method=method)
+        stage(frames[0])  # 生成查找表、分配缓冲区，不计入时间
+        masks = []
+        t0 = time.perf_counter()
+        for frame in frames:
+            masks.append(stage(frame).copy())
+        elapsed = (time.perf_counter() - t0) * 1000 / len(frames)
+        identical = all(np.array_equal(m, want) for m, want in zip(masks, expected))
+        results[method] = (elapsed, identical)
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+
+    frames = load_frames(sys.argv[1] if len(sys.argv) > 1 else None)
+    results = benchmark(frames)
+    reference_ms = results['reference'][0]
+    print(f"{len(frames)} frames {frames[0].shape[1]}x{frames[0].shape[0]}")
+    for name, (ms, identical) in results.items():
+        print(f"  {name:10s}: {ms:6.2f} ms/frame ({reference_ms / ms:.2f}x), identical: {identical}")
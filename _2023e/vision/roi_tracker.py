@@ -0,0 +1,161 @@
+# vision/roi_tracker.py
+"""
+局部窗口跟踪激光点。
+
+find_laser_dot / detect_laser_position_improved 每一帧都对整幅 1280x720 图像做
+HSV 转换、inRange、形态学和轮廓查找，而激光点只有几个像素，并且通常就在上一帧
+位置附近。RoiTracker 只在上一次检测位置周围的小窗口内调用检测函数：
+窗口内找不到就逐级放大窗口，仍然找不到再回退到整帧搜索。
+
+窗口边长只取 min_window * grow^k 这几档，靠近画面边缘时整体平移而不是截短，
+所以检测流水线只会见到几种固定尺寸的子图，各尺寸的缓冲区分配一次后一直复用
+（见 vision.pipeline.Pipeline）。
+
+给定 predictor（vision.predictor）并在 update 时传入画面时间戳时，窗口中心取
+预测位置、边长取预测的不确定范围；光点短暂消失时由 predictor 继续外推，
+这期间只在预测位置附近搜索，不做整帧搜索。
+"""
+
+from vision.centroid import Detection
+
+
+class RoiTracker:
+    """
+    detect:      检测函数，输入图像（可以是裁剪后的子图），返回 (x, y)、Detection 或 None
+    min_window:  搜索窗口的最小边长（像素），需明显大于形态学核和光点尺寸
+    max_window:  逐级放大的上限，超过后直接整帧搜索
+    grow:        每次未命中时窗口的放大倍数，窗口边长只取 min_window * grow^k
+    predictor:   可选的 vision.predictor.Predictor
+    """
+
+    def __init__(self, detect, min_window=64, max_window=512, grow=2.0, predictor=None):
+        self.detect = detect
+        self.predictor = predictor
+        self.min_window = min_window
+        self.max_window = max_window
+        self.grow = grow
+        self.sizes = [min_window]
+        while self.sizes[-1] * grow <= max_window:
+            self.sizes.append(int(self.sizes[-1] * grow))
+        self.last = None
+        self.window = min_window
+
+        self.roi_hits = 0
+        self.roi_retries = 0
+        self.full_searches = 0
+        self.misses = 0
+
+    def reset(self):
+        self.last = None
+        self.window = self.min_window
+
+    def _quantize(self, size):
+        """不小于 size 的一档窗口边长（最大一档封顶）。"""
+        for level in self.sizes:
+            if level >= size:
+                return level
+        return self.sizes[-1]
+
+    def _window(self, shape, center, size):
+        # 边长固定为 size（画面更小时为整幅画面），靠近边缘时平移窗口
+        h, w = shape[:2]
+        sw, sh = min(size, w), min(size, h)
+        x0 = min(max(int(center[0]) - sw // 2, 0), w - sw)
+        y0 = min(max(int(center[1]) - sh // 2, 0), h - sh)
+        return x0, y0, x0 + sw, y0 + sh
+
+    def _accept(self, position):
+        # 下一帧的窗口随光点移动速度变化：移动越快窗口越大
+        if self.last is not None:
+            moved = max(abs(position[0] - self.last[0]), abs(position[1] - self.last[1]))
+            self.window = self._quantize(4 * moved)
+        else:
+            self.window = self.min_window
+        self.last = position
+        return position
+
+    def update(self, frame, timestamp=None):
+        """
+        在新的一帧中查找激光点，返回整帧坐标下的位置或 None。
+        timestamp 为画面采集时刻，有 predictor 时必须给出。
+        """
+        predictor = self.predictor if timestamp is not None else None
+        center, size = self.last, self.window
+        if predictor is not None and predictor.active:
+            center = predictor.predict(timestamp)
+            size = self._quantize(2 * predictor.search_radius(timestamp))
+
+        if center is not None:
+            for level in self.sizes[self.sizes.index(size):]:
+                x0, y0, x1, y1 = self._window(frame.shape, center, level)
+                found = self.detect(frame[y0:y1, x0:x1])
+                if found is not None:
+                    self.roi_hits += 1
+                    return self._found(shift(found, x0, y0), predictor, timestamp)
+                self.roi_retries += 1
+
+        if predictor is not None and predictor.coast(timestamp) is not None:
+            # 短暂消失：由 predictor 外推，下一帧继续在预测位置附近找
+            self.misses += 1
+            return None
+
+        # 跟丢了：整帧搜索
+        self.full_searches += 1
+        found = self.detect(frame)
+        if found is None:
+            self.misses += 1
+            self.reset()
+            return None
+        self.last = None
+        return self._found(found, predictor, timestamp)
+
+    def _found(self, position, predictor, timestamp):
+        if predictor is not None:
+            x, y = (position.x, position.y) if isinstance(position, Detection) else position
+            predictor.update(x, y, timestamp)
+        return self._accept(position)
+
+    def stats(self):
+        return {
+            'roi_hits': self.roi_hits,
+            'roi_retries': self.roi_retries,
+            'full_searches': self.full_searches,
+            'misses': self.misses,
+        }
+
+
+def shift(position, dx, dy):
+    """把子图中的坐标平移回整帧坐标。"""
+    if isinstance(position, Detection):
+        return position._replace(x=position.x + dx, y=position.y + dy)
+    return (position[0] + dx, position[1] + dy)
+
+
+if __name__ == '__main__':
+    import time
+    from vision.capture import SyntheticSource
+    from vision.red_mask import RedMask
+    from vision.centroid import locate_dot
+
+    # 与 laser_tracker.detect_laser_dot 相同的处理流程
+    red_mask = RedMask()
+
+    def detect(frame):
+        return locate_dot(red_mask(frame), frame, min_area=16)
+
+    source = SyntheticSource(radius=4)
+    frames = [source.read()[1] for _ in range(200)]
+
+    t0 = time.perf_counter()
+    for frame in frames:
+        detect(frame)
+    full = (time.perf_counter() - t0) / len(frames)
+
+    tracker = RoiTracker(detect)
+    t0 = time.perf_counter()
+    for frame in frames:
+        tracker.update(frame)
+    roi = (time.perf_counter() - t0) / len(frames)
+
+    print(f"full frame {full * 1000:.2f} ms/frame, roi tracker {roi * 1000:.2f} ms/frame "
+          f"({full / roi:.1f}x), {tracker.stats()}")
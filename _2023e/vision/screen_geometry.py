@@ -0,0 +1,239 @@
+# vision/screen_geometry.py
+"""
+屏幕边框检测和像素 -> 屏幕坐标（mm）的透视变换。
+
+camera.py 每一帧都做高斯模糊、自适应阈值、两次闭运算和 HoughLinesP，只是为了
+找屏幕的边线，而屏幕在帧间并不移动。ScreenGeometry 只在第一次（或校验失败时）
+做完整检测：找到边框四边形，计算到 SCREEN_STD_WIDTH x SCREEN_STD_HEIGHT
+平面的单应矩阵并缓存。之后每 verify_every 帧做一次廉价校验：沿缓存的四条边
+在边线内外各采样几十个像素，比较明暗对比度是否还和检测时接近；
+屏幕或摄像头被碰动时对比度下降，才重新完整检测。
+检测时某条边内外几乎没有对比度（找到的不是真正的边框，或者边线落在均匀区域上），
+按比例校验对这条边永远成立，所以这样的结果不接受，下一帧重新检测。
+"""
+import cv2
+import numpy as np
+
+import config
+from utils import profiling
+from vision.pipeline import border_pipeline
+
+
+def order_corners(points):
+    """把四个角点排成 左上、右上、右下、左下。"""
+    points = np.asarray(points, np.float32).reshape(4, 2)
+    s = points.sum(axis=1)
+    d = points[:, 1] - points[:, 0]
+    return np.array([points[s.argmin()], points[d.argmin()],
+                     points[s.argmax()], points[d.argmax()]], np.float32)
+
+
+def find_screen_quad(binary, min_area_ratio=0.05):
+    """
+    在二值图（深色线条为白）中找面积最大的凸四边形外轮廓，返回排好序的四个角点或 None。
+    min_area_ratio: 四边形面积占整幅图像的最小比例
+    """
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = min_area_ratio * binary.shape[0] * binary.shape[1]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True):
+        if cv2.contourArea(contour) < min_area:
+            break
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            return order_corners(approx)
+    return None
+
+
+class ScreenGeometry:
+    """
+    用法：
+        screen = ScreenGeometry()
+        if screen.update(frame):             # 每帧调用，返回是否有可用的单应矩阵
+            x_mm, y_mm = screen.pixel_to_screen(x, y)
+
+    verify_every:   每隔多少帧做一次边线对比度校验
+    probe:          在边线内外各偏移多少像素采样
+    samples:        每条边的采样点数
+    min_ratio:      对比度低于检测时的这个比例即认为屏幕位置变了，重新检测
+    min_contrast:   检测时每条边内外的平均亮度差（灰度级）至少要这么大，否则不接受这次检测
+    """
+
+    def __init__(self, width=config.SCREEN_STD_WIDTH, height=config.SCREEN_STD_HEIGHT,
+                 verify_every=30, probe=4, samples=32, min_ratio=0.5, min_area_ratio=0.05,
+                 min_contrast=10.0):
+        self.width, self.height = width, height
+        self.verify_every = verify_every
+        self.probe = probe
+        self.samples = samples
+        self.min_ratio = min_ratio
+        self.min_contrast = min_contrast
+        self.min_area_ratio = min_area_ratio
+        self.target = np.array([[0, 0], [width, 0], [width, height], [0, height]], np.float32)
+        self._pipeline = None
+
+        self.quad = None            # 左上、右上、右下、左下（像素）
+        self.homography = None      # 像素 -> mm
+        self.inverse = None         # mm -> 像素
+        self._inner = self._outer = None
+        self._reference = None
+        self._since_check = 0
+
+        self.detections = 0
+        self.checks = 0
+        self.drifts = 0
+        self.rejected = 0       # 边线对比度不足、没有接受的检测次数
+
+    # --- 完整检测 ---
+
+    @profiling.timed('screen.detect')
+    def detect(self, frame):
+        """完整检测边框并更新缓存，返回是否找到。"""
+        if self._pipeline is None:
+            self._pipeline = border_pipeline(frame.shape)
+        self.detections += 1
+        binary = self._pipeline.run(frame)['binary']
+        quad = find_screen_quad(binary, self.min_area_ratio)
+        if quad is None or not self._set_quad(quad, frame):
+            self.reset()
+            return False
+        return True
+
+    def _set_quad(self, quad, frame):
+        """缓存边框和各条边的参考对比度；有一条边的对比度低于 min_contrast 时不接受，返回 False。"""
+        self._inner, self._outer = self._probe_points(quad, frame.shape)
+        reference = self._contrast(frame)
+        if np.any(reference < self.min_contrast):
+            self.rejected += 1
+            return False
+        self.quad = quad
+        self.homography = cv2.getPerspectiveTransform(quad, self.target)
+        self.inverse = cv2.getPerspectiveTransform(self.target, quad)
+        self._reference = reference
+        self._since_check = 0
+        return True
+
+    def reset(self):
+        self.quad = self.homography = self.inverse = None
+        self._inner = self._outer = self._reference = None
+
+    # --- 廉价校验 ---
+
+    def _probe_points(self, quad, shape):
+        """每条边上均匀取点，沿法线向四边形内外各偏移 probe 像素，返回整数像素坐标。"""
+        t = np.linspace(0.1, 0.9, self.samples, dtype=np.float32)[:, None]
+        center = quad.mean(axis=0)
+        inner, outer = [], []
+        for a, b in zip(quad, np.roll(quad, -1, axis=0)):
+            points = a + t * (b - a)
+            normal = np.array([a[1] - b[1], b[0] - a[0]], np.float32)
+            normal /= np.linalg.norm(normal)
+            if normal @ (center - a) < 0:
+                normal = -normal        # 让法线指向四边形内部
+            inner.append(points + self.probe * normal)
+            outer.append(points - self.probe * normal)
+        h, w = shape[:2]
+
+        def clip(points):
+            points = np.rint(np.concatenate(points)).astype(np.intp)
+            return np.clip(points[:, 1], 0, h - 1), np.clip(points[:, 0], 0, w - 1)
+        return clip(inner), clip(outer)
+
+    def _contrast(self, frame):
+        """每条边内外采样点亮度差的平均绝对值（彩色图像取各通道的平均），形状 (4,)。"""
+        inner = frame[self._inner].astype(np.int16)
+        outer = frame[self._outer].astype(np.int16)
+        contrast = np.abs(inner - outer)
+        if frame.ndim == 3:
+            contrast = contrast.mean(axis=1)
+        return contrast.reshape(4, self.samples).mean(axis=1)
+
+    @profiling.timed('screen.verify')
+    def verify(self, frame):
+        """校验缓存的边框是否还在原位，返回是否通过。"""
+        self.checks += 1
+        contrast = self._contrast(frame)
+        return bool(np.all(contrast >= self.min_ratio * self._reference))
+
+    # --- 每帧调用 ---
+
+    def update(self, frame):
+        """
+        每帧调用：没有缓存时完整检测；有缓存时每 verify_every 帧校验一次，
+        校验失败再完整检测。返回当前是否有可用的单应矩阵。
+        """
+        if self.quad is None:
+            return self.detect(frame)
+        self._since_check += 1
+        if self._since_check >= self.verify_every:
+            self._since_check = 0
+            if not self.verify(frame):
+                self.drifts += 1
+                return self.detect(frame)
+        return True
+
+    def stats(self):
+        return {'detections': self.detections, 'checks': self.checks, 'drifts': self.drifts,
+                'rejected': self.rejected}
+
+    # --- 坐标变换 ---
+
+    def points_to_screen(self, points):
+        """像素坐标 (N, 2) -> 屏幕坐标 mm (N, 2)。"""
+        points = np.asarray(points, np.float32).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.homography).reshape(-1, 2)
+
+    def pixel_to_screen(self, x, y):
+        h = self.homography
+        w = h[2, 0] * x + h[2, 1] * y + h[2, 2]
+        return ((h[0, 0] * x + h[0, 1] * y + h[0, 2]) / w,
+                (h[1, 0] * x + h[1, 1] * y + h[1, 2]) / w)
+
+    def screen_to_pixel(self, x, y):
+        h = self.inverse
+        w = h[2, 0] * x + h[2, 1] * y + h[2, 2]
+        return ((h[0, 0] * x + h[0, 1] * y + h[0, 2]) / w,
+                (h[1, 0] * x + h[1, 1] * y + h[1, 2]) / w)
+
+    def warp(self, frame):
+        """把屏幕区域拉正成 width x height 的图像（1 像素 = 1mm）。"""
+        return cv2.warpPerspective(frame, self.homography, (self.width, self.height))
+
+
+def synthetic_screen(quad, shape=(config.FRAME_HEIGHT, config.FRAME_WIDTH, 3), border=12, noise=8, seed=0):
+    """合成画面：灰色背景上一块白色屏幕，四周是黑色胶带边框，quad 为边框外沿的四个角点。"""
+    rng = np.random.default_rng(seed)
+    frame = np.full(shape, 90, np.uint8)
+    quad = np.asarray(quad, np.float32)
+    cv2.fillConvexPoly(frame, np.rint(quad).astype(np.int32), (20, 20, 20))
+    # 内沿：把外沿四边形向中心缩小 border 像素（近似）
+    center = quad.mean(axis=0)
+    scale = 1 - border / np.linalg.norm(quad - center, axis=1).mean()
+    cv2.fillConvexPoly(frame, np.rint(center + (quad - center) * scale).astype(np.int32), (230, 230, 230))
+    if noise:
+        frame = cv2.add(frame, rng.integers(0, noise, shape, dtype=np.uint8))
+    return frame
+
+
+if __name__ == '__main__':
+    import time
+
+    quad = [[330, 90], [960, 120], [930, 660], [300, 620]]
+    moved = [[350, 100], [980, 130], [950, 670], [320, 630]]
+    frames = [synthetic_screen(quad, seed=i) for i in range(150)] + \
+             [synthetic_screen(moved, seed=i) for i in range(150)]
+
+    pipeline = border_pipeline()
+    t0 = time.perf_counter()
+    for frame in frames:
+        pipeline.run(frame)
+    full = (time.perf_counter() - t0) / len(frames)
+
+    screen = ScreenGeometry()
+    t0 = time.perf_counter()
+    for frame in frames:
+        screen.update(frame)
+    cached = (time.perf_counter() - t0) / len(frames)
+
+    print(f"detect every frame {full * 1000:.2f} ms/frame, cached {cached * 1000:.3f} ms/frame, {screen.stats()}")
+    print(f"quad {screen.quad.round(1).tolist()}, expected {moved}")
+    print(f"corner (350, 100) -> {np.round(screen.pixel_to_screen(350, 100), 2)} mm")
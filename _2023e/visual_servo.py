@@ -0,0 +1,206 @@
+# visual_servo.py
+"""
+视觉伺服：让红色激光点停在画面中的目标位置。
+
+固定频率的控制循环（utils.rate_loop.RateLoop）每个周期取摄像头最新一帧，
+有新画面时检测激光点，X、Y 两个 PID 把像素误差换算成步进速率，
+通过 MotionService.jog 交给后台运动线程；没有新画面的周期保持上一次的速度。
+检测结果先交给 vision.predictor，PID 用外推到下发时刻的位置，抵消采集和处理延迟；
+光点短暂消失时同样保持上一次的速度。
+循环结束时打印控制周期和抖动，用来确定控制频率能提到多高。
+加 --record 时每帧的检测结果、PID 各项、下发速率和各级耗时写入 utils.ring_log 记录文件，
+事后用 python -m utils.ring_log 文件名 分析。
+有标定文件（config.RED_CALIBRATION，见 utils/calibration.py）时，目标位置和光点位置都查表换算成
+绝对步数，PID 直接在步数上计算，误差的方向和比例由标定给出；没有时按 SERVO_STEPS_PER_PIXEL 换算。
+
+在 _2023e 目录下运行：
+    python visual_servo.py            # 摄像头 + 云台
+    python visual_servo.py --sim      # 模拟画面：光点位置由模拟云台的步数决定
+    python visual_servo.py --sim --record servo.rlog
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+import config
+from hardware.gimbal_control import Gimbal, MotorConfig
+from utils.calibration import Calibration
+from utils.pid_controller import PID
+from utils.rate_loop import RateLoop
+from utils.ring_log import RingLog
+from utils.telemetry import Telemetry
+from vision.camera_config import CAPTURE
+from vision.capture import FrameGrabber
+from vision.display import Display, Mark
+from vision.pipeline import RED, detector_pipeline
+from vision.predictor import KalmanPredictor
+from vision.roi_tracker import RoiTracker
+
+
+class VisualServo:
+    """
+    service:          MotionService（已启动）
+    setpoint:         目标像素位置 (x, y)
+    steps_per_pixel:  PID 输出（像素/秒）到步进速率（step/s）的换算
+    directions:       各轴电机正转时光点在画面上的移动方向（1 或 -1）
+    calibration:      utils.calibration.Calibration，给出时 PID 在步数上计算（输出即 step/s），
+                      不再使用 steps_per_pixel 和 directions
+    """
+
+    def __init__(self, service, setpoint, gains=(config.PID_KP, config.PID_KI, config.PID_KD),
+                 steps_per_pixel=config.SERVO_STEPS_PER_PIXEL,
+                 max_step_rate=config.SERVO_MAX_STEP_RATE, directions=(1, 1), calibration=None):
+        self.service = service
+        self.calibration = calibration
+        if calibration is not None:
+            setpoint = calibration.pixel_to_steps(*setpoint, rounded=False)
+            steps_per_pixel, directions = 1.0, (1, 1)
+        self.steps_per_pixel = steps_per_pixel
+        self.directions = directions
+        limit = max_step_rate / steps_per_pixel
+        self.pids = [PID(*gains, setpoint=target, output_limits=(-limit, limit)) for target in setpoint]
+        self.rates = (0.0, 0.0)
+        self.updates = 0
+        self.lost = 0
+
+    def update(self, detection, timestamp):
+        """
+        用一次新的检测结果更新速度命令。timestamp 为检测位置对应的时刻（time.monotonic），
+        PID 的 dt 按画面之间的真实间隔计算。返回下发的步进速率 (x, y)。
+        """
+        if detection is None:
+            self.lost += 1
+            if any(self.rates):
+                self.service.jog(0, 0)
+            for pid in self.pids:
+                pid.reset()
+            self.rates = (0.0, 0.0)
+            return self.rates
+        self.updates += 1
+        if self.calibration is None:
+            measured = (detection.x, detection.y)
+        else:
+            measured = self.calibration.pixel_to_steps(detection.x, detection.y, rounded=False)
+        self.rates = tuple(direction * pid.compute(value, timestamp) * self.steps_per_pixel
+                           for pid, value, direction in zip(self.pids, measured, self.directions))
+        self.service.jog(*self.rates)
+        return self.rates
+
+    def terms(self):
+        """
+        最近一次更新时两轴 PID 的比例、积分、微分项：((px, py), (ix, iy), (dx, dy))，
+        单位为像素/秒（有标定时为 step/s）。
+        """
+        return (tuple(pid.Kp * pid.last_error for pid in self.pids),
+                tuple(pid.Ki * pid.integral for pid in self.pids),
+                tuple(pid.Kd * pid.derivative for pid in self.pids))
+
+
+class SimulatedScene:
+    """
+    模拟画面：光点位置 = 起始位置 + 云台步数 / steps_per_pixel，
+    接口与 cv2.VideoCapture 相同，可以交给 FrameGrabber。
+    """
+
+    def __init__(self, service, start=(300.0, 200.0), steps_per_pixel=config.SERVO_STEPS_PER_PIXEL,
+                 width=config.FRAME_WIDTH, height=config.FRAME_HEIGHT):
+        self.service = service
+        self.start = np.asarray(start)
+        self.steps_per_pixel = steps_per_pixel
+        self.background = np.full((height, width, 3), 30, np.uint8)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        x, y = self.start + self.service.position / self.steps_per_pixel
+        frame = self.background.copy()
+        cv2.circle(frame, (int(round(x)), int(round(y))), 4, (40, 40, 255), -1)
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="激光点视觉伺服")
+    parser.add_argument('--sim', action='store_true', help="使用模拟画面")
+    parser.add_argument('--rate', type=float, default=config.SERVO_RATE, help="控制频率 (Hz)")
+    parser.add_argument('--seconds', type=float, default=None, help="运行时长，默认直到 Ctrl+C")
+    parser.add_argument('--record', default=config.RING_LOG_PATH, help="每帧记录写入的文件")
+    args = parser.parse_args()
+
+    gimbal = Gimbal(MotorConfig(*config.RED_GIMBAL_X_PINS), MotorConfig(*config.RED_GIMBAL_Y_PINS))
+    service = gimbal.start_service(hold=True)
+    calibration = None
+    if args.sim:
+        grabber = FrameGrabber(SimulatedScene(service), fps=30).start()
+    else:
+        calibration = Calibration.find(config.RED_CALIBRATION)
+        if calibration is None:
+            print(f"no calibration '{config.RED_CALIBRATION}' in {config.CALIBRATION_DIR}, "
+                  f"using SERVO_STEPS_PER_PIXEL")
+        # 协商格式、帧率和曝光，驱动没有接受的设置打印出来
+        grabber = FrameGrabber(config.CAMERA_INDEX, settings=CAPTURE).start()
+        if not grabber.negotiation.ok:
+            print(f"camera settings not granted:\n{grabber.negotiation}")
+
+    pipeline = detector_pipeline((RED,), method='hsv')
+    predictor = KalmanPredictor()
+    tracker = RoiTracker(lambda image: pipeline.run(image)['red'], predictor=predictor)
+    servo = VisualServo(service, (config.FRAME_WIDTH / 2, config.FRAME_HEIGHT / 2), calibration=calibration)
+    loop = RateLoop(args.rate)
+    display = Display(title='visual servo').start()
+    telemetry = Telemetry().start()
+    record = RingLog(args.record) if args.record else None
+    fresh = 0
+    t0 = time.monotonic()
+    try:
+        while args.seconds is None or time.monotonic() - t0 < args.seconds:
+            loop.wait()
+            display.poll()      # 窗口只能在主线程刷新
+            frame = grabber.read(timeout=0)
+            if frame is None:
+                continue    # 没有新画面：保持上一次的速度命令
+            fresh += 1
+            detection = tracker.update(frame.image, frame.timestamp)
+            now = time.monotonic()
+            if detection is not None:
+                x, y = predictor.predict(now)
+                detection = detection._replace(x=x, y=y)
+            elif predictor.active:
+                continue    # 短暂消失：保持上一次的速度命令
+            servo.update(detection, now)
+            if record is not None:
+                (px, py), (ix, iy), (dx, dy) = servo.terms()
+                found = detection is not None
+                record.append(frame.seq, frame.timestamp, found,
+                              detection.x if found else np.nan, detection.y if found else np.nan,
+                              px, py, ix, iy, dx, dy, *servo.rates, *service.position,
+                              now - frame.timestamp, time.monotonic() - now)
+            if detection is not None:
+                telemetry.event('servo', x=round(detection.x, 1), y=round(detection.y, 1),
+                                rate_x=round(servo.rates[0]), rate_y=round(servo.rates[1]))
+                display.show(frame.image, (Mark(detection.x, detection.y),))
+    except KeyboardInterrupt:
+        print("\nCtrl+C pressed. Exiting.")
+    finally:
+        display.close()
+        telemetry.close()
+        if record is not None:
+            record.close()
+        service.shutdown()
+        grabber.release()
+        gimbal.destroy()
+        print(loop.report())
+        print(f"frames used {fresh} of {loop.iterations} cycles, "
+              f"servo updates {servo.updates}, lost {servo.lost}, grabber {grabber.stats()}, "
+              f"predictor {predictor.stats()}")
+        if record is not None:
+            print(f"recorded {record.count} frames to {record.path}")
+
+
+if __name__ == '__main__':
+    main()